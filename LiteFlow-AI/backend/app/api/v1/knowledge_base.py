@@ -1,17 +1,17 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import List
+from typing import List, Optional
 import tempfile
 import os
 from app.schemas.knowledge_base import (
     KnowledgeBase, KnowledgeBaseCreate, KnowledgeBaseUpdate,
-    DocumentUploadResponse, SearchQuery, SearchResponse
+    DocumentUploadResponse, IngestionJob, SearchQuery, SearchResponse
 )
-from app.services.knowledge_base import KnowledgeBaseManager
+from app.services.knowledge_base import IngestionQueueFullError, knowledge_base_manager
 
 router = APIRouter(prefix="/knowledge-bases", tags=["knowledge_base"])
 
-# 初始化知识库管理器
-kb_manager = KnowledgeBaseManager()
+# 使用全局知识库管理器，与入库流水线共享知识库状态
+kb_manager = knowledge_base_manager
 
 
 @router.get("/", response_model=List[KnowledgeBase])
@@ -83,7 +83,7 @@ async def add_document_to_knowledge_base(
     chunking_strategy: str = Form(None),
     separators: str = Form(None)
 ):
-    """上传文档到知识库"""
+    """上传文档到知识库，文档在后台入库，通过返回的 job_id 查询处理进度"""
     try:
         # 检查知识库是否存在
         knowledge_base = kb_manager.get_knowledge_base(kb_id)
@@ -96,7 +96,7 @@ async def add_document_to_knowledge_base(
             temp_file_path = temp_file.name
         
         try:
-            # 上传文档
+            # 提交入库任务
             upload_response = kb_manager.upload_document(
                 kb_id=kb_id,
                 file_path=temp_file_path,
@@ -107,15 +107,92 @@ async def add_document_to_knowledge_base(
                 separators=separators.split(",") if separators else None
             )
             return upload_response
-        finally:
-            # 删除临时文件
+        except Exception:
+            # 提交失败时删除临时文件，提交成功后由入库流水线在解析完成后删除
             os.unlink(temp_file_path)
+            raise
+    except IngestionQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"上传文档失败: {str(e)}")
 
 
+@router.put("/{kb_id}/documents/{doc_id}", response_model=DocumentUploadResponse)
+async def update_document_in_knowledge_base(
+    kb_id: str,
+    doc_id: str,
+    file: UploadFile = File(...),
+    chunk_size: int = Form(None),
+    chunk_overlap: int = Form(None),
+    chunking_strategy: str = Form(None),
+    separators: str = Form(None)
+):
+    """上传文档的新版本，后台重新分块后只向量化和写入有变化的块，通过返回的 job_id 查询处理进度"""
+    try:
+        # 检查知识库和文档是否存在
+        knowledge_base = kb_manager.get_knowledge_base(kb_id)
+        if not knowledge_base:
+            raise HTTPException(status_code=404, detail="知识库不存在")
+        document = kb_manager.get_document(kb_id, doc_id)
+        if not document:
+            raise HTTPException(status_code=404, detail="文档不存在")
+        if document.status in ("pending", "processing"):
+            raise HTTPException(status_code=409, detail="文档正在处理中，请稍后再试")
+        
+        # 创建临时文件
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
+            temp_file.write(await file.read())
+            temp_file_path = temp_file.name
+        
+        try:
+            # 提交重新索引任务
+            return kb_manager.reindex_document(
+                kb_id=kb_id,
+                document_id=doc_id,
+                file_path=temp_file_path,
+                filename=file.filename,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                chunking_strategy=chunking_strategy,
+                separators=separators.split(",") if separators else None
+            )
+        except Exception:
+            # 提交失败时删除临时文件，提交成功后由入库流水线在解析完成后删除
+            os.unlink(temp_file_path)
+            raise
+    except IngestionQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"更新文档失败: {str(e)}")
+
+
+@router.get("/{kb_id}/jobs", response_model=List[IngestionJob])
+async def list_ingestion_jobs(kb_id: str, status: Optional[str] = None, limit: int = 100):
+    """获取知识库的文档入库任务列表，按创建时间倒序"""
+    try:
+        return kb_manager.list_ingestion_jobs(kb_id, status=status, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取入库任务列表失败: {str(e)}")
+
+
+@router.get("/{kb_id}/jobs/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(kb_id: str, job_id: str):
+    """获取文档入库任务状态"""
+    try:
+        job = kb_manager.get_ingestion_job(job_id)
+        if not job or job.knowledge_base_id != kb_id:
+            raise HTTPException(status_code=404, detail="入库任务不存在")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取入库任务失败: {str(e)}")
+
+
 @router.post("/{kb_id}/search", response_model=SearchResponse)
 async def search_knowledge_base(kb_id: str, search_query: SearchQuery):
     """检索知识库"""
@@ -126,7 +203,7 @@ async def search_knowledge_base(kb_id: str, search_query: SearchQuery):
             raise HTTPException(status_code=404, detail="知识库不存在")
         
         # 执行检索
-        search_result = kb_manager.search_knowledge_base(
+        search_result = await kb_manager.search_knowledge_base(
             kb_id=kb_id,
             query=search_query.query,
             top_k=search_query.top_k,
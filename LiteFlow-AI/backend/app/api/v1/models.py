@@ -1,11 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse as SSEResponse
+from typing import AsyncIterator, List, Optional
 from app.schemas.models import (
     ModelInfo, ModelListResponse, ChatCompletionRequest,
-    TextGenerationRequest, CompletionResponse, StreamingResponse
+    TextGenerationRequest, CompletionResponse, StreamingResponse,
+    RoutingBackend, RoutingGroupInfo
 )
 from app.services.model_gateway.gateway import model_gateway
+from app.services.model_gateway.models.base import BaseModelAdapter, ChatMessage as GatewayChatMessage
+from app.services.model_gateway.rate_limit import RateLimitExceededError
+from app.services.model_gateway.resilience import ProviderUnavailableError
 from app.utils.logger import logger
+from app.utils.sse import SSE_HEADERS, SSE_MEDIA_TYPE, format_sse
 
 router = APIRouter(prefix="/models", tags=["models"])
 
@@ -63,6 +69,13 @@ DEFAULT_MODELS = {
 }
 
 
+def resolve_cache_option(cache: Optional[bool], bypass_header: Optional[str]) -> Optional[bool]:
+    """解析响应缓存选项，请求头 X-Cache-Bypass 为真值时跳过缓存"""
+    if bypass_header is not None and bypass_header.strip().lower() in ("1", "true", "yes"):
+        return False
+    return cache
+
+
 @router.get("/", response_model=List[ModelListResponse])
 async def get_models():
     """获取所有模型列表"""
@@ -76,6 +89,73 @@ async def get_models():
         raise HTTPException(status_code=500, detail="Failed to get models")
 
 
+async def open_stream(model: BaseModelAdapter, stream: AsyncIterator[str]) -> SSEResponse:
+    """读取首个片段后返回 SSE 响应
+    
+    在返回响应前读取首个片段，使上游连接、限流、熔断等错误仍能以对应的 HTTP 状态码返回；
+    之后每个片段作为一条 SSE 消息推送，最后一条消息的 is_finished 为 true。
+    客户端断开时生成器被取消，finally 中关闭上游流以取消模型调用。
+    """
+    try:
+        first: Optional[str] = await stream.__anext__()
+    except StopAsyncIteration:
+        first = None
+    
+    def message(chunk: str, is_finished: bool = False) -> str:
+        return format_sse(StreamingResponse(
+            chunk=chunk,
+            is_finished=is_finished,
+            model_name=model.config.model_name,
+            provider=model.provider
+        ))
+    
+    async def chunk_stream():
+        try:
+            if first is not None:
+                yield message(first)
+                async for chunk in stream:
+                    yield message(chunk)
+            yield message("", is_finished=True)
+        except Exception as e:
+            # 响应头已发送，流中途的错误以 error 事件通知客户端
+            logger.error(f"Model stream error: {str(e)}")
+            yield format_sse({"detail": str(e)}, event="error")
+        finally:
+            await stream.aclose()
+    
+    return SSEResponse(chunk_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@router.get("/routing/groups", response_model=List[RoutingGroupInfo])
+async def list_routing_groups():
+    """获取所有路由组及各后端的延迟、错误率统计"""
+    try:
+        return model_gateway.router.list_groups()
+    except Exception as e:
+        logger.error(f"Failed to list routing groups: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to list routing groups")
+
+
+@router.put("/routing/groups/{group_name}", response_model=RoutingGroupInfo)
+async def put_routing_group(group_name: str, backends: List[RoutingBackend], hedge: bool = False):
+    """创建或替换路由组，请求时以 provider="group"、model_name=路由组名称 使用"""
+    try:
+        return model_gateway.router.register_group(group_name, backends, hedge=hedge).info()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to register routing group {group_name}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to register routing group")
+
+
+@router.delete("/routing/groups/{group_name}")
+async def delete_routing_group(group_name: str):
+    """删除路由组"""
+    if not model_gateway.router.remove_group(group_name):
+        raise HTTPException(status_code=404, detail=f"Routing group {group_name} not found")
+    return {"message": "Routing group deleted successfully"}
+
+
 @router.get("/{provider}", response_model=ModelListResponse)
 async def get_provider_models(provider: str):
     """获取特定提供商的模型列表"""
@@ -92,20 +172,16 @@ async def get_provider_models(provider: str):
 
 
 @router.post("/chat/completions", response_model=CompletionResponse)
-async def create_chat_completion(request: ChatCompletionRequest):
-    """创建聊天完成请求"""
+async def create_chat_completion(
+    request: ChatCompletionRequest,
+    x_cache_bypass: Optional[str] = Header(default=None)
+):
+    """创建聊天完成请求，stream 为 true 时以 SSE 流式返回"""
     try:
         # 获取模型实例
         model = model_gateway.get_model(
             provider=request.provider,
             model_name=request.model_name,
-            config={
-                "temperature": request.config.temperature,
-                "max_tokens": request.config.max_tokens,
-                "top_p": request.config.top_p,
-                "frequency_penalty": request.config.frequency_penalty,
-                "presence_penalty": request.config.presence_penalty
-            },
             api_key=request.api_key,
             base_url=request.base_url
         )
@@ -117,8 +193,20 @@ async def create_chat_completion(request: ChatCompletionRequest):
             for msg in request.messages
         ]
 
+        # 流式调用
+        if request.stream:
+            return await open_stream(model, model.stream_chat(
+                gateway_messages,
+                use_cache=resolve_cache_option(request.cache, x_cache_bypass),
+                **request.config.model_dump()
+            ))
+
         # 调用聊天接口
-        response = await model.chat(messages=gateway_messages)
+        response = await model.chat(
+            messages=gateway_messages,
+            use_cache=resolve_cache_option(request.cache, x_cache_bypass),
+            **request.config.model_dump()
+        )
 
         # 返回响应
         return CompletionResponse(
@@ -131,32 +219,46 @@ async def create_chat_completion(request: ChatCompletionRequest):
     except ValueError as e:
         logger.error(f"Model error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+    except ProviderUnavailableError as e:
+        logger.error(f"Model provider unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except RateLimitExceededError as e:
+        logger.warning(f"Model rate limit exceeded: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to create chat completion: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create chat completion: {str(e)}")
 
 
 @router.post("/completions", response_model=CompletionResponse)
-async def create_text_completion(request: TextGenerationRequest):
-    """创建文本生成请求"""
+async def create_text_completion(
+    request: TextGenerationRequest,
+    x_cache_bypass: Optional[str] = Header(default=None)
+):
+    """创建文本生成请求，stream 为 true 时以 SSE 流式返回"""
     try:
         # 获取模型实例
         model = model_gateway.get_model(
             provider=request.provider,
             model_name=request.model_name,
-            config={
-                "temperature": request.config.temperature,
-                "max_tokens": request.config.max_tokens,
-                "top_p": request.config.top_p,
-                "frequency_penalty": request.config.frequency_penalty,
-                "presence_penalty": request.config.presence_penalty
-            },
             api_key=request.api_key,
             base_url=request.base_url
         )
 
+        # 流式调用（适配器没有单独的流式生成接口，提示词作为单条用户消息）
+        if request.stream:
+            return await open_stream(model, model.stream_chat(
+                [GatewayChatMessage(role="user", content=request.prompt)],
+                use_cache=resolve_cache_option(request.cache, x_cache_bypass),
+                **request.config.model_dump()
+            ))
+
         # 调用生成接口
-        response = await model.generate(prompt=request.prompt)
+        response = await model.generate(
+            prompt=request.prompt,
+            use_cache=resolve_cache_option(request.cache, x_cache_bypass),
+            **request.config.model_dump()
+        )
 
         # 返回响应
         return CompletionResponse(
@@ -169,6 +271,12 @@ async def create_text_completion(request: TextGenerationRequest):
     except ValueError as e:
         logger.error(f"Model error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+    except ProviderUnavailableError as e:
+        logger.error(f"Model provider unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except RateLimitExceededError as e:
+        logger.warning(f"Model rate limit exceeded: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to create text completion: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create text completion: {str(e)}")
@@ -1,16 +1,29 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from app.schemas.workflow import (
     WorkflowDefinition,
     WorkflowInstance,
+    WorkflowInstanceListResponse,
     WorkflowExecutionRequest,
-    WorkflowExecutionResponse
+    WorkflowExecutionResponse,
+    WorkflowStreamEvent
 )
-from app.services.workflow import workflow_manager, WorkflowExecutor
+from app.services.workflow import (
+    workflow_manager,
+    workflow_executor,
+    workflow_worker_pool,
+    WorkflowInstanceConflictError,
+    WorkflowQueueFullError
+)
+from app.config import settings
 from app.utils.logger import logger
+from app.utils.sse import SSE_HEADERS, SSE_MEDIA_TYPE, format_sse
 
 router = APIRouter(prefix="/workflows", tags=["workflow"])
-workflow_executor = WorkflowExecutor()
 
 
 @router.post("/", response_model=WorkflowDefinition)
@@ -33,6 +46,29 @@ async def list_workflows():
         raise HTTPException(status_code=500, detail="Failed to list workflows")
 
 
+@router.get("/instances", response_model=WorkflowInstanceListResponse)
+async def list_workflow_instances(
+    workflow_id: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """分页获取工作流实例（最新优先）"""
+    try:
+        items, next_cursor = workflow_manager.page_instances(
+            workflow_id=workflow_id,
+            status=status,
+            cursor=cursor,
+            limit=limit
+        )
+        return WorkflowInstanceListResponse(items=items, next_cursor=next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to list workflow instances: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to list workflow instances")
+
+
 @router.get("/{workflow_id}", response_model=WorkflowDefinition)
 async def get_workflow(workflow_id: str):
     """获取特定工作流"""
@@ -115,11 +151,123 @@ async def execute_workflow(request: WorkflowExecutionRequest):
         raise HTTPException(status_code=500, detail=f"Failed to execute workflow: {str(e)}")
 
 
+@router.post("/execute/async", response_model=WorkflowExecutionResponse, status_code=202)
+async def execute_workflow_async(request: WorkflowExecutionRequest):
+    """异步执行工作流，立即返回实例ID，通过 GET /instances/{instance_id} 查询进度"""
+    try:
+        # 获取工作流定义
+        workflow = workflow_manager.get_workflow(request.workflow_id)
+        if workflow is None:
+            raise HTTPException(status_code=404, detail=f"Workflow {request.workflow_id} not found")
+        
+        # 创建实例并提交到执行池
+        instance = workflow_manager.create_instance(request)
+        await workflow_worker_pool.submit(instance, workflow)
+        
+        return WorkflowExecutionResponse(
+            success=True,
+            instance_id=instance.instance_id,
+            status=instance.status
+        )
+    except WorkflowQueueFullError as e:
+        workflow_manager.update_instance(
+            instance.instance_id,
+            status="failed",
+            outputs={"error": str(e)}
+        )
+        raise HTTPException(status_code=429, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to submit workflow: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to submit workflow: {str(e)}")
+
+
+@router.post("/execute/stream")
+async def execute_workflow_stream(request: WorkflowExecutionRequest):
+    """流式执行工作流，以 SSE 推送节点开始/结束事件和模型节点的 token 增量"""
+    # 获取工作流定义
+    workflow = workflow_manager.get_workflow(request.workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail=f"Workflow {request.workflow_id} not found")
+    
+    try:
+        instance = workflow_manager.create_instance(request)
+        instance = workflow_manager.update_instance(instance.instance_id, status="running")
+    except Exception as e:
+        logger.error(f"Failed to execute workflow: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to execute workflow: {str(e)}")
+    
+    async def event_stream():
+        events: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(workflow_executor.execute(instance, workflow, on_event=events.put))
+        try:
+            while True:
+                event: WorkflowStreamEvent = await events.get()
+                yield format_sse(event.model_dump(exclude_none=True), event=event.event)
+                if event.event == "workflow_end":
+                    break
+        finally:
+            # 客户端断开时取消执行，实例被置为 paused，可通过 resume 继续
+            if not task.done():
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    return StreamingResponse(event_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@router.post("/{workflow_id}/batch")
+async def execute_workflow_batch(
+    workflow_id: str,
+    file: UploadFile = File(...),
+    concurrency: Optional[int] = Query(None, ge=1, le=256)
+):
+    """批量执行工作流
+    
+    上传 JSONL 文件，每行一个 JSON 对象作为一个实例的输入；以 JSONL 流式返回每行的
+    执行状态、结果和耗时（按完成顺序，通过 row 字段对应输入行）。
+    """
+    workflow = workflow_manager.get_workflow(workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
+    
+    try:
+        content = (await file.read()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Batch file must be UTF-8 encoded JSONL")
+    finally:
+        await file.close()
+    
+    # 解析失败的行原样交给执行器，由其返回 invalid 结果而不是中断整个批次
+    lines = [line for line in content.splitlines() if line.strip()]
+    
+    def parse(line: str):
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            return line
+    
+    async def result_stream():
+        results = workflow_executor.execute_batch(
+            workflow,
+            (parse(line) for line in lines),
+            concurrency=concurrency or settings.WORKFLOW_BATCH_CONCURRENCY
+        )
+        try:
+            async for result in results:
+                yield json.dumps(jsonable_encoder(result), ensure_ascii=False, default=str) + "\n"
+        finally:
+            await results.aclose()
+    
+    logger.info(f"Batch execution started for workflow {workflow_id}: {len(lines)} rows")
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
 @router.get("/instances/{instance_id}", response_model=WorkflowInstance)
 async def get_workflow_instance(instance_id: str):
     """获取工作流实例"""
     try:
-        instance = workflow_manager.get_instance(instance_id)
+        instance = await workflow_manager.get_instance(instance_id)
         if instance is None:
             raise HTTPException(status_code=404, detail=f"Workflow instance {instance_id} not found")
         return instance
@@ -128,3 +276,25 @@ async def get_workflow_instance(instance_id: str):
     except Exception as e:
         logger.error(f"Failed to get workflow instance {instance_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get workflow instance {instance_id}")
+
+
+@router.post("/instances/{instance_id}/resume", response_model=WorkflowExecutionResponse)
+async def resume_workflow_instance(instance_id: str):
+    """从检查点恢复执行工作流实例"""
+    try:
+        instance = await workflow_executor.resume(instance_id)
+        
+        return WorkflowExecutionResponse(
+            success=instance.status == "completed",
+            instance_id=instance.instance_id,
+            status=instance.status,
+            result=instance.outputs,
+            error_message=instance.outputs.get("error") if instance.status == "failed" else None
+        )
+    except WorkflowInstanceConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to resume workflow instance {instance_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to resume workflow instance {instance_id}")
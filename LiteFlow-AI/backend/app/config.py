@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl
 
@@ -24,10 +24,67 @@ class Settings(BaseSettings):
     DEFAULT_MODEL_NAME: str = "gpt-3.5-turbo"
     DEFAULT_TEMPERATURE: float = 0.7
     DEFAULT_MAX_TOKENS: int = 1024
+    MODEL_ADAPTER_POOL_SIZE: int = 64  # 模型适配器池容量，超出时按 LRU 淘汰并关闭客户端
+    MODEL_HTTP_MAX_CONNECTIONS: int = 100  # 模型调用共享连接池的最大连接数
+    MODEL_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20  # 保持的空闲 keep-alive 连接数
+    MODEL_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # 空闲连接保持时间（秒）
+    MODEL_HTTP2_ENABLED: bool = False  # 是否启用 HTTP/2，需要安装 h2
+    MODEL_RESPONSE_CACHE_ENABLED: bool = True  # 是否启用模型响应精确匹配缓存
+    MODEL_RESPONSE_CACHE_SIZE: int = 1024  # 响应缓存内存容量，超出时按 LRU 淘汰
+    MODEL_RESPONSE_CACHE_TTL: float = 3600.0  # 响应缓存有效期（秒）
+    MODEL_RESPONSE_CACHE_SQLITE_PATH: Optional[str] = None  # 响应缓存 SQLite 持久层路径，为空时只使用内存
+    MODEL_SEMANTIC_CACHE_ENABLED: bool = False  # 是否启用语义缓存（精确匹配未命中时按用户消息相似度查找）
+    MODEL_SEMANTIC_CACHE_THRESHOLD: float = 0.95  # 语义缓存命中所需的最低余弦相似度
+    MODEL_SEMANTIC_CACHE_TTL: float = 86400.0  # 语义缓存有效期（秒）
+    MODEL_SEMANTIC_CACHE_COLLECTION: str = "model_semantic_cache"  # 语义缓存使用的 Chroma 集合
+    MODEL_SINGLE_FLIGHT_ENABLED: bool = True  # 是否合并参数完全相同的并发模型调用
+    MODEL_RATE_LIMITS: Dict[str, Dict[str, float]] = {}  # 按提供商配置的每个凭证限额，如 {"openai": {"rpm": 500, "tpm": 200000}}
+    MODEL_RATE_LIMIT_MAX_WAIT: float = 10.0  # 调用等待限流额度的最长时间（秒），超过时直接拒绝
+    MODEL_ROUTING_GROUPS: Dict[str, List[Dict[str, Any]]] = {}  # 路由组，如 {"fast-chat": [{"provider": "openai", "model_name": "gpt-4o-mini", "api_key": "..."}]}
+    MODEL_ROUTING_WINDOW: int = 100  # 路由统计使用的滚动窗口大小（最近调用次数）
+    MODEL_HEDGED_GROUPS: List[str] = []  # 默认开启对冲请求的路由组
+    MODEL_HEDGE_PERCENTILE: float = 0.95  # 首选后端超过该延迟分位仍未返回时发起对冲请求
+    MODEL_HEDGE_MIN_SAMPLES: int = 20  # 后端延迟样本数达到该值后才会对冲
+    MODEL_HEDGE_BUDGET: float = 0.1  # 对冲请求数占调用数的比例上限
+    MODEL_HEDGE_BUDGET_BURST: float = 10.0  # 对冲额度的累积上限
     
     # 重试/超时配置
     DEFAULT_RETRY_COUNT: int = 3
     DEFAULT_TIMEOUT: int = 30  # 秒
+    MODEL_RETRY_BACKOFF_BASE: float = 0.5  # 模型调用重试退避基数（秒），按指数增长并加入随机抖动
+    MODEL_RETRY_BACKOFF_MAX: float = 8.0  # 单次重试退避上限（秒）
+    MODEL_CIRCUIT_FAILURE_THRESHOLD: int = 5  # 提供商连续失败多少次后熔断
+    MODEL_CIRCUIT_RESET_TIMEOUT: float = 30.0  # 熔断后多少秒放行探测调用
+    
+    # 工作流配置
+    WORKFLOW_GRAPH_CACHE_SIZE: int = 128  # 已编译工作流图缓存容量
+    WORKFLOW_MAX_CONCURRENCY: int = 4  # 单个实例内并发执行的节点数上限
+    WORKFLOW_MAX_STEPS: int = 1000  # 有环工作流的最大执行步数
+    WORKFLOW_CHECKPOINT_BACKEND: str = "sqlite"  # 可选值: sqlite, memory
+    WORKFLOW_CHECKPOINT_PATH: str = "./workflow_data/checkpoints.sqlite3"
+    WORKFLOW_CHECKPOINT_BATCH_SIZE: int = 16  # 累计多少次状态变更后批量写入
+    WORKFLOW_CHECKPOINT_FLUSH_INTERVAL: float = 1.0  # 距上次写入超过该秒数时立即写入
+    WORKFLOW_WORKER_POOL_SIZE: int = 8  # 异步执行的后台 worker 数
+    WORKFLOW_QUEUE_SIZE: int = 100  # 异步执行等待队列容量，已满时返回 429
+    WORKFLOW_NODE_CACHE_SIZE: int = 1024  # 节点结果记忆化缓存容量
+    WORKFLOW_NODE_CACHE_TTL: float = 300.0  # 节点结果默认缓存时间（秒）
+    WORKFLOW_BATCH_CONCURRENCY: int = 16  # 批量执行时同时运行的实例数
+    WORKFLOW_INSTANCE_MAX_AGE: float = 86400.0  # 已结束实例在内存中的最长保留时间（秒），0 表示不限
+    WORKFLOW_INSTANCE_MAX_PER_WORKFLOW: int = 1000  # 每个工作流在内存中保留的最大实例数，0 表示不限
+    
+    # 知识库配置
+    KB_INGESTION_QUEUE_SIZE: int = 100  # 文档入库等待队列容量，已满时返回 429
+    KB_INGESTION_PARSE_PROCESSES: int = 0  # 文档解析/分块进程池大小，0 表示使用 CPU 核数
+    KB_INGESTION_EMBED_WORKERS: int = 4  # 向量化/写入阶段的并发 worker 数
+    KB_INGESTION_JOB_PATH: str = "./kb_data/ingestion_jobs.sqlite3"  # 入库任务状态存储路径
+    KB_EMBEDDING_PROVIDERS: Dict[str, Dict[str, Any]] = {}  # 向量化提供商连接配置，如 {"openai": {"api_key": "...", "base_url": "..."}}
+    KB_EMBEDDING_BATCH_SIZE: int = 256  # 单次向量化请求的最大文本数（不超过提供商上限）
+    KB_EMBEDDING_BATCH_TOKENS: int = 100000  # 单次向量化请求的最大估算 token 数
+    KB_EMBEDDING_CONCURRENCY: int = 8  # 每个向量化模型同时进行的请求数
+    KB_EMBEDDING_RATE_LIMITS: Dict[str, Dict[str, float]] = {}  # 按提供商配置的向量化限额，如 {"openai": {"rpm": 3000, "tpm": 1000000}}
+    KB_EMBEDDING_CACHE_ENABLED: bool = True  # 是否缓存文本向量，内容相同的文档块不重复向量化
+    KB_EMBEDDING_CACHE_PATH: str = "./kb_data/embedding_cache.sqlite3"  # 文本向量缓存存储路径
+    KB_EMBEDDING_CACHE_MAX_ENTRIES: int = 100000  # 文本向量缓存最大条目数，超出时淘汰最久未使用的条目
     
     # 日志配置
     LOG_LEVEL: str = "INFO"
@@ -2,6 +2,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import router as api_router
 from app.config import settings
+from app.services.knowledge_base import embedding_service, ingestion_job_store, knowledge_base_manager
+from app.services.model_gateway.gateway import model_gateway
+from app.services.workflow import checkpoint_store, workflow_worker_pool
 from app.utils.logger import logger
 from app.utils.observability import setup_observability
 
@@ -26,6 +29,20 @@ app.add_middleware(
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
+# Fail ingestion jobs interrupted by the previous shutdown
+@app.on_event("startup")
+async def startup():
+    ingestion_job_store.fail_interrupted()
+
+# Shutdown background workers and flush pending checkpoints
+@app.on_event("shutdown")
+async def shutdown():
+    await workflow_worker_pool.shutdown()
+    await knowledge_base_manager.ingestion.shutdown()
+    await embedding_service.aclose()
+    checkpoint_store.flush()
+    await model_gateway.aclose()
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -61,6 +61,22 @@ class DocumentUploadResponse(BaseModel):
     filename: str = Field(..., description="文件名")
     status: str = Field(..., description="处理状态")
     message: str = Field(..., description="响应消息")
+    job_id: Optional[str] = Field(default=None, description="入库任务ID，可通过任务接口查询处理进度")
+
+class IngestionJob(BaseModel):
+    """文档入库任务"""
+    job_id: str = Field(..., description="任务ID")
+    knowledge_base_id: str = Field(..., description="知识库ID")
+    document_id: str = Field(..., description="文档ID")
+    filename: str = Field(..., description="文件名")
+    status: str = Field(default="queued", description="任务状态: queued, parsing, embedding, completed, failed")
+    chunks_count: Optional[int] = Field(default=None, description="生成的块数量")
+    chunks_added: Optional[int] = Field(default=None, description="新增（需要向量化）的块数量")
+    chunks_updated: Optional[int] = Field(default=None, description="只更新元数据的块数量")
+    chunks_deleted: Optional[int] = Field(default=None, description="删除的块数量")
+    error_message: Optional[str] = Field(default=None, description="错误信息")
+    created_at: datetime = Field(..., description="创建时间")
+    updated_at: datetime = Field(..., description="更新时间")
 
 class DocumentStatusUpdate(BaseModel):
     """文档状态更新"""
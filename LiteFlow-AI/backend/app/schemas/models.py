@@ -39,6 +39,7 @@ class ChatCompletionRequest(BaseModel):
     stream: bool = Field(default=False, description="是否使用流式响应")
     api_key: Optional[str] = Field(default=None, description="API密钥")
     base_url: Optional[str] = Field(default=None, description="API基础URL")
+    cache: Optional[bool] = Field(default=None, description="是否使用响应缓存，为空时只缓存 temperature 为 0 的请求")
 
 
 class TextGenerationRequest(BaseModel):
@@ -50,6 +51,7 @@ class TextGenerationRequest(BaseModel):
     stream: bool = Field(default=False, description="是否使用流式响应")
     api_key: Optional[str] = Field(default=None, description="API密钥")
     base_url: Optional[str] = Field(default=None, description="API基础URL")
+    cache: Optional[bool] = Field(default=None, description="是否使用响应缓存，为空时只缓存 temperature 为 0 的请求")
 
 
 class ModelResponse(BaseModel):
@@ -79,3 +81,33 @@ class ModelListResponse(BaseModel):
     """模型列表响应"""
     models: List[ModelInfo] = Field(..., description="模型列表")
     provider: str = Field(..., description="模型提供商")
+
+
+class RoutingBackend(BaseModel):
+    """路由组中的后端模型"""
+    provider: str = Field(..., description="模型提供商")
+    model_name: str = Field(..., description="模型名称")
+    api_key: Optional[str] = Field(default=None, description="API密钥")
+    base_url: Optional[str] = Field(default=None, description="API基础URL")
+
+
+class RoutingBackendStats(BaseModel):
+    """路由后端统计信息（滚动窗口）"""
+    provider: str = Field(..., description="模型提供商")
+    model_name: str = Field(..., description="模型名称")
+    base_url: Optional[str] = Field(default=None, description="API基础URL")
+    requests: int = Field(default=0, description="累计请求数")
+    errors: int = Field(default=0, description="累计失败数")
+    in_flight: int = Field(default=0, description="进行中的请求数")
+    error_rate: float = Field(default=0.0, description="窗口内错误率")
+    latency_p50_ms: Optional[float] = Field(default=None, description="窗口内完整调用延迟 p50（毫秒）")
+    latency_p95_ms: Optional[float] = Field(default=None, description="窗口内完整调用延迟 p95（毫秒）")
+    first_token_p50_ms: Optional[float] = Field(default=None, description="窗口内流式首个片段延迟 p50（毫秒）")
+    first_token_p95_ms: Optional[float] = Field(default=None, description="窗口内流式首个片段延迟 p95（毫秒）")
+
+
+class RoutingGroupInfo(BaseModel):
+    """路由组信息"""
+    name: str = Field(..., description="路由组名称")
+    hedge: bool = Field(default=False, description="是否默认对冲调用")
+    backends: List[RoutingBackendStats] = Field(..., description="后端统计信息")
@@ -49,6 +49,18 @@ class WorkflowInstance(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.now, description="更新时间")
 
 
+class WorkflowInstanceListResponse(BaseModel):
+    """工作流实例分页列表响应"""
+    items: List[WorkflowInstance] = Field(..., description="实例列表（最新优先）")
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标，没有更多数据时为空")
+
+
+class WorkflowCheckpoint(BaseModel):
+    """工作流实例检查点"""
+    instance: WorkflowInstance = Field(..., description="实例状态（含已完成节点的执行历史）")
+    workflow: Optional[WorkflowDefinition] = Field(default=None, description="实例启动时的工作流定义快照")
+
+
 class WorkflowExecutionRequest(BaseModel):
     """工作流执行请求"""
     workflow_id: str = Field(..., description="工作流ID")
@@ -63,3 +75,21 @@ class WorkflowExecutionResponse(BaseModel):
     status: str = Field(..., description="执行状态")
     result: Optional[Dict[str, Any]] = Field(default=None, description="执行结果")
     error_message: Optional[str] = Field(default=None, description="错误信息")
+
+
+class WorkflowBatchResult(BaseModel):
+    """批量执行中单行输入的执行结果"""
+    row: int = Field(..., description="输入行号（从0开始）")
+    instance_id: Optional[str] = Field(default=None, description="实例ID，输入无效时为空")
+    status: Literal["completed", "failed", "invalid"] = Field(..., description="执行状态")
+    outputs: Optional[Dict[str, Any]] = Field(default=None, description="执行结果")
+    error_message: Optional[str] = Field(default=None, description="错误信息")
+    duration_ms: float = Field(default=0.0, description="执行耗时（毫秒）")
+
+
+class WorkflowStreamEvent(BaseModel):
+    """工作流流式执行事件"""
+    event: Literal["workflow_start", "node_start", "token", "node_end", "workflow_end"] = Field(..., description="事件类型")
+    instance_id: str = Field(..., description="实例ID")
+    node_id: Optional[str] = Field(default=None, description="节点ID")
+    data: Dict[str, Any] = Field(default_factory=dict, description="事件数据")
@@ -1,4 +1,21 @@
 from .knowledge_base_manager import KnowledgeBaseManager, knowledge_base_manager
 from .document_processor import DocumentProcessor
+from .embedding_cache import EmbeddingCacheStore, embedding_cache
+from .embeddings import BatchEmbedder, EmbeddingProvider, EmbeddingService, embedding_service
+from .ingestion import IngestionPipeline, IngestionJobStore, IngestionQueueFullError, ingestion_job_store
 
-__all__ = ["KnowledgeBaseManager", "knowledge_base_manager", "DocumentProcessor"]
+__all__ = [
+    "KnowledgeBaseManager",
+    "knowledge_base_manager",
+    "DocumentProcessor",
+    "EmbeddingCacheStore",
+    "embedding_cache",
+    "BatchEmbedder",
+    "EmbeddingProvider",
+    "EmbeddingService",
+    "embedding_service",
+    "IngestionPipeline",
+    "IngestionJobStore",
+    "IngestionQueueFullError",
+    "ingestion_job_store"
+]
@@ -1,4 +1,6 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 from pathlib import Path
 import pdfplumber
 import markdown
@@ -131,40 +133,125 @@ class DocumentProcessor:
         return chunks
     
     def _recursive_chunking(self, text: str, chunk_settings: ChunkSettings) -> List[DocumentChunk]:
-        """递归分块"""
-        chunks = []
+        """递归分块
+        
+        按分隔符优先级切分文本：在当前分隔符切出的片段中，把相邻片段贪心合并为不超过 chunk_size 的块，
+        相邻块之间重叠不超过 chunk_overlap 的完整片段；单个片段超过 chunk_size 时用下一级分隔符继续切分，
+        空字符串分隔符表示按 chunk_size 直接截断。分隔符保留在前一个片段末尾，块只去掉首尾空白。
+        片段和块都用原文中的偏移表示，切分使用显式栈迭代完成，不拼接字符串，整体耗时与文本长度呈线性关系。
+        """
+        chunk_size = chunk_settings.chunk_size
+        chunk_overlap = chunk_settings.chunk_overlap
+        
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be greater than 0")
+        
+        if chunk_overlap < 0:
+            raise ValueError("Chunk overlap must be non-negative")
+        
+        if chunk_overlap >= chunk_size:
+            raise ValueError("Chunk overlap must be less than chunk size")
+        
         separators = chunk_settings.separators or ["\n\n", "\n", " ", ""]
         
-        def _recursive_split(chunk: str, current_separator_idx: int) -> None:
-            """递归分割函数"""
-            if len(chunk) <= chunk_settings.chunk_size or current_separator_idx >= len(separators):
-                chunks.append(DocumentChunk(
-                    content=chunk,
-                    metadata={
-                        "chunk_index": len(chunks),
-                        "chunk_strategy": "recursive",
-                        "chunk_size": chunk_settings.chunk_size,
-                        "chunk_overlap": chunk_settings.chunk_overlap
-                    }
-                ))
-                return
-            
-            separator = separators[current_separator_idx]
-            parts = chunk.split(separator)
-            
-            current_chunk = ""
-            for part in parts:
-                test_chunk = current_chunk + (separator if current_chunk else "") + part
+        chunks = []
+        # 显式栈：第 i 层是用第 i - 1 级分隔符切分得到、尚未处理的区间
+        stack: List[Iterator[Tuple[int, int]]] = [iter([(0, len(text))])]
+        while stack:
+            level = len(stack) - 1
+            for start, end in stack[-1]:
+                if end - start > chunk_size and level < len(separators):
+                    stack.append(iter(
+                        self._merge_spans(text, start, end, separators[level], chunk_size, chunk_overlap)
+                    ))
+                    break
                 
-                if len(test_chunk) > chunk_settings.chunk_size:
-                    if current_chunk:
-                        _recursive_split(current_chunk, current_separator_idx + 1)
-                    current_chunk = part
-                else:
-                    current_chunk = test_chunk
-            
-            if current_chunk:
-                _recursive_split(current_chunk, current_separator_idx + 1)
+                # 所有分隔符都用尽后仍超长的片段原样作为一个块，块只去掉首尾空白
+                content = text[start:end]
+                stripped = content.lstrip()
+                start += len(content) - len(stripped)
+                content = stripped.rstrip()
+                if content:
+                    # 重叠较大时去掉空白后的块可能被前一个块包含（跳过），或与前一个块起点相同（替换前一个块）
+                    if chunks and start + len(content) <= chunks[-1].metadata["end_offset"]:
+                        continue
+                    if chunks and start == chunks[-1].metadata["start_offset"]:
+                        chunks.pop()
+                    chunks.append(DocumentChunk(
+                        content=content,
+                        metadata={
+                            "chunk_index": len(chunks),
+                            "chunk_strategy": "recursive",
+                            "chunk_size": chunk_size,
+                            "chunk_overlap": chunk_overlap,
+                            "start_offset": start,
+                            "end_offset": start + len(content)
+                        }
+                    ))
+            else:
+                stack.pop()
         
-        _recursive_split(text, 0)
         return chunks
+    
+    def _merge_spans(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        separator: str,
+        chunk_size: int,
+        chunk_overlap: int
+    ) -> List[Tuple[int, int]]:
+        """用一个分隔符切分 text[start:end]，按顺序返回合并后的 (起始, 结束) 区间
+        
+        区间要么是不超过 chunk_size 的块，要么是需要用下一级分隔符继续切分的单个超长片段。
+        """
+        if not separator:
+            step = chunk_size - chunk_overlap
+            return [
+                (position, min(position + chunk_size, end))
+                for position in range(start, max(end - chunk_overlap, start + 1), step)
+            ]
+        
+        # 片段边界偏移：bounds[i] 到 bounds[i + 1] 是第 i 个片段（含其后的分隔符）
+        bounds = list(accumulate(
+            map(len(separator).__add__, map(len, text[start:end].split(separator))),
+            initial=start
+        ))
+        bounds[-1] = end
+        last = len(bounds) - 1
+        
+        spans = []
+        i = 0
+        while i < last:
+            # 从第 i 个边界开始能容纳的最远边界
+            j = bisect_right(bounds, bounds[i] + chunk_size, i + 1) - 1
+            if j == i:
+                spans.append((bounds[i], bounds[i + 1]))
+                i += 1
+                continue
+            
+            spans.append((bounds[i], bounds[j]))
+            if j == last:
+                break
+            
+            # 下一个块从末尾不超过 chunk_overlap 的完整片段开始，且必须能容纳下一个片段
+            if bounds[j] - bounds[j - 1] > chunk_overlap:
+                i = j
+                continue
+            k = bisect_left(bounds, bounds[j] - chunk_overlap, i + 1, j)
+            i = bisect_left(bounds, bounds[j + 1] - chunk_size, k, j)
+        
+        return spans
+
+
+# 进程池 worker 内复用的文档处理器
+_worker_processor: Optional[DocumentProcessor] = None
+
+
+def chunk_document(file_path: str, chunk_settings: ChunkSettings) -> List[DocumentChunk]:
+    """解析并分块文档，供入库流水线在进程池中调用（模块级函数以便跨进程传递）"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor()
+    return _worker_processor.process_document(file_path, chunk_settings)
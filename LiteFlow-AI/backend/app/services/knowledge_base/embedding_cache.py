@@ -0,0 +1,143 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.observability import KB_EMBEDDING_CACHE_HITS, KB_EMBEDDING_CACHE_MISSES
+
+# 单条 SQL 中 IN 列表的最大参数数，低于 SQLite 默认上限
+_QUERY_BATCH_SIZE = 500
+
+
+def text_hash(text: str) -> str:
+    """计算文本内容哈希"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheStore:
+    """基于本地SQLite文件的文本向量缓存
+    
+    键为 (嵌入模型, 文本 SHA-256)，向量以 float32 二进制保存。命中时更新最近使用时间，
+    条目数超过 max_entries 时淘汰最久未使用的条目（LRU）。读写都是阻塞 I/O，由调用方在线程中执行。
+    """
+    
+    def __init__(
+        self,
+        path: str = settings.KB_EMBEDDING_CACHE_PATH,
+        max_entries: int = settings.KB_EMBEDDING_CACHE_MAX_ENTRIES
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.max_entries = max_entries
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS kb_embedding_cache (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_kb_embedding_cache_last_used ON kb_embedding_cache (last_used)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._count = self._connection.execute("SELECT COUNT(*) FROM kb_embedding_cache").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+    
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """批量查找向量，返回命中的 文本哈希 -> 向量"""
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        
+        with self._lock, self._connection:
+            for start in range(0, len(hashes), _QUERY_BATCH_SIZE):
+                batch = hashes[start:start + _QUERY_BATCH_SIZE]
+                placeholders = ", ".join("?" for _ in batch)
+                rows = self._connection.execute(
+                    f"SELECT text_hash, embedding FROM kb_embedding_cache WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                
+                # 更新命中条目的最近使用时间
+                if rows:
+                    self._connection.executemany(
+                        "UPDATE kb_embedding_cache SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(now, model, key) for key, _ in rows]
+                    )
+            
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        
+        KB_EMBEDDING_CACHE_HITS.inc(len(found))
+        KB_EMBEDDING_CACHE_MISSES.inc(len(hashes) - len(found))
+        return found
+    
+    def set_many(self, model: str, embeddings: Dict[str, List[float]]) -> None:
+        """批量写入向量，超出容量时淘汰最久未使用的条目"""
+        if not embeddings:
+            return
+        
+        now = time.time()
+        rows = [(model, key, array("f", embedding).tobytes(), now) for key, embedding in embeddings.items()]
+        try:
+            with self._lock, self._connection:
+                before = self._connection.total_changes
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO kb_embedding_cache (model, text_hash, embedding, last_used) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._count += self._connection.total_changes - before
+                
+                excess = self._count - self.max_entries
+                if excess > 0:
+                    before = self._connection.total_changes
+                    self._connection.execute(
+                        """
+                        DELETE FROM kb_embedding_cache WHERE (model, text_hash) IN (
+                            SELECT model, text_hash FROM kb_embedding_cache ORDER BY last_used LIMIT ?
+                        )
+                        """,
+                        (excess,)
+                    )
+                    self._count -= self._connection.total_changes - before
+        except Exception as e:
+            # 缓存写入失败不影响入库，下次遇到相同文本时重新向量化
+            logger.error(f"Failed to write embedding cache: {str(e)}")
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM kb_embedding_cache")
+            self._count = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+# 创建全局文本向量缓存实例
+embedding_cache = EmbeddingCacheStore()
@@ -0,0 +1,309 @@
+import asyncio
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from ollama import AsyncClient as OllamaClient
+from openai import AsyncOpenAI
+from app.config import settings
+from app.schemas.knowledge_base import EmbeddingSettings
+from app.services.knowledge_base.embedding_cache import EmbeddingCacheStore, embedding_cache, text_hash
+from app.services.model_gateway.http_pool import HTTPConnectionPool
+from app.services.model_gateway.rate_limit import RateLimiter, estimate_tokens
+from app.services.model_gateway.resilience import is_retryable, retry_after_seconds
+from app.utils.logger import logger
+from app.utils.observability import KB_EMBEDDED_TEXTS, KB_EMBEDDING_REQUEST_DURATION
+
+# 向量化器键：(提供商, 模型名称, 向量维度)
+EmbedderKey = Tuple[str, str, int]
+
+DEFAULT_OLLAMA_BASE_URL = "http://localhost:11434"
+
+
+class EmbeddingProvider(ABC):
+    """向量化提供商抽象基类"""
+    
+    # 提供商单次请求允许的最大文本数
+    max_batch_size: int = 2048
+    
+    def __init__(self, model_name: str, dimensions: Optional[int] = None):
+        self.model_name = model_name
+        self.dimensions = dimensions
+    
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """向量化一批文本，结果与输入顺序一致"""
+        pass
+    
+    async def aclose(self) -> None:
+        """关闭客户端连接"""
+        pass
+    
+    @property
+    @abstractmethod
+    def provider(self) -> str:
+        """获取提供商名称"""
+        pass
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI向量化提供商，一次请求向量化整批文本"""
+    
+    max_batch_size = 2048
+    
+    def __init__(
+        self,
+        model_name: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        http_client=None
+    ):
+        super().__init__(model_name, dimensions)
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=http_client,
+            # 重试由 BatchEmbedder 统一处理
+            max_retries=0,
+        )
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        # 只有 text-embedding-3 系列支持 dimensions，未配置时不传；
+        # 当前 SDK 的 embeddings.create 没有 dimensions 参数，通过 extra_body 写入请求体
+        extra_body = {"dimensions": self.dimensions} if self.dimensions else None
+        response = await self.client.embeddings.create(model=self.model_name, input=texts, extra_body=extra_body)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
+    async def aclose(self) -> None:
+        await self.client.close()
+    
+    @property
+    def provider(self) -> str:
+        return "openai"
+
+
+class OllamaEmbeddingProvider(EmbeddingProvider):
+    """Ollama向量化提供商"""
+    
+    # 当前使用的 ollama 客户端每次请求只能向量化一条文本，并发由 BatchEmbedder 控制
+    max_batch_size = 1
+    
+    def __init__(self, model_name: str, base_url: str = DEFAULT_OLLAMA_BASE_URL, transport=None):
+        super().__init__(model_name)
+        self.client = OllamaClient(host=base_url, transport=transport)
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [
+            list((await self.client.embeddings(model=self.model_name, prompt=text))["embedding"])
+            for text in texts
+        ]
+    
+    @property
+    def provider(self) -> str:
+        return "ollama"
+
+
+class BatchEmbedder:
+    """批量并发向量化器
+    
+    按提供商允许的最大文本数和 KB_EMBEDDING_BATCH_SIZE、KB_EMBEDDING_BATCH_TOKENS 把文本切分为请求批次，
+    批次在并发上限内同时请求，每次请求前从限流器获取请求数和 token 额度（后台任务不设等待上限）。
+    限流、服务端错误和连接错误按指数退避重试，优先遵循 Retry-After。结果按输入顺序返回。
+    配置了向量缓存时先按 (模型, 文本哈希) 查找，只向量化未命中且去重后的文本。
+    """
+    
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        batch_size: int = settings.KB_EMBEDDING_BATCH_SIZE,
+        batch_tokens: int = settings.KB_EMBEDDING_BATCH_TOKENS,
+        concurrency: int = settings.KB_EMBEDDING_CONCURRENCY,
+        limiter: Optional[RateLimiter] = None,
+        retries: int = settings.DEFAULT_RETRY_COUNT,
+        cache: Optional[EmbeddingCacheStore] = None
+    ):
+        if concurrency < 1:
+            raise ValueError("Embedding concurrency must be at least 1")
+        
+        self.provider = provider
+        self.batch_size = max(1, min(batch_size, provider.max_batch_size))
+        self.batch_tokens = batch_tokens
+        self.limiter = limiter
+        self.retries = retries
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(concurrency)
+    
+    def batches(self, texts: List[str]) -> List[Tuple[int, int, int]]:
+        """切分请求批次，返回 (起始位置, 结束位置, 估算 token 数) 列表"""
+        batches = []
+        start, tokens = 0, 0
+        for i, text in enumerate(texts):
+            text_tokens = estimate_tokens(text)
+            if i > start and (i - start >= self.batch_size or tokens + text_tokens > self.batch_tokens):
+                batches.append((start, i, tokens))
+                start, tokens = i, 0
+            tokens += text_tokens
+        if start < len(texts):
+            batches.append((start, len(texts), tokens))
+        return batches
+    
+    @property
+    def model_key(self) -> str:
+        """缓存使用的模型标识"""
+        return f"{self.provider.provider}:{self.provider.model_name}:{self.provider.dimensions or 0}"
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """向量化文本列表"""
+        if not texts:
+            return []
+        if self.cache is None or not settings.KB_EMBEDDING_CACHE_ENABLED:
+            return await self._embed_all(texts)
+        
+        hashes = [text_hash(text) for text in texts]
+        embeddings = await asyncio.to_thread(self.cache.get_many, self.model_key, hashes)
+        
+        # 未命中的文本去重后向量化，并写回缓存
+        missing: Dict[str, str] = {}
+        for key, text in zip(hashes, texts):
+            if key not in embeddings:
+                missing.setdefault(key, text)
+        if missing:
+            fresh = dict(zip(missing, await self._embed_all(list(missing.values()))))
+            await asyncio.to_thread(self.cache.set_many, self.model_key, fresh)
+            embeddings.update(fresh)
+        
+        return [embeddings[key] for key in hashes]
+    
+    async def _embed_all(self, texts: List[str]) -> List[List[float]]:
+        """分批并发向量化全部文本"""
+        results = await asyncio.gather(*[
+            self._embed_batch(texts[start:end], tokens)
+            for start, end, tokens in self.batches(texts)
+        ])
+        return [embedding for batch in results for embedding in batch]
+    
+    async def _embed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        """带限流和重试地请求一个批次"""
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                if self.limiter is not None:
+                    await self.limiter.acquire(tokens)
+                started = time.perf_counter()
+                try:
+                    embeddings = await self.provider.embed(texts)
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.retries:
+                        raise
+                    error = e
+                else:
+                    KB_EMBEDDING_REQUEST_DURATION.labels(provider=self.provider.provider).observe(
+                        time.perf_counter() - started
+                    )
+                    if len(embeddings) != len(texts):
+                        raise ValueError(
+                            f"Embedding provider returned {len(embeddings)} vectors for {len(texts)} texts"
+                        )
+                    KB_EMBEDDED_TEXTS.labels(provider=self.provider.provider).inc(len(texts))
+                    return embeddings
+            
+            # 退避等待时释放并发名额
+            delay = retry_after_seconds(error)
+            if delay is None:
+                delay = random.uniform(
+                    0, min(settings.MODEL_RETRY_BACKOFF_MAX, settings.MODEL_RETRY_BACKOFF_BASE * (2 ** attempt))
+                )
+            logger.warning(
+                f"{self.provider.provider} embedding request failed ({type(error).__name__}: {str(error)}), "
+                f"retrying in {delay:.2f}s (attempt {attempt + 1}/{self.retries})"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+class EmbeddingService:
+    """按知识库的 EmbeddingSettings 提供批量向量化器
+    
+    同一 (提供商, 模型, 维度) 共用一个向量化器，即共用并发上限；同一提供商的向量化器共用一个限流器，
+    限额来自 KB_EMBEDDING_RATE_LIMITS。提供商的连接配置（api_key、base_url）来自 KB_EMBEDDING_PROVIDERS，
+    OpenAI 未配置 api_key 时使用 SDK 默认的 OPENAI_API_KEY 环境变量。所有向量化器共用同一个向量缓存。
+    """
+    
+    def __init__(
+        self,
+        http_pool: Optional[HTTPConnectionPool] = None,
+        cache: Optional[EmbeddingCacheStore] = None
+    ):
+        self.http_pool = http_pool or HTTPConnectionPool()
+        self.cache = cache or embedding_cache
+        self._embedders: Dict[EmbedderKey, BatchEmbedder] = {}
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, embedding_settings: EmbeddingSettings) -> BatchEmbedder:
+        """获取向量化器，不存在时创建"""
+        key: EmbedderKey = (
+            embedding_settings.provider,
+            embedding_settings.model_name,
+            embedding_settings.dimensions or 0
+        )
+        with self._lock:
+            embedder = self._embedders.get(key)
+            if embedder is None:
+                provider = self._create_provider(embedding_settings)
+                embedder = self._embedders[key] = BatchEmbedder(
+                    provider, limiter=self._limiter(embedding_settings.provider), cache=self.cache
+                )
+                logger.info(f"Created embedder: {embedding_settings.provider}:{embedding_settings.model_name}")
+            return embedder
+    
+    def _limiter(self, provider: str) -> Optional[RateLimiter]:
+        limit = settings.KB_EMBEDDING_RATE_LIMITS.get(provider)
+        if not limit:
+            return None
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            limiter = self._limiters[provider] = RateLimiter(
+                f"embedding:{provider}", rpm=limit.get("rpm"), tpm=limit.get("tpm"), max_wait=math.inf
+            )
+        return limiter
+    
+    def _create_provider(self, embedding_settings: EmbeddingSettings) -> EmbeddingProvider:
+        """根据提供商创建向量化提供商实例"""
+        provider = embedding_settings.provider
+        connection = settings.KB_EMBEDDING_PROVIDERS.get(provider, {})
+        
+        if provider == "openai":
+            return OpenAIEmbeddingProvider(
+                embedding_settings.model_name,
+                api_key=connection.get("api_key"),
+                base_url=connection.get("base_url"),
+                dimensions=embedding_settings.dimensions,
+                http_client=self.http_pool.create_client()
+            )
+        elif provider == "ollama":
+            return OllamaEmbeddingProvider(
+                embedding_settings.model_name,
+                base_url=connection.get("base_url") or DEFAULT_OLLAMA_BASE_URL,
+                transport=self.http_pool.transport()
+            )
+        else:
+            raise ValueError(f"Unsupported embedding provider: {provider}")
+    
+    async def aclose(self) -> None:
+        """关闭所有提供商客户端和连接池"""
+        with self._lock:
+            embedders, self._embedders = list(self._embedders.values()), {}
+        for embedder in embedders:
+            try:
+                await embedder.provider.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close embedding provider {embedder.provider.provider}: {str(e)}")
+        await self.http_pool.aclose()
+
+
+# 创建全局向量化服务实例
+embedding_service = EmbeddingService()
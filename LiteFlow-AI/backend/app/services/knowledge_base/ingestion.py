@@ -0,0 +1,368 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.schemas.knowledge_base import ChunkSettings, DocumentStatusUpdate, IngestionJob
+from app.services.knowledge_base.document_processor import DocumentChunk, chunk_document
+from app.utils.logger import logger
+from app.utils.observability import KB_INGESTION_JOBS, KB_INGESTION_STAGE_DURATION
+
+# 尚未结束的任务状态
+ACTIVE_JOB_STATUSES = ("queued", "parsing", "embedding")
+
+# 任务状态对应的文档状态
+DOCUMENT_STATUS = {
+    "queued": "pending",
+    "parsing": "processing",
+    "embedding": "processing",
+    "completed": "completed",
+    "failed": "failed"
+}
+
+
+class IngestionQueueFullError(Exception):
+    """文档入库队列已满"""
+    pass
+
+
+class IngestionJobStore:
+    """基于本地SQLite文件的入库任务状态存储
+    
+    每个任务只有少数几次状态变更，每次变更立即写入，进程重启后仍可查询任务结果。
+    服务启动时调用 fail_interrupted，将上次进程退出时仍处于排队或处理中的任务标记为失败；
+    构造函数本身不修改任务状态，因为解析进程池的子进程（spawn/forkserver 启动方式）导入本模块时也会创建存储实例。
+    """
+    
+    def __init__(self, path: str = settings.KB_INGESTION_JOB_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS kb_ingestion_jobs (
+                job_id TEXT PRIMARY KEY,
+                knowledge_base_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                job_data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_kb_ingestion_jobs_kb ON kb_ingestion_jobs (knowledge_base_id, created_at)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+    
+    def fail_interrupted(self) -> int:
+        """将上次进程退出时未完成的任务标记为失败（只能在服务启动、流水线接收任务之前调用），返回任务数"""
+        placeholders = ", ".join("?" for _ in ACTIVE_JOB_STATUSES)
+        rows = self._connection.execute(
+            f"SELECT job_data FROM kb_ingestion_jobs WHERE status IN ({placeholders})",
+            ACTIVE_JOB_STATUSES
+        ).fetchall()
+        for (job_data,) in rows:
+            job = IngestionJob.model_validate_json(job_data)
+            job.status = "failed"
+            job.error_message = "Ingestion interrupted by service restart"
+            job.updated_at = datetime.utcnow()
+            self.save(job)
+        
+        if rows:
+            logger.warning(f"Marked {len(rows)} interrupted ingestion job(s) as failed")
+        return len(rows)
+    
+    def save(self, job: IngestionJob) -> None:
+        """写入任务状态"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                INSERT INTO kb_ingestion_jobs (job_id, knowledge_base_id, status, job_data, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    status = excluded.status,
+                    job_data = excluded.job_data
+                """,
+                (job.job_id, job.knowledge_base_id, job.status, job.model_dump_json(), job.created_at.timestamp())
+            )
+    
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """获取任务"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT job_data FROM kb_ingestion_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return IngestionJob.model_validate_json(row[0]) if row else None
+    
+    def list_jobs(self, kb_id: str, status: Optional[str] = None, limit: int = 100) -> List[IngestionJob]:
+        """按创建时间倒序列出知识库的任务"""
+        query = "SELECT job_data FROM kb_ingestion_jobs WHERE knowledge_base_id = ?"
+        params: List[Any] = [kb_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [IngestionJob.model_validate_json(row[0]) for row in rows]
+
+
+class IngestionPipeline:
+    """知识库文档入库流水线
+    
+    上传的文档作为任务进入有界队列后立即返回，队列已满时拒绝提交，由调用方返回背压信号。
+    解析阶段的 worker 把文档交给进程池完成解析和分块，不占用事件循环和 GIL，批量上传时可以占满所有 CPU 核；
+    分块结果进入容量较小的中间队列，由向量化阶段的 worker 与文档已存储的块比对，按知识库的嵌入模型配置
+    批量并发向量化新增的块后写入 Chroma（重新索引已有文档时只处理有变化的块），
+    中间队列已满时解析阶段等待，避免分块结果在内存中堆积。任务状态的每次变更同步到知识库中的文档状态，
+    并把任务快照交给写入 worker 按变更顺序在线程中写入任务存储，SQLite 提交不阻塞事件循环；
+    尚未写入的快照保留在内存中，查询任务时优先返回。
+    """
+    
+    def __init__(
+        self,
+        manager,
+        store: IngestionJobStore,
+        processes: int = settings.KB_INGESTION_PARSE_PROCESSES,
+        embed_workers: int = settings.KB_INGESTION_EMBED_WORKERS,
+        queue_size: int = settings.KB_INGESTION_QUEUE_SIZE
+    ):
+        if embed_workers < 1:
+            raise ValueError("Ingestion embed worker count must be at least 1")
+        
+        self.manager = manager
+        self.store = store
+        self.processes = processes or os.cpu_count() or 1
+        self.embed_workers = embed_workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._chunk_queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        self._writes: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._unsaved: Dict[str, IngestionJob] = {}
+    
+    def submit(self, job: IngestionJob, file_path: str, chunk_settings: ChunkSettings) -> None:
+        """提交入库任务，队列已满时抛出 IngestionQueueFullError
+        
+        提交成功后文件归流水线所有，解析完成（或失败）后删除。
+        """
+        self._ensure_started()
+        
+        try:
+            self._queue.put_nowait((job, file_path, chunk_settings))
+        except asyncio.QueueFull:
+            KB_INGESTION_JOBS.labels(status="rejected").inc()
+            raise IngestionQueueFullError(
+                f"Knowledge base ingestion queue is full ({self.queue_size} pending documents)"
+            )
+        
+        self._persist(job)
+        logger.info(f"Ingestion job queued: {job.job_id} ({job.filename})")
+    
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        """获取任务，尚未写入任务存储的状态优先"""
+        return self._unsaved.get(job_id) or self.store.get(job_id)
+    
+    def list_jobs(self, kb_id: str, status: Optional[str] = None, limit: int = 100) -> List[IngestionJob]:
+        """按创建时间倒序列出知识库的任务，尚未写入任务存储的状态优先"""
+        jobs = {job.job_id: job for job in self.store.list_jobs(kb_id, status=status, limit=limit)}
+        for job in list(self._unsaved.values()):
+            if job.knowledge_base_id != kb_id:
+                continue
+            if status is None or job.status == status:
+                jobs[job.job_id] = job
+            else:
+                jobs.pop(job.job_id, None)
+        return sorted(jobs.values(), key=lambda job: job.created_at, reverse=True)[:limit]
+    
+    def _ensure_started(self) -> None:
+        """在当前事件循环中启动进程池和 worker"""
+        if self._workers:
+            return
+        
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._chunk_queue = asyncio.Queue(maxsize=self.embed_workers * 2)
+        self._writes = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_worker(), name="ingestion-writer")
+        self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        self._workers = [
+            asyncio.create_task(self._parse_worker(), name=f"ingestion-parse-{i}")
+            for i in range(self.processes)
+        ] + [
+            asyncio.create_task(self._embed_worker(), name=f"ingestion-embed-{i}")
+            for i in range(self.embed_workers)
+        ]
+        logger.info(
+            f"Ingestion pipeline started with {self.processes} parse processes and {self.embed_workers} embed workers"
+        )
+    
+    def _set_status(self, job: IngestionJob, status: str, **fields) -> None:
+        """更新任务状态并同步文档状态"""
+        job.status = status
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated_at = datetime.utcnow()
+        self._persist(job)
+        
+        self.manager.update_document_status(
+            job.knowledge_base_id,
+            job.document_id,
+            DocumentStatusUpdate(
+                status=DOCUMENT_STATUS[status],
+                error_message=job.error_message,
+                chunks_count=job.chunks_count
+            )
+        )
+        if status in ("completed", "failed"):
+            KB_INGESTION_JOBS.labels(status=status).inc()
+    
+    def _persist(self, job: IngestionJob) -> None:
+        """记录任务当前状态的快照，由写入 worker 按顺序写入任务存储"""
+        snapshot = job.model_copy()
+        self._unsaved[job.job_id] = snapshot
+        self._writes.put_nowait(snapshot)
+    
+    async def _write_worker(self) -> None:
+        """循环取出任务快照，在线程中写入任务存储"""
+        while True:
+            job = await self._writes.get()
+            try:
+                await asyncio.to_thread(self.store.save, job)
+            except Exception as e:
+                logger.error(f"Failed to save ingestion job {job.job_id}: {str(e)}")
+            finally:
+                if self._unsaved.get(job.job_id) is job:
+                    del self._unsaved[job.job_id]
+                self._writes.task_done()
+    
+    def _fail(self, job: IngestionJob, exc: Exception) -> None:
+        logger.error(f"Ingestion job {job.job_id} failed ({job.filename}): {str(exc)}")
+        self._set_status(job, "failed", error_message=str(exc))
+    
+    async def _parse(self, file_path: str, chunk_settings: ChunkSettings) -> List[DocumentChunk]:
+        """在进程池中解析并分块，进程池损坏（如子进程被杀死）时重建"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool, chunk_document, file_path, chunk_settings)
+        except BrokenProcessPool:
+            logger.error("Ingestion process pool is broken, restarting it")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            raise
+    
+    async def _parse_worker(self) -> None:
+        """循环取出任务，解析分块后交给向量化阶段"""
+        while True:
+            job, file_path, chunk_settings = await self._queue.get()
+            chunks: Optional[List[DocumentChunk]] = None
+            try:
+                self._set_status(job, "parsing")
+                started = time.perf_counter()
+                chunks = await self._parse(file_path, chunk_settings)
+                KB_INGESTION_STAGE_DURATION.labels(stage="parse").observe(time.perf_counter() - started)
+            except Exception as e:
+                self._fail(job, e)
+            finally:
+                self._remove_file(file_path)
+                self._queue.task_done()
+            
+            if chunks is not None:
+                await self._chunk_queue.put((job, chunks))
+    
+    async def _embed_worker(self) -> None:
+        """循环取出分块结果，与已存储的块比对，向量化新增的块后写入知识库"""
+        while True:
+            job, chunks = await self._chunk_queue.get()
+            try:
+                self._set_status(job, "embedding")
+                diff = await asyncio.to_thread(
+                    self.manager.diff_chunks, job.knowledge_base_id, job.document_id, job.filename, chunks
+                )
+                
+                # 只向量化新增的块
+                started = time.perf_counter()
+                embedder = self.manager.get_embedder(job.knowledge_base_id)
+                embeddings = await embedder.embed(diff.added_documents)
+                KB_INGESTION_STAGE_DURATION.labels(stage="embed").observe(time.perf_counter() - started)
+                
+                started = time.perf_counter()
+                await asyncio.to_thread(self.manager.apply_chunk_diff, job.knowledge_base_id, diff, embeddings)
+                KB_INGESTION_STAGE_DURATION.labels(stage="store").observe(time.perf_counter() - started)
+                self._set_status(
+                    job,
+                    "completed",
+                    chunks_count=len(chunks),
+                    chunks_added=len(diff.added_ids),
+                    chunks_updated=len(diff.updated_ids),
+                    chunks_deleted=len(diff.deleted_ids)
+                )
+                logger.info(f"Ingestion job {job.job_id} completed with {len(chunks)} chunks")
+            except Exception as e:
+                self._fail(job, e)
+            finally:
+                self._chunk_queue.task_done()
+    
+    @staticmethod
+    def _remove_file(file_path: str) -> None:
+        try:
+            os.unlink(file_path)
+        except OSError as e:
+            logger.warning(f"Failed to remove ingestion file {file_path}: {str(e)}")
+    
+    async def join(self) -> None:
+        """等待已提交的任务全部处理完成"""
+        if self._workers:
+            await self._queue.join()
+            await self._chunk_queue.join()
+            await self._writes.join()
+    
+    async def shutdown(self) -> None:
+        """停止 worker 和进程池，写完已变更的任务状态，未完成的任务在下次启动时标记为失败"""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        
+        if self._writer is not None:
+            await self._writes.join()
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+            self._writes = None
+        
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._queue = None
+        self._chunk_queue = None
+        
+        if workers:
+            logger.info("Ingestion pipeline stopped")
+    
+    def stats(self) -> Dict[str, int]:
+        """获取流水线统计信息"""
+        return {
+            "parse_processes": self.processes,
+            "embed_workers": self.embed_workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "parsed": self._chunk_queue.qsize() if self._chunk_queue else 0,
+            "queue_size": self.queue_size
+        }
+
+
+# 创建全局入库任务存储实例
+ingestion_job_store = IngestionJobStore()
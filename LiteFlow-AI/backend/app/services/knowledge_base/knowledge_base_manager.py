@@ -1,16 +1,33 @@
-from typing import List, Optional, Dict, Any
+import asyncio
+import os
+from typing import List, NamedTuple, Optional, Dict, Any
 from uuid import uuid4
 from datetime import datetime
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from app.schemas.knowledge_base import (
     KnowledgeBase, KnowledgeBaseCreate, KnowledgeBaseUpdate,
-    DocumentInfo, DocumentUploadResponse, DocumentStatusUpdate,
-    SearchResponse, SearchResult
+    ChunkSettings, DocumentInfo, DocumentUploadResponse, DocumentStatusUpdate,
+    IngestionJob, SearchResponse, SearchResult
 )
 from app.config import settings
 from app.utils.logger import logger
-from app.services.knowledge_base.document_processor import DocumentProcessor
+from app.services.knowledge_base.document_processor import DocumentChunk, DocumentProcessor
+from app.services.knowledge_base.embedding_cache import text_hash
+from app.services.knowledge_base.embeddings import BatchEmbedder, embedding_service
+from app.services.knowledge_base.ingestion import IngestionPipeline, ingestion_job_store
+
+
+class ChunkDiff(NamedTuple):
+    """文档新分块与已存储块的差异"""
+    added_ids: List[str]
+    added_documents: List[str]
+    added_metadatas: List[Dict[str, Any]]
+    updated_ids: List[str]
+    updated_metadatas: List[Dict[str, Any]]
+    deleted_ids: List[str]
+    unchanged: List[str]
+
 
 class KnowledgeBaseManager:
     """知识库管理器"""
@@ -27,6 +44,9 @@ class KnowledgeBaseManager:
         # 初始化文档处理器
         self.document_processor = DocumentProcessor()
         
+        # 初始化文档入库流水线
+        self.ingestion = IngestionPipeline(self, ingestion_job_store)
+        
         # 存储知识库元数据
         self.knowledge_bases: Dict[str, KnowledgeBase] = {}
         
@@ -150,7 +170,11 @@ class KnowledgeBaseManager:
                        chunk_overlap: Optional[int] = None, 
                        chunking_strategy: Optional[str] = None, 
                        separators: Optional[List[str]] = None) -> DocumentUploadResponse:
-        """上传文档到知识库"""
+        """上传文档到知识库
+        
+        文档作为入库任务提交到后台流水线后立即返回，提交成功后 file_path 由流水线在解析完成后删除；
+        入库队列已满时抛出 IngestionQueueFullError。
+        """
         try:
             knowledge_base = self.knowledge_bases.get(kb_id)
             if not knowledge_base:
@@ -164,111 +188,204 @@ class KnowledgeBaseManager:
                 id=document_id,
                 filename=filename,
                 file_type=filename.split('.')[-1] if '.' in filename else 'unknown',
-                size=0,  # 实际应获取文件大小
+                size=os.path.getsize(file_path),
                 status="pending",
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow()
             )
             
-            # 添加到知识库
+            # 提交入库任务，队列已满时文档不加入知识库
+            job = self._submit_ingestion(
+                knowledge_base, document_id, file_path, filename,
+                chunk_size, chunk_overlap, chunking_strategy, separators
+            )
+            
+            # 添加到知识库（提交与添加之间没有让出事件循环，worker 更新状态时文档已存在）
             knowledge_base.documents.append(document_info)
             self._save_knowledge_bases()
             
-            # 异步处理文档
-            # 简化实现，实际应使用异步任务队列
-            self._process_document(kb_id, document_id, file_path, knowledge_base, 
-                                 chunk_size, chunk_overlap, chunking_strategy, separators)
-            
             logger.info(f"Uploaded document to knowledge base {kb_id}: {document_id} - {filename}")
             return DocumentUploadResponse(
                 document_id=document_id,
                 filename=filename,
                 status="pending",
-                message="Document uploaded successfully, processing in background"
+                message="Document uploaded successfully, processing in background",
+                job_id=job.job_id
             )
             
         except Exception as e:
             logger.error(f"Error uploading document: {str(e)}")
             raise
     
-    def _process_document(self, kb_id: str, document_id: str, file_path: str, knowledge_base: KnowledgeBase, 
+    def reindex_document(self, kb_id: str, document_id: str, file_path: str, filename: str, 
                          chunk_size: Optional[int] = None, 
                          chunk_overlap: Optional[int] = None, 
                          chunking_strategy: Optional[str] = None, 
-                         separators: Optional[List[str]] = None):
-        """处理文档（解析和向量化）"""
+                         separators: Optional[List[str]] = None) -> DocumentUploadResponse:
+        """用新版本文件重新索引已有文档
+        
+        与上传相同由后台流水线处理：重新分块后按内容哈希与已存储的块比对，只向量化新增的块，
+        删除已不存在的块，位置等元数据变化的块只更新元数据。文档正在处理中时抛出 ValueError。
+        """
         try:
-            # 更新文档状态为处理中
-            self.update_document_status(kb_id, document_id, DocumentStatusUpdate(status="processing"))
+            knowledge_base = self.knowledge_bases.get(kb_id)
+            if not knowledge_base:
+                raise ValueError(f"Knowledge base not found: {kb_id}")
             
-            # 获取集合
-            collection = self.chroma_client.get_collection(name=kb_id)
+            document_info = self.get_document(kb_id, document_id)
+            if not document_info:
+                raise ValueError(f"Document not found: {document_id}")
+            if document_info.status in ("pending", "processing"):
+                raise ValueError(f"Document {document_id} is still being processed")
             
-            # 应用自定义分块配置（如果提供）
-            from app.schemas.knowledge_base import ChunkSettings
-            chunk_settings = ChunkSettings(**knowledge_base.chunk_settings.model_dump())
-            
-            if chunk_size is not None:
-                chunk_settings.chunk_size = chunk_size
-            if chunk_overlap is not None:
-                chunk_settings.chunk_overlap = chunk_overlap
-            if chunking_strategy is not None:
-                chunk_settings.chunking_strategy = chunking_strategy
-            if separators is not None:
-                chunk_settings.separators = separators
-            
-            # 处理文档
-            chunks = self.document_processor.process_document(
-                file_path=file_path,
-                chunk_settings=chunk_settings
+            job = self._submit_ingestion(
+                knowledge_base, document_id, file_path, filename,
+                chunk_size, chunk_overlap, chunking_strategy, separators
             )
             
-            # 向量化并添加到集合
-            chunk_ids = []
-            documents = []
-            metadatas = []
-            
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{document_id}_{i}"
-                chunk_ids.append(chunk_id)
-                documents.append(chunk.content)
-                metadatas.append({
-                    "document_id": document_id,
-                    "chunk_index": i,
-                    "filename": knowledge_base.documents[-1].filename,
-                    **chunk.metadata
-                })
-            
-            # 添加到Chroma集合
-            if documents:
-                collection.add(
-                    ids=chunk_ids,
-                    documents=documents,
-                    metadatas=metadatas
-                )
+            # 更新文档信息
+            document_info.filename = filename
+            document_info.file_type = filename.split('.')[-1] if '.' in filename else 'unknown'
+            document_info.size = os.path.getsize(file_path)
+            document_info.status = "pending"
+            document_info.error_message = None
+            document_info.updated_at = datetime.utcnow()
+            self._save_knowledge_bases()
             
-            # 更新文档状态为完成
-            self.update_document_status(
-                kb_id, 
-                document_id, 
-                DocumentStatusUpdate(
-                    status="completed",
-                    chunks_count=len(chunks)
-                )
+            logger.info(f"Reindexing document in knowledge base {kb_id}: {document_id} - {filename}")
+            return DocumentUploadResponse(
+                document_id=document_id,
+                filename=filename,
+                status="pending",
+                message="Document update accepted, reindexing in background",
+                job_id=job.job_id
             )
             
-            logger.info(f"Processed document {document_id} with {len(chunks)} chunks")
-            
         except Exception as e:
-            logger.error(f"Error processing document {document_id}: {str(e)}")
-            self.update_document_status(
-                kb_id, 
-                document_id, 
-                DocumentStatusUpdate(
-                    status="failed",
-                    error_message=str(e)
-                )
+            logger.error(f"Error reindexing document: {str(e)}")
+            raise
+    
+    def _submit_ingestion(self, knowledge_base: KnowledgeBase, document_id: str, file_path: str, filename: str, 
+                          chunk_size: Optional[int] = None, 
+                          chunk_overlap: Optional[int] = None, 
+                          chunking_strategy: Optional[str] = None, 
+                          separators: Optional[List[str]] = None) -> IngestionJob:
+        """创建入库任务并提交到流水线"""
+        job = IngestionJob(
+            job_id=str(uuid4()),
+            knowledge_base_id=knowledge_base.id,
+            document_id=document_id,
+            filename=filename,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow()
+        )
+        chunk_settings = self._resolve_chunk_settings(
+            knowledge_base, chunk_size, chunk_overlap, chunking_strategy, separators
+        )
+        self.ingestion.submit(job, file_path, chunk_settings)
+        return job
+    
+    def get_document(self, kb_id: str, document_id: str) -> Optional[DocumentInfo]:
+        """获取知识库中的文档"""
+        knowledge_base = self.knowledge_bases.get(kb_id)
+        if not knowledge_base:
+            return None
+        return next((doc for doc in knowledge_base.documents if doc.id == document_id), None)
+    
+    def _resolve_chunk_settings(self, knowledge_base: KnowledgeBase, 
+                                chunk_size: Optional[int] = None, 
+                                chunk_overlap: Optional[int] = None, 
+                                chunking_strategy: Optional[str] = None, 
+                                separators: Optional[List[str]] = None) -> ChunkSettings:
+        """在知识库分块配置上应用自定义分块配置（如果提供）"""
+        chunk_settings = ChunkSettings(**knowledge_base.chunk_settings.model_dump())
+        
+        if chunk_size is not None:
+            chunk_settings.chunk_size = chunk_size
+        if chunk_overlap is not None:
+            chunk_settings.chunk_overlap = chunk_overlap
+        if chunking_strategy is not None:
+            chunk_settings.chunking_strategy = chunking_strategy
+        if separators is not None:
+            chunk_settings.separators = separators
+            
+        return chunk_settings
+    
+    def get_embedder(self, kb_id: str) -> BatchEmbedder:
+        """获取知识库嵌入模型配置对应的批量向量化器"""
+        knowledge_base = self.knowledge_bases.get(kb_id)
+        if not knowledge_base:
+            raise ValueError(f"Knowledge base not found: {kb_id}")
+        return embedding_service.get(knowledge_base.embedding_settings)
+    
+    def diff_chunks(self, kb_id: str, document_id: str, filename: str, chunks: List[DocumentChunk]) -> ChunkDiff:
+        """比对文档的新分块与已存储的块（由入库流水线在线程中调用）
+        
+        块ID由文档ID和内容哈希组成，同一文档内重复的内容按出现次序加后缀，
+        因此内容未变的块无论位置是否移动都保持同一ID，无需重新向量化。
+        """
+        collection = self.chroma_client.get_collection(name=kb_id)
+        stored = collection.get(where={"document_id": document_id}, include=["metadatas"])
+        stored_metadatas = dict(zip(stored["ids"], stored["metadatas"]))
+        
+        diff = ChunkDiff(added_ids=[], added_documents=[], added_metadatas=[],
+                         updated_ids=[], updated_metadatas=[], deleted_ids=[], unchanged=[])
+        occurrences: Dict[str, int] = {}
+        for i, chunk in enumerate(chunks):
+            chunk_hash = text_hash(chunk.content)
+            occurrence = occurrences.get(chunk_hash, 0)
+            occurrences[chunk_hash] = occurrence + 1
+            chunk_id = f"{document_id}_{chunk_hash[:16]}" + (f"_{occurrence}" if occurrence else "")
+            metadata = {
+                "document_id": document_id,
+                "chunk_index": i,
+                "chunk_hash": chunk_hash,
+                "filename": filename,
+                **chunk.metadata
+            }
+            
+            previous = stored_metadatas.pop(chunk_id, None)
+            if previous is None:
+                diff.added_ids.append(chunk_id)
+                diff.added_documents.append(chunk.content)
+                diff.added_metadatas.append(metadata)
+            elif previous != metadata:
+                diff.updated_ids.append(chunk_id)
+                diff.updated_metadatas.append(metadata)
+            else:
+                diff.unchanged.append(chunk_id)
+        
+        # 剩余的已存储块在新版本中不存在
+        diff.deleted_ids.extend(stored_metadatas)
+        return diff
+    
+    def apply_chunk_diff(self, kb_id: str, diff: ChunkDiff, embeddings: List[List[float]]) -> None:
+        """将块差异写入知识库集合，embeddings 与新增的块一一对应（由入库流水线在线程中调用）"""
+        collection = self.chroma_client.get_collection(name=kb_id)
+        
+        if diff.deleted_ids:
+            collection.delete(ids=diff.deleted_ids)
+        
+        # 添加到Chroma集合，向量已由嵌入模型预先计算
+        if diff.added_ids:
+            collection.add(
+                ids=diff.added_ids,
+                embeddings=embeddings,
+                documents=diff.added_documents,
+                metadatas=diff.added_metadatas
             )
+        
+        # 内容未变的块只更新元数据，保留原有向量
+        if diff.updated_ids:
+            collection.update(ids=diff.updated_ids, metadatas=diff.updated_metadatas)
+    
+    def get_ingestion_job(self, job_id: str) -> Optional[IngestionJob]:
+        """获取入库任务"""
+        return self.ingestion.get_job(job_id)
+    
+    def list_ingestion_jobs(self, kb_id: str, status: Optional[str] = None, limit: int = 100) -> List[IngestionJob]:
+        """列出知识库的入库任务"""
+        return self.ingestion.list_jobs(kb_id, status=status, limit=limit)
     
     def update_document_status(self, kb_id: str, document_id: str, status_update: DocumentStatusUpdate):
         """更新文档状态"""
@@ -287,17 +404,21 @@ class KnowledgeBaseManager:
                 self._save_knowledge_bases()
                 break
     
-    def search_knowledge_base(self, kb_id: str, query: str, top_k: int = 5, similarity_threshold: float = 0.0) -> SearchResponse:
+    async def search_knowledge_base(self, kb_id: str, query: str, top_k: int = 5, similarity_threshold: float = 0.0) -> SearchResponse:
         """在知识库中检索相关内容"""
         try:
             from app.schemas.knowledge_base import SearchResponse, SearchResult
             
+            # 使用与入库相同的嵌入模型向量化查询
+            query_embeddings = await self.get_embedder(kb_id).embed([query])
+            
             # 获取Chroma集合
             collection = self.chroma_client.get_collection(name=kb_id)
             
             # 执行检索
-            results = collection.query(
-                query_texts=[query],
+            results = await asyncio.to_thread(
+                collection.query,
+                query_embeddings=query_embeddings,
                 n_results=top_k
             )
             
@@ -1,77 +1,215 @@
-from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.model_gateway.http_pool import HTTPConnectionPool
 from app.services.model_gateway.models.base import BaseModelAdapter, ModelConfig
 from app.services.model_gateway.models.openai import OpenAIModelAdapter
 from app.services.model_gateway.models.anthropic import AnthropicModelAdapter
 from app.services.model_gateway.models.ollama import OllamaModelAdapter
+from app.services.model_gateway.rate_limit import RateLimitedModelAdapter, RateLimiterRegistry
+from app.services.model_gateway.resilience import CircuitBreakerRegistry, ResilientModelAdapter
+from app.services.model_gateway.response_cache import CachedModelAdapter, ResponseCacheStore, response_cache
+from app.services.model_gateway.router import ROUTING_PROVIDER, ModelRouter
+from app.services.model_gateway.semantic_cache import SemanticCacheStore, semantic_cache
+from app.services.model_gateway.single_flight import SingleFlightModelAdapter
 from app.utils.logger import logger
 
+# 适配器池键：(提供商, 模型名称, 凭证指纹, 基础URL)
+AdapterKey = Tuple[str, str, str, str]
+
+DEFAULT_OLLAMA_BASE_URL = "http://localhost:11434"
+
 class ModelGateway:
-    """模型网关，管理不同提供商的模型"""
+    """模型网关，管理不同提供商的模型
+    
+    适配器按 (提供商, 模型, 凭证指纹, 基础URL) 池化复用，超出容量时按 LRU 淘汰并关闭底层客户端。
+    适配器只保存连接相关配置，temperature 等采样参数在每次调用时通过 kwargs 传入。
+    所有适配器的 SDK 客户端共用同一个 HTTP 连接池。
+    路由组把多个后端组合成一个逻辑模型，按延迟和错误率选择后端并故障转移。
+    池中保存的是叠加了响应缓存等包装层的适配器。
+    """
     
-    def __init__(self):
-        self.model_adapters: Dict[str, BaseModelAdapter] = {}
+    def __init__(
+        self,
+        max_adapters: int = settings.MODEL_ADAPTER_POOL_SIZE,
+        http_pool: Optional[HTTPConnectionPool] = None,
+        cache: Optional[ResponseCacheStore] = None,
+        semantic: Optional[SemanticCacheStore] = None
+    ):
+        self.max_adapters = max_adapters
+        self.http_pool = http_pool or HTTPConnectionPool()
+        self.cache = cache or response_cache
+        self.semantic = semantic or semantic_cache
+        self.breakers = CircuitBreakerRegistry()
+        self.rate_limiters = RateLimiterRegistry()
+        self.router = ModelRouter(self)
+        self.model_adapters: "OrderedDict[AdapterKey, BaseModelAdapter]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._closing: Dict[asyncio.Task, BaseModelAdapter] = {}
+    
+    @staticmethod
+    def credential_fingerprint(api_key: Optional[str]) -> str:
+        """计算凭证指纹，池中不保存明文密钥"""
+        if not api_key:
+            return ""
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16]
     
     def get_model(
         self,
         provider: str,
         model_name: str,
-        config: Optional[Dict[str, Any]] = None,
-        **kwargs
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None
     ) -> BaseModelAdapter:
-        """获取或创建模型实例"""
+        """获取或创建模型实例，provider 为 "group" 时按路由组返回路由适配器"""
+        if provider == ROUTING_PROVIDER:
+            return self.router.get_adapter(model_name)
+        if provider == "ollama":
+            base_url = base_url or DEFAULT_OLLAMA_BASE_URL
+        
         # 创建唯一键
-        model_key = f"{provider}:{model_name}"
+        model_key: AdapterKey = (provider, model_name, self.credential_fingerprint(api_key), base_url or "")
         
-        # 如果模型实例已存在且配置无变化，直接返回
-        if model_key in self.model_adapters:
-            return self.model_adapters[model_key]
+        with self._lock:
+            adapter = self.model_adapters.get(model_key)
+            if adapter is not None:
+                self.model_adapters.move_to_end(model_key)
+                return adapter
         
-        # 创建模型配置
-        model_config = ModelConfig(
-            model_name=model_name,
-            **(config or {})
-        )
+        adapter = self._wrap(self._create_adapter(provider, model_name, api_key, base_url), model_key)
         
-        # 根据提供商创建适配器实例
-        adapter: BaseModelAdapter
+        evicted: List[BaseModelAdapter] = []
+        with self._lock:
+            existing = self.model_adapters.get(model_key)
+            if existing is not None:
+                # 并发创建了同一个适配器，保留先放入池中的实例
+                self.model_adapters.move_to_end(model_key)
+                evicted.append(adapter)
+                adapter = existing
+            else:
+                self.model_adapters[model_key] = adapter
+                while len(self.model_adapters) > self.max_adapters:
+                    _, evicted_adapter = self.model_adapters.popitem(last=False)
+                    evicted.append(evicted_adapter)
+                logger.info(f"Created model instance: {provider}:{model_name}")
+        
+        for evicted_adapter in evicted:
+            self._close_adapter(evicted_adapter)
+        return adapter
+    
+    def _create_adapter(
+        self,
+        provider: str,
+        model_name: str,
+        api_key: Optional[str],
+        base_url: Optional[str]
+    ) -> BaseModelAdapter:
+        """根据提供商创建适配器实例"""
+        model_config = ModelConfig(model_name=model_name)
         
         if provider == "openai":
-            api_key = kwargs.get("api_key")
-            base_url = kwargs.get("base_url")
             if not api_key:
                 raise ValueError("OpenAI API key is required")
-            adapter = OpenAIModelAdapter(model_config, api_key=api_key, base_url=base_url)
+            return OpenAIModelAdapter(
+                model_config,
+                api_key=api_key,
+                base_url=base_url,
+                http_client=self.http_pool.create_client()
+            )
         
-        elif provider == "anthropic":
-            api_key = kwargs.get("api_key")
+        if provider == "anthropic":
             if not api_key:
                 raise ValueError("Anthropic API key is required")
-            adapter = AnthropicModelAdapter(model_config, api_key=api_key)
+            return AnthropicModelAdapter(model_config, api_key=api_key, transport=self.http_pool.transport())
+        
+        if provider == "ollama":
+            return OllamaModelAdapter(model_config, base_url=base_url, transport=self.http_pool.transport())
         
-        elif provider == "ollama":
-            base_url = kwargs.get("base_url", "http://localhost:11434")
-            adapter = OllamaModelAdapter(model_config, base_url=base_url)
+        raise ValueError(f"Unsupported provider: {provider}")
+    
+    def _wrap(self, adapter: BaseModelAdapter, model_key: AdapterKey) -> BaseModelAdapter:
+        """为适配器叠加网关包装层（由内到外：限流、重试与熔断、请求合并、响应缓存）"""
+        provider, _, fingerprint, base_url = model_key
+        # 同一提供商凭证的所有模型共用限流器，每次重试都重新获取额度
+        limiter = self.rate_limiters.get((provider, fingerprint, base_url))
+        if limiter is not None:
+            adapter = RateLimitedModelAdapter(adapter, limiter)
+        # 同一端点共用熔断器
+        endpoint = f"{provider}:{base_url}"
+        adapter = ResilientModelAdapter(adapter, self.breakers.get(endpoint))
+        adapter = SingleFlightModelAdapter(adapter)
+        # 缓存命名空间另外区分凭证：不同凭证（包括无效凭证）不会命中其他调用方付费得到的响应
+        namespace = f"{provider}:{fingerprint}:{base_url}"
+        return CachedModelAdapter(adapter, self.cache, namespace=namespace, semantic=self.semantic)
+    
+    def _close_adapter(self, adapter: BaseModelAdapter) -> None:
+        """关闭被淘汰的适配器
         
-        else:
-            raise ValueError(f"Unsupported provider: {provider}")
+        淘汰时可能仍有调用在使用该适配器，因此延迟 DEFAULT_TIMEOUT 秒后再关闭客户端。
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
         
-        # 保存模型实例
-        self.model_adapters[model_key] = adapter
-        logger.info(f"Created model instance: {model_key}")
+        if loop is None:
+            # 没有运行中的事件循环，也就不存在进行中的异步调用，直接关闭
+            asyncio.run(self._aclose_adapter(adapter))
+            return
         
-        return adapter
+        task = loop.create_task(self._aclose_adapter(adapter, delay=settings.DEFAULT_TIMEOUT))
+        self._closing[task] = adapter
+        task.add_done_callback(lambda done: self._closing.pop(done, None))
+    
+    @staticmethod
+    async def _aclose_adapter(adapter: BaseModelAdapter, delay: float = 0) -> None:
+        """关闭适配器底层客户端"""
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            await adapter.aclose()
+            logger.info(f"Closed model instance: {adapter.provider}:{adapter.config.model_name}")
+        except Exception as e:
+            logger.error(f"Failed to close model instance {adapter.provider}:{adapter.config.model_name}: {str(e)}")
     
     def remove_model(self, provider: str, model_name: str) -> None:
-        """移除模型实例"""
-        model_key = f"{provider}:{model_name}"
-        if model_key in self.model_adapters:
-            del self.model_adapters[model_key]
-            logger.info(f"Removed model instance: {model_key}")
+        """移除模型实例（包括不同凭证和基础URL的所有实例）"""
+        with self._lock:
+            keys = [key for key in self.model_adapters if key[0] == provider and key[1] == model_name]
+            removed = [self.model_adapters.pop(key) for key in keys]
+        
+        for adapter in removed:
+            self._close_adapter(adapter)
+        if removed:
+            logger.info(f"Removed model instance: {provider}:{model_name}")
     
     def clear_models(self) -> None:
         """清除所有模型实例"""
-        self.model_adapters.clear()
+        with self._lock:
+            removed = list(self.model_adapters.values())
+            self.model_adapters.clear()
+        
+        for adapter in removed:
+            self._close_adapter(adapter)
         logger.info("Cleared all model instances")
+    
+    async def aclose(self) -> None:
+        """立即关闭所有模型实例（用于服务关闭）"""
+        with self._lock:
+            removed = list(self.model_adapters.values())
+            self.model_adapters.clear()
+        
+        # 取消延迟关闭任务，改为立即关闭
+        closing, self._closing = self._closing, {}
+        for task in closing:
+            task.cancel()
+        await asyncio.gather(*closing, return_exceptions=True)
+        removed.extend(closing.values())
+        await asyncio.gather(*(self._aclose_adapter(adapter) for adapter in removed))
+        await self.http_pool.aclose()
 
 # 创建全局模型网关实例
 model_gateway = ModelGateway()
@@ -0,0 +1,64 @@
+import importlib.util
+from typing import Optional
+import httpx
+from app.config import settings
+from app.utils.logger import logger
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """共享连接池的传输层包装
+    
+    各适配器的 SDK 客户端关闭时会关闭自己的传输层，包装后只转发请求，不关闭共享连接池。
+    """
+    
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+    
+    async def aclose(self) -> None:
+        pass
+
+
+class HTTPConnectionPool:
+    """模型调用共享的 HTTP 连接池
+    
+    所有适配器复用同一个传输层（连接池），同一提供商的请求复用 keep-alive 连接，
+    避免每个客户端各自建立 TLS 连接。开启 HTTP/2 需要安装 h2（httpx[http2]），
+    未安装时退回 HTTP/1.1。
+    """
+    
+    def __init__(
+        self,
+        max_connections: int = settings.MODEL_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.MODEL_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = settings.MODEL_HTTP_KEEPALIVE_EXPIRY,
+        http2: bool = settings.MODEL_HTTP2_ENABLED
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+    
+    def transport(self) -> httpx.AsyncBaseTransport:
+        """获取共享传输层，首次调用时创建连接池"""
+        if self._transport is None:
+            if self.http2 and importlib.util.find_spec("h2") is None:
+                logger.warning("HTTP/2 requires the h2 package, falling back to HTTP/1.1")
+                self.http2 = False
+            self._transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+        return SharedTransport(self._transport)
+    
+    def create_client(self, **kwargs) -> httpx.AsyncClient:
+        """创建使用共享连接池的 httpx 客户端"""
+        return httpx.AsyncClient(transport=self.transport(), **kwargs)
+    
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        transport, self._transport = self._transport, None
+        if transport is not None:
+            await transport.aclose()
@@ -1,4 +1,5 @@
 from typing import Any, Dict, List, Optional
+import httpx
 from anthropic import AsyncAnthropic
 from app.services.model_gateway.models.base import BaseModelAdapter, ModelConfig, ChatMessage, ModelResponse
 from app.utils.logger import logger
@@ -6,12 +7,25 @@ from app.utils.logger import logger
 class AnthropicModelAdapter(BaseModelAdapter):
     """Anthropic模型适配器"""
     
-    def __init__(self, config: ModelConfig, api_key: str):
+    def __init__(self, config: ModelConfig, api_key: str, transport: Optional[httpx.AsyncBaseTransport] = None):
         super().__init__(config)
+        # 当前锁定的 anthropic SDK（0.3.x）不接受 http_client，通过 transport 接入共享连接池
         self.client = AsyncAnthropic(
             api_key=api_key,
+            transport=transport,
+            # 重试由网关的弹性调用层统一处理
+            max_retries=0,
         )
     
+    def _sampling_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """解析采样参数，top_p 只在调用方显式指定时传递（较新的 Claude 模型不允许同时设置 temperature 和 top_p）"""
+        top_p_set = kwargs.get("top_p") is not None or "top_p" in self.config.model_fields_set
+        params = self.resolve_params(kwargs)
+        sampling = {"temperature": params["temperature"], "max_tokens": params["max_tokens"]}
+        if top_p_set:
+            sampling["top_p"] = params["top_p"]
+        return sampling
+    
     async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
         """聊天接口"""
         try:
@@ -20,6 +34,7 @@ class AnthropicModelAdapter(BaseModelAdapter):
             # 转换消息格式，Anthropic需要特殊处理
             formatted_messages = []
             system_prompt = ""
+            params = self._sampling_params(kwargs)
             
             for msg in messages:
                 if msg.role == "system":
@@ -34,8 +49,7 @@ class AnthropicModelAdapter(BaseModelAdapter):
                 model=self.config.model_name,
                 messages=formatted_messages,
                 system=system_prompt,
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens,
+                **params,
                 **kwargs
             )
             
@@ -74,6 +88,7 @@ class AnthropicModelAdapter(BaseModelAdapter):
             # 转换消息格式
             formatted_messages = []
             system_prompt = ""
+            params = self._sampling_params(kwargs)
             
             for msg in messages:
                 if msg.role == "system":
@@ -88,8 +103,7 @@ class AnthropicModelAdapter(BaseModelAdapter):
                 model=self.config.model_name,
                 messages=formatted_messages,
                 system=system_prompt,
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens,
+                **params,
                 stream=True,
                 **kwargs
             )
@@ -103,6 +117,10 @@ class AnthropicModelAdapter(BaseModelAdapter):
             logger.error(f"Anthropic stream chat error: {str(e)}")
             raise
     
+    async def aclose(self) -> None:
+        """关闭客户端连接"""
+        await self.client.close()
+    
     @property
     def provider(self) -> str:
         """获取模型提供商名称"""
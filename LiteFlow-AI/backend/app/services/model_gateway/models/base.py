@@ -2,8 +2,14 @@ from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
+# 可在每次调用时通过 kwargs 覆盖的采样参数
+SAMPLING_PARAMS = ("temperature", "max_tokens", "top_p", "frequency_penalty", "presence_penalty")
+
+# 网关包装层使用的调用控制参数，不传给 SDK，也不参与缓存键
+CALL_CONTROL_PARAMS = ("deadline", "hedge", "coalesce")
+
 class ModelConfig(BaseModel):
-    """模型配置基础类"""
+    """模型配置基础类，采样参数为单次调用未指定时的默认值"""
     model_name: str
     temperature: float = 0.7
     max_tokens: int = 1024
@@ -34,6 +40,18 @@ class BaseModelAdapter(ABC):
     def __init__(self, config: ModelConfig):
         self.config = config
         
+    def resolve_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """从调用参数中取出采样参数，未指定的使用模型默认配置"""
+        params = {}
+        for name in SAMPLING_PARAMS:
+            value = kwargs.pop(name, None)
+            params[name] = getattr(self.config, name) if value is None else value
+        return params
+    
+    async def aclose(self) -> None:
+        """释放底层客户端连接"""
+        pass
+    
     @abstractmethod
     async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
         """聊天接口"""
@@ -54,3 +72,32 @@ class BaseModelAdapter(ABC):
     def provider(self) -> str:
         """获取模型提供商名称"""
         pass
+
+class DelegatingModelAdapter(BaseModelAdapter):
+    """委托给内部适配器的包装基类，网关的缓存、重试等能力以包装层的形式叠加在适配器外"""
+    
+    def __init__(self, inner: BaseModelAdapter):
+        super().__init__(inner.config)
+        self.inner = inner
+    
+    async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
+        """聊天接口"""
+        return await self.inner.chat(messages, **kwargs)
+    
+    async def generate(self, prompt: str, **kwargs) -> ModelResponse:
+        """文本生成接口"""
+        return await self.inner.generate(prompt, **kwargs)
+    
+    async def stream_chat(self, messages: List[ChatMessage], **kwargs):
+        """流式聊天接口"""
+        async for chunk in self.inner.stream_chat(messages, **kwargs):
+            yield chunk
+    
+    async def aclose(self) -> None:
+        """释放底层客户端连接"""
+        await self.inner.aclose()
+    
+    @property
+    def provider(self) -> str:
+        """获取模型提供商名称"""
+        return self.inner.provider
@@ -1,4 +1,5 @@
 from typing import Any, Dict, List, Optional
+import httpx
 from ollama import AsyncClient
 from app.services.model_gateway.models.base import BaseModelAdapter, ModelConfig, ChatMessage, ModelResponse
 from app.utils.logger import logger
@@ -6,12 +7,33 @@ from app.utils.logger import logger
 class OllamaModelAdapter(BaseModelAdapter):
     """Ollama模型适配器"""
     
-    def __init__(self, config: ModelConfig, base_url: str = "http://localhost:11434"):
+    def __init__(
+        self,
+        config: ModelConfig,
+        base_url: str = "http://localhost:11434",
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         super().__init__(config)
+        # ollama SDK 在内部创建 httpx 客户端且不接受外部客户端，适配器自己持有传输层以便关闭
+        self._transport = transport or httpx.AsyncHTTPTransport()
         self.client = AsyncClient(
             host=base_url,
+            transport=self._transport,
         )
     
+    def _build_options(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """将采样参数转换为 Ollama 的 options"""
+        params = self.resolve_params(kwargs)
+        options = {
+            "temperature": params["temperature"],
+            "num_predict": params["max_tokens"],
+            "top_p": params["top_p"],
+            "frequency_penalty": params["frequency_penalty"],
+            "presence_penalty": params["presence_penalty"]
+        }
+        options.update(kwargs.pop("options", None) or {})
+        return options
+    
     async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
         """聊天接口"""
         try:
@@ -19,11 +41,12 @@ class OllamaModelAdapter(BaseModelAdapter):
             
             # 转换消息格式
             formatted_messages = [msg.model_dump() for msg in messages]
+            options = self._build_options(kwargs)
             
             response = await self.client.chat(
                 model=self.config.model_name,
                 messages=formatted_messages,
-                temperature=self.config.temperature,
+                options=options,
                 stream=False,
                 **kwargs
             )
@@ -54,11 +77,12 @@ class OllamaModelAdapter(BaseModelAdapter):
         """文本生成接口"""
         try:
             logger.info(f"Ollama generate call: {self.config.model_name}")
+            options = self._build_options(kwargs)
             
             response = await self.client.generate(
                 model=self.config.model_name,
                 prompt=prompt,
-                temperature=self.config.temperature,
+                options=options,
                 **kwargs
             )
             
@@ -90,11 +114,12 @@ class OllamaModelAdapter(BaseModelAdapter):
             
             # 转换消息格式
             formatted_messages = [msg.model_dump() for msg in messages]
+            options = self._build_options(kwargs)
             
             async for chunk in await self.client.chat(
                 model=self.config.model_name,
                 messages=formatted_messages,
-                temperature=self.config.temperature,
+                options=options,
                 stream=True,
                 **kwargs
             ):
@@ -105,6 +130,10 @@ class OllamaModelAdapter(BaseModelAdapter):
             logger.error(f"Ollama stream chat error: {str(e)}")
             raise
     
+    async def aclose(self) -> None:
+        """关闭客户端连接，共享连接池的传输层关闭时不会关闭连接池"""
+        await self._transport.aclose()
+    
     @property
     def provider(self) -> str:
         """获取模型提供商名称"""
@@ -1,4 +1,5 @@
 from typing import Any, Dict, List, Optional
+import httpx
 from openai import AsyncOpenAI
 from app.services.model_gateway.models.base import BaseModelAdapter, ModelConfig, ChatMessage, ModelResponse
 from app.config import settings
@@ -7,11 +8,20 @@ from app.utils.logger import logger
 class OpenAIModelAdapter(BaseModelAdapter):
     """OpenAI模型适配器"""
     
-    def __init__(self, config: ModelConfig, api_key: str, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        config: ModelConfig,
+        api_key: str,
+        base_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
         super().__init__(config)
         self.client = AsyncOpenAI(
             api_key=api_key,
             base_url=base_url,
+            http_client=http_client,
+            # 重试由网关的弹性调用层统一处理
+            max_retries=0,
         )
     
     async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
@@ -21,15 +31,12 @@ class OpenAIModelAdapter(BaseModelAdapter):
             
             # 转换消息格式
             formatted_messages = [msg.model_dump() for msg in messages]
+            params = self.resolve_params(kwargs)
             
             response = await self.client.chat.completions.create(
                 model=self.config.model_name,
                 messages=formatted_messages,
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens,
-                top_p=self.config.top_p,
-                frequency_penalty=self.config.frequency_penalty,
-                presence_penalty=self.config.presence_penalty,
+                **params,
                 **kwargs
             )
             
@@ -67,15 +74,12 @@ class OpenAIModelAdapter(BaseModelAdapter):
             
             # 转换消息格式
             formatted_messages = [msg.model_dump() for msg in messages]
+            params = self.resolve_params(kwargs)
             
             stream = await self.client.chat.completions.create(
                 model=self.config.model_name,
                 messages=formatted_messages,
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens,
-                top_p=self.config.top_p,
-                frequency_penalty=self.config.frequency_penalty,
-                presence_penalty=self.config.presence_penalty,
+                **params,
                 stream=True,
                 **kwargs
             )
@@ -89,6 +93,10 @@ class OpenAIModelAdapter(BaseModelAdapter):
             logger.error(f"OpenAI stream chat error: {str(e)}")
             raise
     
+    async def aclose(self) -> None:
+        """关闭客户端连接"""
+        await self.client.close()
+    
     @property
     def provider(self) -> str:
         """获取模型提供商名称"""
@@ -0,0 +1,199 @@
+import asyncio
+import importlib.util
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.model_gateway.models.base import BaseModelAdapter, ChatMessage, DelegatingModelAdapter, ModelResponse
+from app.utils.logger import logger
+from app.utils.observability import MODEL_RATE_LIMIT_REJECTIONS, MODEL_RATE_LIMIT_WAIT
+
+# 限流器键：(提供商, 凭证指纹, 基础URL)
+LimiterKey = Tuple[str, str, str]
+
+_encoding = None
+_encoding_loaded = False
+
+
+def estimate_tokens(text: str) -> int:
+    """本地估算文本的 token 数
+    
+    安装了 tiktoken 时使用 cl100k_base 编码计数，否则按中日韩字符每字 1 个、
+    其他字符每 4 个 1 个估算。
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if importlib.util.find_spec("tiktoken") is not None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"Failed to load tiktoken encoding, falling back to estimation: {str(e)}")
+    
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    
+    cjk = sum(1 for char in text if "\u2e80" <= char <= "\u9fff" or "\uac00" <= char <= "\ud7af")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class RateLimitExceededError(RuntimeError):
+    """在最大等待时间内无法获得调用额度"""
+    pass
+
+
+class TokenBucket:
+    """令牌桶，容量为每分钟额度，按每秒 capacity / 60 的速度补充
+    
+    余额可以为负：调用方先预留令牌再等待补充，负余额即排在前面的调用尚未兑现的预留。
+    """
+    
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def wait_time(self, amount: float) -> float:
+        """预留 amount 个令牌后需要等待的秒数"""
+        self._refill()
+        # 单次请求超过桶容量时按装满计算，避免永远等待
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+    
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """单个提供商凭证的限流器
+    
+    同时限制每分钟请求数（rpm）和每分钟 token 数（tpm）。调用到达时立即在两个桶中预留额度，
+    再等待到额度补足的时刻放行，因此调用严格按到达顺序放行，大请求不会被后到的小请求饿死；
+    需要等待超过 max_wait 秒的调用直接抛出 RateLimitExceededError，不占用额度。
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_wait: float = settings.MODEL_RATE_LIMIT_MAX_WAIT
+    ):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+    
+    async def acquire(self, tokens: int) -> None:
+        """获取一次调用额度，tokens 为估算的 token 数"""
+        with self._lock:
+            wait = max(
+                self.requests.wait_time(1) if self.requests else 0.0,
+                self.tokens.wait_time(tokens) if self.tokens else 0.0
+            )
+            if wait > self.max_wait:
+                MODEL_RATE_LIMIT_REJECTIONS.labels(provider=self.name).inc()
+                raise RateLimitExceededError(
+                    f"Rate limit for {self.name} exceeded, call would wait {wait:.1f}s (max {self.max_wait}s)"
+                )
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+        
+        MODEL_RATE_LIMIT_WAIT.labels(provider=self.name).observe(wait)
+        if wait <= 0:
+            return
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # 调用被取消，归还预留的额度
+            with self._lock:
+                if self.requests:
+                    self.requests.refund(1)
+                if self.tokens:
+                    self.tokens.refund(tokens)
+            raise
+    
+    def refund(self, tokens: int) -> None:
+        """调用实际消耗少于估算时退还 token 额度"""
+        if self.tokens and tokens > 0:
+            with self._lock:
+                self.tokens.refund(tokens)
+
+
+class RateLimitedModelAdapter(DelegatingModelAdapter):
+    """限流适配器
+    
+    调用前按 提示词估算 token 数 + max_tokens 从限流器获取额度，
+    非流式调用返回用量后退还估算多出的部分。
+    """
+    
+    def __init__(self, inner: BaseModelAdapter, limiter: RateLimiter):
+        super().__init__(inner)
+        self.limiter = limiter
+    
+    def _estimate(self, texts: List[str], kwargs: Dict[str, Any]) -> int:
+        params = self.resolve_params(dict(kwargs))
+        return sum(estimate_tokens(text) for text in texts) + int(params["max_tokens"])
+    
+    async def _call(self, estimate: int, call) -> ModelResponse:
+        await self.limiter.acquire(estimate)
+        response = await call()
+        used = response.tokens_used.get("total_tokens")
+        if used is not None:
+            self.limiter.refund(estimate - used)
+        return response
+    
+    async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
+        """聊天接口"""
+        estimate = self._estimate([message.content for message in messages], kwargs)
+        return await self._call(estimate, lambda: self.inner.chat(messages, **kwargs))
+    
+    async def generate(self, prompt: str, **kwargs) -> ModelResponse:
+        """文本生成接口"""
+        estimate = self._estimate([prompt], kwargs)
+        return await self._call(estimate, lambda: self.inner.generate(prompt, **kwargs))
+    
+    async def stream_chat(self, messages: List[ChatMessage], **kwargs):
+        """流式聊天接口"""
+        await self.limiter.acquire(self._estimate([message.content for message in messages], kwargs))
+        async for chunk in self.inner.stream_chat(messages, **kwargs):
+            yield chunk
+
+
+class RateLimiterRegistry:
+    """按 (提供商, 凭证, 基础URL) 管理限流器，限额来自 MODEL_RATE_LIMITS"""
+    
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self.limits = settings.MODEL_RATE_LIMITS if limits is None else limits
+        self._limiters: Dict[LimiterKey, RateLimiter] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: LimiterKey) -> Optional[RateLimiter]:
+        """获取限流器，提供商未配置限额时返回 None"""
+        provider = key[0]
+        limit = self.limits.get(provider)
+        if not limit:
+            return None
+        
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = RateLimiter(provider, rpm=limit.get("rpm"), tpm=limit.get("tpm"))
+            return limiter
@@ -0,0 +1,281 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+from anthropic import APIConnectionError as AnthropicConnectionError
+from openai import APIConnectionError as OpenAIConnectionError
+from app.config import settings
+from app.services.model_gateway.models.base import CALL_CONTROL_PARAMS, BaseModelAdapter, ChatMessage, DelegatingModelAdapter, ModelResponse
+from app.utils.logger import logger
+from app.utils.observability import MODEL_CALL_RETRIES, MODEL_CIRCUIT_OPEN_REJECTIONS
+
+# 可重试的 HTTP 状态码：限流和服务端错误（529 为 Anthropic 的 overloaded_error）
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504, 529)
+
+CONNECTION_ERRORS = (httpx.TransportError, OpenAIConnectionError, AnthropicConnectionError, asyncio.TimeoutError)
+
+
+class ProviderUnavailableError(RuntimeError):
+    """提供商熔断中，调用被快速拒绝"""
+    pass
+
+
+def error_status_code(exc: BaseException) -> Optional[int]:
+    """从各 SDK 的异常中提取 HTTP 状态码"""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """解析异常响应中的 Retry-After 头（秒数或 HTTP 日期）"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000, 0.0)
+        except ValueError:
+            pass
+    
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """限流、服务端错误、连接错误和超时可以重试"""
+    if isinstance(exc, CONNECTION_ERRORS):
+        return True
+    return error_status_code(exc) in RETRYABLE_STATUS_CODES
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """是否说明提供商不可用（计入熔断）；限流说明提供商在正常工作，不计入"""
+    return is_retryable(exc) and error_status_code(exc) != 429
+
+
+class CircuitBreaker:
+    """提供商熔断器
+    
+    连续失败达到阈值后打开，打开期间直接拒绝调用；经过 reset_timeout 秒后进入半开状态，
+    只放行一个探测调用，成功则关闭，失败则重新打开。
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = settings.MODEL_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = settings.MODEL_CIRCUIT_RESET_TIMEOUT
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def before_call(self) -> None:
+        """调用前检查，熔断中时抛出 ProviderUnavailableError"""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+        MODEL_CIRCUIT_OPEN_REJECTIONS.labels(provider=self.name).inc()
+        raise ProviderUnavailableError(f"Provider {self.name} is unavailable (circuit open)")
+    
+    def record_success(self) -> None:
+        """记录成功调用"""
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Circuit closed for provider {self.name}")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self) -> None:
+        """记录提供商失败"""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened for provider {self.name} after {self.failures} failure(s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+    
+    def release(self) -> None:
+        """调用未产生结论（如被取消）时释放半开探测名额"""
+        with self._lock:
+            self._probing = False
+
+
+class ResilientModelAdapter(DelegatingModelAdapter):
+    """弹性调用适配器
+    
+    每次调用有总截止时间（调用参数 deadline 秒，默认 DEFAULT_TIMEOUT），每次尝试受剩余时间约束；
+    429/5xx、连接错误和超时按带抖动的指数退避重试最多 DEFAULT_RETRY_COUNT 次，优先遵循 Retry-After；
+    提供商错误计入熔断器，熔断期间直接拒绝调用。
+    流式调用只在产出第一个片段之前重试，截止时间约束首个片段，之后每个片段的间隔不超过 DEFAULT_TIMEOUT。
+    """
+    
+    def __init__(
+        self,
+        inner: BaseModelAdapter,
+        breaker: CircuitBreaker,
+        retries: int = settings.DEFAULT_RETRY_COUNT,
+        timeout: float = settings.DEFAULT_TIMEOUT
+    ):
+        super().__init__(inner)
+        self.breaker = breaker
+        self.retries = retries
+        self.timeout = timeout
+    
+    def _deadline(self, kwargs: Dict[str, Any]) -> float:
+        """计算截止时间，并移除外层未消费的控制参数，避免传给 SDK"""
+        timeout = kwargs.pop("deadline", None) or self.timeout
+        for name in CALL_CONTROL_PARAMS:
+            kwargs.pop(name, None)
+        return time.monotonic() + timeout
+    
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        """计算下次重试前的等待时间（full jitter）"""
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            return retry_after
+        ceiling = min(settings.MODEL_RETRY_BACKOFF_MAX, settings.MODEL_RETRY_BACKOFF_BASE * (2 ** attempt))
+        return random.uniform(0, ceiling)
+    
+    async def _call(self, method: str, call: Callable[[], Awaitable[ModelResponse]], kwargs: Dict[str, Any]) -> ModelResponse:
+        """在截止时间内带重试地执行调用"""
+        deadline = self._deadline(kwargs)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = await asyncio.wait_for(call(), timeout=max(deadline - time.monotonic(), 0))
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                delay = self._should_retry(method, attempt, e, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return response
+    
+    def _should_retry(self, method: str, attempt: int, exc: Exception, deadline: float) -> Optional[float]:
+        """记录失败并决定是否重试，返回等待时间，不重试时返回 None"""
+        if is_provider_failure(exc):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        
+        if not is_retryable(exc) or attempt >= self.retries:
+            return None
+        delay = self._backoff(attempt, exc)
+        if time.monotonic() + delay >= deadline:
+            return None
+        
+        MODEL_CALL_RETRIES.labels(provider=self.provider).inc()
+        logger.warning(
+            f"{self.provider} {method} call failed ({type(exc).__name__}: {str(exc)}), "
+            f"retrying in {delay:.2f}s (attempt {attempt + 1}/{self.retries})"
+        )
+        return delay
+    
+    async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
+        """聊天接口"""
+        return await self._call("chat", lambda: self.inner.chat(messages, **kwargs), kwargs)
+    
+    async def generate(self, prompt: str, **kwargs) -> ModelResponse:
+        """文本生成接口"""
+        return await self._call("generate", lambda: self.inner.generate(prompt, **kwargs), kwargs)
+    
+    async def stream_chat(self, messages: List[ChatMessage], **kwargs):
+        """流式聊天接口"""
+        deadline = self._deadline(kwargs)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            stream = self.inner.stream_chat(messages, **kwargs)
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), timeout=max(deadline - time.monotonic(), 0))
+            except StopAsyncIteration:
+                self.breaker.record_success()
+                return
+            except asyncio.CancelledError:
+                self.breaker.release()
+                await stream.aclose()
+                raise
+            except Exception as e:
+                await stream.aclose()
+                delay = self._should_retry("stream_chat", attempt, e, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            break
+        
+        self.breaker.record_success()
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout=self.timeout)
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            await stream.aclose()
+
+
+class CircuitBreakerRegistry:
+    """按提供商端点管理熔断器"""
+    
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, name: str) -> CircuitBreaker:
+        """获取熔断器，不存在时创建"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name)
+            return breaker
+    
+    def states(self) -> List[Dict[str, Any]]:
+        """获取所有熔断器状态"""
+        with self._lock:
+            return [
+                {"provider": name, "state": breaker.state, "failures": breaker.failures}
+                for name, breaker in self._breakers.items()
+            ]
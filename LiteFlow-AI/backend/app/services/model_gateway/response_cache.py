@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from app.config import settings
+from app.services.model_gateway.models.base import CALL_CONTROL_PARAMS, BaseModelAdapter, ChatMessage, DelegatingModelAdapter, ModelResponse
+from app.services.model_gateway.semantic_cache import SemanticCacheStore
+from app.utils.logger import logger
+from app.utils.observability import MODEL_RESPONSE_CACHE_HITS, MODEL_RESPONSE_CACHE_MISSES
+
+
+class ResponseCacheStore:
+    """模型响应缓存存储
+    
+    第一级为内存 LRU，配置了 SQLite 路径时增加磁盘第二级，磁盘命中的条目会回填到内存。
+    两级缓存中的条目都在 TTL 到期后失效。
+    """
+    
+    def __init__(
+        self,
+        max_size: int = settings.MODEL_RESPONSE_CACHE_SIZE,
+        ttl: float = settings.MODEL_RESPONSE_CACHE_TTL,
+        sqlite_path: Optional[str] = settings.MODEL_RESPONSE_CACHE_SQLITE_PATH
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        
+        if sqlite_path:
+            directory = os.path.dirname(sqlite_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS model_response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    response_data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection.commit()
+            self._sqlite_lock = threading.Lock()
+    
+    async def get(self, key: str) -> Optional[ModelResponse]:
+        """获取缓存的响应，未命中时返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, data = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    MODEL_RESPONSE_CACHE_HITS.labels(tier="memory").inc()
+                    return ModelResponse.model_validate_json(data)
+                del self._entries[key]
+        
+        if self._connection is not None:
+            row = await asyncio.to_thread(self._sqlite_get, key, now)
+            if row is not None:
+                data, expires_at = row
+                self._remember(key, data, expires_at)
+                self.hits += 1
+                MODEL_RESPONSE_CACHE_HITS.labels(tier="sqlite").inc()
+                return ModelResponse.model_validate_json(data)
+        
+        self.misses += 1
+        MODEL_RESPONSE_CACHE_MISSES.inc()
+        return None
+    
+    async def set(self, key: str, response: ModelResponse) -> None:
+        """缓存响应"""
+        data = response.model_dump_json()
+        expires_at = time.time() + self.ttl
+        self._remember(key, data, expires_at)
+        
+        if self._connection is not None:
+            try:
+                await asyncio.to_thread(self._sqlite_set, key, data, expires_at)
+            except Exception as e:
+                logger.error(f"Failed to write model response cache: {str(e)}")
+    
+    def _remember(self, key: str, data: str, expires_at: float) -> None:
+        """写入内存缓存"""
+        with self._lock:
+            self._entries[key] = (expires_at, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def _sqlite_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        with self._sqlite_lock:
+            return self._connection.execute(
+                "SELECT response_data, expires_at FROM model_response_cache WHERE cache_key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+    
+    def _sqlite_set(self, key: str, data: str, expires_at: float) -> None:
+        with self._sqlite_lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO model_response_cache (cache_key, response_data, expires_at) VALUES (?, ?, ?)",
+                (key, data, expires_at)
+            )
+            # 定期清理过期条目
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._connection.execute("DELETE FROM model_response_cache WHERE expires_at <= ?", (time.time(),))
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+        if self._connection is not None:
+            with self._sqlite_lock, self._connection:
+                self._connection.execute("DELETE FROM model_response_cache")
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "persistent": self._connection is not None,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class CacheLookup(NamedTuple):
+    """单次调用的缓存键"""
+    key: str
+    context_key: str
+    query_text: Optional[str]
+
+
+class CachedModelAdapter(DelegatingModelAdapter):
+    """带响应缓存的适配器
+    
+    精确匹配的缓存键为 (命名空间, 调用方法, 模型, 消息, 采样参数及其他调用参数) 规范化后的哈希。
+    配置了语义缓存时，精确匹配未命中后再按最后一条用户消息做相似度查找，
+    语义查找限定在同一命名空间（网关的命名空间包含凭证指纹）内，上下文键不包含最后一条用户消息。
+    默认只缓存 temperature 为 0 的调用；调用参数 use_cache=True 时强制缓存，
+    use_cache=False 时既不读取也不写入缓存。
+    """
+    
+    def __init__(
+        self,
+        inner: BaseModelAdapter,
+        store: ResponseCacheStore,
+        namespace: str = "",
+        semantic: Optional[SemanticCacheStore] = None
+    ):
+        super().__init__(inner)
+        self.store = store
+        self.namespace = namespace
+        self.semantic = semantic
+    
+    def _hash(self, method: str, payload: Any, params: Dict[str, Any], extra: Dict[str, Any]) -> str:
+        canonical = json.dumps(
+            jsonable_encoder({
+                "namespace": self.namespace,
+                "provider": self.provider,
+                "model": self.config.model_name,
+                "method": method,
+                "payload": payload,
+                "params": params,
+                "extra": extra
+            }),
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+    
+    def _lookup_keys(self, method: str, messages: List[Dict[str, Any]], kwargs: Dict[str, Any]) -> Optional[CacheLookup]:
+        """计算缓存键，不满足缓存条件时返回 None"""
+        use_cache = kwargs.pop("use_cache", None)
+        if not settings.MODEL_RESPONSE_CACHE_ENABLED or use_cache is False:
+            return None
+        
+        params = self.resolve_params(dict(kwargs))
+        if not use_cache and params["temperature"] != 0:
+            return None
+        
+        extra = {
+            name: value for name, value in kwargs.items()
+            if name not in params and name not in CALL_CONTROL_PARAMS
+        }
+        try:
+            key = self._hash(method, messages, params, extra)
+            # 语义查找只针对以用户消息结尾的请求
+            query_text = None
+            context_key = ""
+            if messages and messages[-1]["role"] == "user":
+                query_text = messages[-1]["content"]
+                context_key = self._hash(method, messages[:-1], params, extra)
+        except (TypeError, ValueError):
+            return None
+        return CacheLookup(key, context_key, query_text)
+    
+    def _semantic_enabled(self, lookup: CacheLookup) -> bool:
+        return self.semantic is not None and settings.MODEL_SEMANTIC_CACHE_ENABLED and bool(lookup.query_text)
+    
+    async def _get(self, lookup: Optional[CacheLookup]) -> Optional[ModelResponse]:
+        """依次查找精确缓存和语义缓存"""
+        if lookup is None:
+            return None
+        cached = await self.store.get(lookup.key)
+        if cached is None and self._semantic_enabled(lookup):
+            cached = await self.semantic.get(self.namespace, lookup.context_key, lookup.query_text)
+            if cached is not None:
+                # 回填精确缓存，相同请求再次到来时不必重新计算嵌入
+                await self.store.set(lookup.key, cached)
+        return cached
+    
+    async def _set(self, lookup: Optional[CacheLookup], response: ModelResponse) -> None:
+        if lookup is None:
+            return
+        await self.store.set(lookup.key, response)
+        if self._semantic_enabled(lookup):
+            await self.semantic.set(self.namespace, lookup.context_key, lookup.query_text, response)
+    
+    async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
+        """聊天接口"""
+        lookup = self._lookup_keys("chat", [message.model_dump() for message in messages], kwargs)
+        cached = await self._get(lookup)
+        if cached is not None:
+            return cached
+        
+        response = await self.inner.chat(messages, **kwargs)
+        await self._set(lookup, response)
+        return response
+    
+    async def generate(self, prompt: str, **kwargs) -> ModelResponse:
+        """文本生成接口，提示词按单条用户消息参与缓存"""
+        lookup = self._lookup_keys("generate", [{"role": "user", "content": prompt}], kwargs)
+        cached = await self._get(lookup)
+        if cached is not None:
+            return cached
+        
+        response = await self.inner.generate(prompt, **kwargs)
+        await self._set(lookup, response)
+        return response
+    
+    async def stream_chat(self, messages: List[ChatMessage], **kwargs):
+        """流式聊天接口，与 chat 共用缓存，命中时一次性返回完整内容"""
+        lookup = self._lookup_keys("chat", [message.model_dump() for message in messages], kwargs)
+        cached = await self._get(lookup)
+        if cached is not None:
+            yield cached.content
+            return
+        
+        chunks: List[str] = []
+        async for chunk in self.inner.stream_chat(messages, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        
+        # 只有完整读完的流才写入缓存
+        await self._set(lookup, ModelResponse(content="".join(chunks), model_name=self.config.model_name))
+
+
+# 创建全局响应缓存实例
+response_cache = ResponseCacheStore()
@@ -0,0 +1,425 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from app.config import settings
+from app.schemas.models import RoutingBackend, RoutingBackendStats, RoutingGroupInfo
+from app.services.model_gateway.models.base import BaseModelAdapter, ChatMessage, ModelConfig, ModelResponse
+from app.utils.logger import logger
+from app.utils.observability import MODEL_HEDGED_CALLS, MODEL_ROUTING_FAILOVERS
+
+if TYPE_CHECKING:
+    from app.services.model_gateway.gateway import ModelGateway
+
+# get_model 使用该提供商名称时，模型名称表示路由组
+ROUTING_PROVIDER = "group"
+
+# 后端返回空流时的首个片段占位
+_EMPTY_STREAM = object()
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """计算分位数（最近秩法），无数据时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(fraction * len(ordered)), len(ordered) - 1)
+    return ordered[index]
+
+
+class BackendStats:
+    """后端的滚动窗口统计
+    
+    保存最近 window 次调用的延迟和成败，完整调用延迟与流式首个片段延迟分开统计。
+    """
+    
+    def __init__(self, window: int = settings.MODEL_ROUTING_WINDOW):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.first_token_latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+    
+    def start(self) -> float:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+        return time.monotonic()
+    
+    def finish(self, started_at: float, success: bool, first_token: bool = False) -> None:
+        """记录调用结果，first_token 为 True 时记录的是流式首个片段延迟"""
+        elapsed = time.monotonic() - started_at
+        with self._lock:
+            self.in_flight -= 1
+            self.outcomes.append(success)
+            if not success:
+                self.errors += 1
+            elif first_token:
+                self.first_token_latencies.append(elapsed)
+            else:
+                self.latencies.append(elapsed)
+    
+    def release(self) -> None:
+        """调用被取消，不计入结果"""
+        with self._lock:
+            self.in_flight -= 1
+    
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+    
+    def samples(self, first_token: bool = False) -> int:
+        """窗口内的延迟样本数"""
+        with self._lock:
+            return len(self.first_token_latencies if first_token else self.latencies)
+    
+    def latency_percentile(self, fraction: float, first_token: bool = False) -> Optional[float]:
+        """窗口内延迟分位数（秒）"""
+        with self._lock:
+            values = list(self.first_token_latencies if first_token else self.latencies)
+        return percentile(values, fraction)
+    
+    def score(self, first_token: bool = False) -> Optional[float]:
+        """选择用的代价：p50 与 p95 的均值按错误率放大
+        
+        从未调用过的后端返回 None（优先探测），只有失败记录的后端代价为无穷大。
+        """
+        with self._lock:
+            explored = bool(self.outcomes)
+        if not explored:
+            return None
+        p50 = self.latency_percentile(0.5, first_token)
+        p95 = self.latency_percentile(0.95, first_token)
+        if p50 is None:
+            # 只有另一类调用的延迟样本时退回使用它
+            p50 = self.latency_percentile(0.5, not first_token)
+            p95 = self.latency_percentile(0.95, not first_token)
+        if p50 is None:
+            return float("inf")
+        return (p50 + p95) / 2 / max(1.0 - self.error_rate, 0.05)
+
+
+class HedgeBudget:
+    """对冲请求预算
+    
+    每次调用积累 ratio 个额度，每次对冲消耗 1 个额度，额度上限为 burst，
+    因此对冲请求数长期不超过调用数的 ratio 倍。
+    """
+    
+    def __init__(self, ratio: float = settings.MODEL_HEDGE_BUDGET, burst: float = settings.MODEL_HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.credits = 0.0
+        self._lock = threading.Lock()
+    
+    def record_call(self) -> None:
+        with self._lock:
+            self.credits = min(self.credits + self.ratio, self.burst)
+    
+    def acquire(self) -> bool:
+        """尝试消耗一次对冲额度"""
+        with self._lock:
+            if self.credits < 1.0:
+                return False
+            self.credits -= 1.0
+            return True
+
+
+class RoutingGroup:
+    """路由组：一组可以互相替代的后端模型"""
+    
+    def __init__(self, name: str, backends: List[RoutingBackend], hedge: bool = False):
+        if not backends:
+            raise ValueError(f"Routing group {name} has no backends")
+        self.name = name
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_budget = HedgeBudget()
+        self.stats = [BackendStats() for _ in backends]
+    
+    def order(self, first_token: bool = False) -> List[int]:
+        """返回本次调用尝试后端的顺序
+        
+        未调用过的后端优先；否则首选后端按代价倒数加权随机选出，既让延迟低、错误少的后端
+        承担大部分流量，也让其他后端持续获得样本；其余后端按代价升序作为故障转移候选。
+        """
+        scores = [stats.score(first_token) for stats in self.stats]
+        unexplored = [index for index, score in enumerate(scores) if score is None]
+        if unexplored:
+            first = random.choice(unexplored)
+        else:
+            weights = [1.0 / max(score, 1e-6) for score in scores]
+            # 只失败过的后端保留很小的权重，恢复后能重新获得流量
+            floor = min((weight for weight in weights if weight > 0), default=1.0) * 0.01
+            first = random.choices(range(len(scores)), weights=[weight or floor for weight in weights])[0]
+        rest = sorted(
+            (index for index in range(len(scores)) if index != first),
+            key=lambda index: scores[index] if scores[index] is not None else 0.0
+        )
+        return [first] + rest
+    
+    def info(self) -> RoutingGroupInfo:
+        """获取路由组统计信息"""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+        
+        return RoutingGroupInfo(
+            name=self.name,
+            hedge=self.hedge,
+            backends=[
+                RoutingBackendStats(
+                    provider=backend.provider,
+                    model_name=backend.model_name,
+                    base_url=backend.base_url,
+                    requests=stats.requests,
+                    errors=stats.errors,
+                    in_flight=stats.in_flight,
+                    error_rate=stats.error_rate,
+                    latency_p50_ms=ms(stats.latency_percentile(0.5)),
+                    latency_p95_ms=ms(stats.latency_percentile(0.95)),
+                    first_token_p50_ms=ms(stats.latency_percentile(0.5, first_token=True)),
+                    first_token_p95_ms=ms(stats.latency_percentile(0.95, first_token=True))
+                )
+                for backend, stats in zip(self.backends, self.stats)
+            ]
+        )
+
+
+class RoutedModelAdapter(BaseModelAdapter):
+    """路由组适配器
+    
+    每次调用按路由组的统计选择后端，失败时依次故障转移到其他后端。
+    后端适配器从网关池中获取，仍然经过缓存、请求合并和重试熔断等包装层。
+    流式调用只在产出第一个片段之前故障转移。
+    
+    开启对冲（路由组配置或调用参数 hedge=True）时，首选后端超过其历史延迟的
+    MODEL_HEDGE_PERCENTILE 分位仍未返回（流式调用为首个片段），就向下一个后端
+    （只有一个后端时为同一后端）发起对冲请求，取先完成的结果并取消另一个；
+    对冲请求数受 HedgeBudget 限制。
+    """
+    
+    def __init__(self, group: RoutingGroup, gateway: "ModelGateway"):
+        super().__init__(ModelConfig(model_name=group.name))
+        self.group = group
+        self.gateway = gateway
+    
+    def _backend(self, index: int) -> BaseModelAdapter:
+        backend = self.group.backends[index]
+        return self.gateway.get_model(
+            provider=backend.provider,
+            model_name=backend.model_name,
+            api_key=backend.api_key,
+            base_url=backend.base_url
+        )
+    
+    def _failover(self, index: int, error: Exception, remaining: int) -> None:
+        backend = self.group.backends[index]
+        logger.warning(
+            f"Routing group {self.group.name}: backend {backend.provider}:{backend.model_name} failed "
+            f"({type(error).__name__}: {str(error)}), {remaining} backend(s) left"
+        )
+        if remaining:
+            MODEL_ROUTING_FAILOVERS.labels(group=self.group.name).inc()
+    
+    def _hedge_delay(self, index: int, first_token: bool) -> Optional[float]:
+        """对冲等待时间，样本不足时返回 None（不对冲）"""
+        stats = self.group.stats[index]
+        if stats.samples(first_token) < settings.MODEL_HEDGE_MIN_SAMPLES:
+            return None
+        return stats.latency_percentile(settings.MODEL_HEDGE_PERCENTILE, first_token)
+    
+    async def _run(
+        self,
+        attempt: Callable[[int, Dict[str, Any]], Awaitable[Any]],
+        kwargs: Dict[str, Any],
+        first_token: bool = False,
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None
+    ) -> Any:
+        """按路由顺序执行调用，处理对冲和故障转移，返回胜出的结果
+        
+        discard 用于释放与胜出者同时完成、但被丢弃的结果（如已打开的流）。
+        """
+        hedge = kwargs.pop("hedge", None)
+        if hedge is None:
+            hedge = self.group.hedge
+        
+        candidates = self.group.order(first_token)
+        primary = candidates[0]
+        delay = self._hedge_delay(primary, first_token) if hedge else None
+        self.group.hedge_budget.record_call()
+        
+        tasks: Dict[asyncio.Task, int] = {}
+        hedge_tasks: Set[asyncio.Task] = set()
+        
+        def launch(hedged: bool = False) -> None:
+            index = candidates.pop(0) if candidates else primary
+            call_kwargs = dict(kwargs)
+            if hedged:
+                # 对冲请求不能与进行中的相同调用合并
+                call_kwargs["coalesce"] = False
+            task = asyncio.ensure_future(attempt(index, call_kwargs))
+            tasks[task] = index
+            if hedged:
+                hedge_tasks.add(task)
+        
+        launch()
+        last_error: Optional[Exception] = None
+        try:
+            while tasks:
+                timeout = delay if delay is not None and not hedge_tasks else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 首选后端超过阈值仍未返回，在预算内发起对冲请求
+                    delay = None
+                    if self.group.hedge_budget.acquire():
+                        launch(hedged=True)
+                        MODEL_HEDGED_CALLS.labels(group=self.group.name, outcome="launched").inc()
+                    else:
+                        MODEL_HEDGED_CALLS.labels(group=self.group.name, outcome="over_budget").inc()
+                    continue
+                
+                for task in done:
+                    index = tasks.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        self._failover(index, e, len(candidates) + len(tasks))
+                        continue
+                    if hedge_tasks:
+                        outcome = "hedge_won" if task in hedge_tasks else "primary_won"
+                        MODEL_HEDGED_CALLS.labels(group=self.group.name, outcome=outcome).inc()
+                    # 同一轮完成的其他结果仍在 tasks 中，由 finally 释放
+                    return result
+                
+                if not tasks and candidates:
+                    launch()
+            raise last_error
+        finally:
+            losers = list(tasks)
+            for task in losers:
+                task.cancel()
+            results = await asyncio.gather(*losers, return_exceptions=True)
+            if discard is not None:
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result)
+    
+    async def _attempt(self, index: int, method: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> ModelResponse:
+        """调用单个后端并记录统计"""
+        stats = self.group.stats[index]
+        started_at = stats.start()
+        try:
+            response = await getattr(self._backend(index), method)(*args, **kwargs)
+        except Exception:
+            stats.finish(started_at, success=False)
+            raise
+        except BaseException:
+            stats.release()
+            raise
+        stats.finish(started_at, success=True)
+        return response
+    
+    async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
+        """聊天接口"""
+        return await self._run(lambda index, call_kwargs: self._attempt(index, "chat", (messages,), call_kwargs), kwargs)
+    
+    async def generate(self, prompt: str, **kwargs) -> ModelResponse:
+        """文本生成接口"""
+        return await self._run(lambda index, call_kwargs: self._attempt(index, "generate", (prompt,), call_kwargs), kwargs)
+    
+    async def _open_stream(self, index: int, messages: List[ChatMessage], kwargs: Dict[str, Any]) -> Tuple[Any, Any]:
+        """打开单个后端的流并等待首个片段，返回 (流, 首个片段)，空流的首个片段为 _EMPTY_STREAM"""
+        stats = self.group.stats[index]
+        started_at = stats.start()
+        stream = self._backend(index).stream_chat(messages, **kwargs)
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = _EMPTY_STREAM
+        except Exception:
+            stats.finish(started_at, success=False)
+            raise
+        except BaseException:
+            stats.release()
+            await stream.aclose()
+            raise
+        stats.finish(started_at, success=True, first_token=True)
+        return stream, first
+    
+    async def stream_chat(self, messages: List[ChatMessage], **kwargs):
+        """流式聊天接口"""
+        async def discard(opened: Tuple[Any, Any]) -> None:
+            await opened[0].aclose()
+        
+        stream, first = await self._run(
+            lambda index, call_kwargs: self._open_stream(index, messages, call_kwargs),
+            kwargs,
+            first_token=True,
+            discard=discard
+        )
+        if first is _EMPTY_STREAM:
+            return
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+    
+    @property
+    def provider(self) -> str:
+        """获取模型提供商名称"""
+        return ROUTING_PROVIDER
+
+
+class ModelRouter:
+    """路由组管理器"""
+    
+    def __init__(self, gateway: "ModelGateway"):
+        self.gateway = gateway
+        self.groups: Dict[str, RoutingGroup] = {}
+        self._adapters: Dict[str, RoutedModelAdapter] = {}
+        self._lock = threading.Lock()
+        
+        for name, backends in settings.MODEL_ROUTING_GROUPS.items():
+            self.register_group(
+                name,
+                [RoutingBackend(**backend) for backend in backends],
+                hedge=name in settings.MODEL_HEDGED_GROUPS
+            )
+    
+    def register_group(self, name: str, backends: List[RoutingBackend], hedge: bool = False) -> RoutingGroup:
+        """注册或替换路由组（替换时重置统计），hedge 为 True 时默认对冲该组的调用"""
+        group = RoutingGroup(name, backends, hedge=hedge)
+        with self._lock:
+            self.groups[name] = group
+            self._adapters[name] = RoutedModelAdapter(group, self.gateway)
+        logger.info(f"Registered routing group {name} with {len(backends)} backend(s)")
+        return group
+    
+    def remove_group(self, name: str) -> bool:
+        """删除路由组"""
+        with self._lock:
+            self._adapters.pop(name, None)
+            return self.groups.pop(name, None) is not None
+    
+    def get_adapter(self, name: str) -> RoutedModelAdapter:
+        """获取路由组适配器"""
+        adapter = self._adapters.get(name)
+        if adapter is None:
+            raise ValueError(f"Routing group not found: {name}")
+        return adapter
+    
+    def list_groups(self) -> List[RoutingGroupInfo]:
+        """获取所有路由组及其后端统计"""
+        with self._lock:
+            groups = list(self.groups.values())
+        return [group.info() for group in groups]
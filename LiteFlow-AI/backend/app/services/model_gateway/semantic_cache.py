@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import uuid4
+from app.config import settings
+from app.services.model_gateway.models.base import ModelResponse
+from app.utils.logger import logger
+from app.utils.observability import (
+    MODEL_SEMANTIC_CACHE_HITS, MODEL_SEMANTIC_CACHE_MISSES, MODEL_SEMANTIC_CACHE_SAVED_TOKENS
+)
+
+
+class SemanticCacheStore:
+    """模型响应语义缓存
+    
+    以最后一条用户消息为文档写入专用的 Chroma 集合（余弦距离），查询时取最近邻，
+    相似度不低于阈值时返回缓存的响应。scope 为调用方的缓存命名空间（提供商、凭证指纹和端点），
+    context_key 覆盖命名空间、模型、采样参数和之前的消息，查询只在同一 scope 且上下文完全一致的条目中进行，
+    不同凭证之间不会互相命中。
+    默认复用知识库管理器的持久化 Chroma 客户端。
+    """
+    
+    def __init__(
+        self,
+        threshold: float = settings.MODEL_SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = settings.MODEL_SEMANTIC_CACHE_TTL,
+        collection_name: str = settings.MODEL_SEMANTIC_CACHE_COLLECTION,
+        client: Any = None
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.collection_name = collection_name
+        self._client = client
+        self._collection = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+    
+    def _get_collection(self):
+        """获取缓存集合，首次调用时创建"""
+        with self._lock:
+            if self._collection is None:
+                if self._client is None:
+                    from app.services.knowledge_base.knowledge_base_manager import knowledge_base_manager
+                    self._client = knowledge_base_manager.chroma_client
+                self._collection = self._client.get_or_create_collection(
+                    name=self.collection_name,
+                    metadata={"hnsw:space": "cosine"}
+                )
+            return self._collection
+    
+    async def get(self, scope: str, context_key: str, text: str) -> Optional[ModelResponse]:
+        """查找语义相近的缓存响应，未命中或查询失败时返回 None"""
+        try:
+            match = await asyncio.to_thread(self._query, scope, context_key, text)
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {str(e)}")
+            match = None
+        
+        if match is None:
+            self.misses += 1
+            MODEL_SEMANTIC_CACHE_MISSES.inc()
+            return None
+        
+        response = ModelResponse.model_validate_json(match)
+        saved = response.tokens_used.get("total_tokens", 0)
+        self.hits += 1
+        self.saved_tokens += saved
+        MODEL_SEMANTIC_CACHE_HITS.inc()
+        MODEL_SEMANTIC_CACHE_SAVED_TOKENS.inc(saved)
+        return response
+    
+    async def set(self, scope: str, context_key: str, text: str, response: ModelResponse) -> None:
+        """写入缓存响应"""
+        try:
+            await asyncio.to_thread(self._add, scope, context_key, text, response.model_dump_json())
+        except Exception as e:
+            logger.error(f"Failed to write semantic cache: {str(e)}")
+    
+    def _query(self, scope: str, context_key: str, text: str) -> Optional[str]:
+        results = self._get_collection().query(
+            query_texts=[text],
+            n_results=1,
+            where={"$and": [
+                {"scope": scope},
+                {"context_key": context_key},
+                {"expires_at": {"$gt": time.time()}}
+            ]},
+            include=["metadatas", "distances"]
+        )
+        if not results["ids"] or not results["ids"][0]:
+            return None
+        
+        # 余弦距离转换为相似度
+        similarity = 1.0 - results["distances"][0][0]
+        if similarity < self.threshold:
+            return None
+        return results["metadatas"][0][0]["response"]
+    
+    def _add(self, scope: str, context_key: str, text: str, data: str) -> None:
+        collection = self._get_collection()
+        now = time.time()
+        collection.add(
+            ids=[str(uuid4())],
+            documents=[text],
+            metadatas=[{"scope": scope, "context_key": context_key, "expires_at": now + self.ttl, "response": data}]
+        )
+        
+        # 定期清理过期条目
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        if prune:
+            collection.delete(where={"expires_at": {"$lte": now}})
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_tokens": self.saved_tokens
+        }
+
+
+# 创建全局语义缓存实例
+semantic_cache = SemanticCacheStore()
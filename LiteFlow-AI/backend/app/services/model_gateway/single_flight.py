@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+from fastapi.encoders import jsonable_encoder
+from app.config import settings
+from app.services.model_gateway.models.base import CALL_CONTROL_PARAMS, ChatMessage, DelegatingModelAdapter, ModelResponse
+from app.utils.observability import MODEL_COALESCED_CALLS
+
+
+class _Flight:
+    """一次进行中的上游调用及其等待方"""
+    
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        # 流式调用已产出的片段，后加入的订阅方从头重放
+        self.chunks: List[str] = []
+        self.changed = asyncio.Event()
+
+
+class SingleFlightModelAdapter(DelegatingModelAdapter):
+    """请求合并（single-flight）适配器
+    
+    参数完全相同的并发调用共享同一次上游调用和结果；流式调用的片段会分发给所有订阅方。
+    某个调用方取消时不影响其他调用方，所有调用方都离开后才取消上游调用。
+    """
+    
+    def __init__(self, inner):
+        super().__init__(inner)
+        self._flights: Dict[str, _Flight] = {}
+    
+    @staticmethod
+    def _flight_key(method: str, payload: Any, kwargs: Dict[str, Any]) -> Optional[str]:
+        """计算合并键，调用参数 coalesce=False 或参数无法序列化时返回 None（不合并）"""
+        coalesce = kwargs.pop("coalesce", True)
+        if not settings.MODEL_SINGLE_FLIGHT_ENABLED or not coalesce:
+            return None
+        kwargs = {name: value for name, value in kwargs.items() if name not in CALL_CONTROL_PARAMS}
+        try:
+            canonical = json.dumps(
+                jsonable_encoder({"method": method, "payload": payload, "kwargs": kwargs}),
+                sort_keys=True,
+                separators=(",", ":"),
+                ensure_ascii=False
+            )
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(canonical.encode()).hexdigest()
+    
+    async def _join(self, key: Optional[str], method: str, call) -> ModelResponse:
+        """加入或发起一次调用并等待结果"""
+        if key is None:
+            return await call()
+        
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(call())
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            MODEL_COALESCED_CALLS.labels(method=method).inc()
+        
+        flight.waiters += 1
+        try:
+            # shield 保证单个调用方取消时上游调用继续为其他调用方服务
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+    
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+    
+    async def chat(self, messages: List[ChatMessage], **kwargs) -> ModelResponse:
+        """聊天接口"""
+        key = self._flight_key("chat", [message.model_dump() for message in messages], kwargs)
+        return await self._join(key, "chat", lambda: self.inner.chat(messages, **kwargs))
+    
+    async def generate(self, prompt: str, **kwargs) -> ModelResponse:
+        """文本生成接口"""
+        key = self._flight_key("generate", prompt, kwargs)
+        return await self._join(key, "generate", lambda: self.inner.generate(prompt, **kwargs))
+    
+    async def stream_chat(self, messages: List[ChatMessage], **kwargs):
+        """流式聊天接口，相同的并发流共享一次上游流"""
+        key = self._flight_key("stream_chat", [message.model_dump() for message in messages], kwargs)
+        if key is None:
+            async for chunk in self.inner.stream_chat(messages, **kwargs):
+                yield chunk
+            return
+        
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(self._produce(flight, messages, kwargs))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            MODEL_COALESCED_CALLS.labels(method="stream_chat").inc()
+        
+        flight.waiters += 1
+        try:
+            position = 0
+            while True:
+                while position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                if flight.task.done():
+                    # 上游异常时抛给所有订阅方
+                    flight.task.result()
+                    return
+                flight.changed.clear()
+                await flight.changed.wait()
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+    
+    async def _produce(self, flight: _Flight, messages: List[ChatMessage], kwargs: Dict[str, Any]) -> None:
+        """读取上游流并通知订阅方"""
+        try:
+            async for chunk in self.inner.stream_chat(messages, **kwargs):
+                flight.chunks.append(chunk)
+                flight.changed.set()
+        finally:
+            flight.changed.set()
@@ -6,7 +6,7 @@ from app.schemas.prompt import (
     PromptTestRequest, PromptTestResponse,
     PromptTemplate, PromptVariable
 )
-from app.services.model_gateway.gateway import ModelGateway
+from app.services.model_gateway.gateway import model_gateway
 from app.services.model_gateway.models.base import ChatMessage
 
 
@@ -14,7 +14,7 @@ class PromptService:
     """提示词服务类"""
     
     def __init__(self):
-        self.model_gateway = ModelGateway()
+        self.model_gateway = model_gateway
         self.templates: Dict[str, PromptTemplate] = {}
         self.variable_pattern = re.compile(r'\{\{\s*([a-zA-Z0-9_]+)\s*\}\}')
     
@@ -70,9 +70,14 @@ class PromptService:
         ]
         
         # 调用模型
-        response = await self.model_gateway.chat(
+        model = self.model_gateway.get_model(
+            provider=model_config.get('provider', 'openai'),
             model_name=model_name,
-            messages=chat_messages,
+            api_key=model_config.get('api_key'),
+            base_url=model_config.get('base_url')
+        )
+        response = await model.chat(
+            chat_messages,
             temperature=temperature,
             max_tokens=max_tokens
         )
@@ -1,8 +1,27 @@
 from .workflow_manager import WorkflowManager, workflow_manager
-from .workflow_executor import WorkflowExecutor
+from .workflow_executor import WorkflowExecutor, WorkflowInstanceConflictError, workflow_executor
+from .graph_cache import CompiledGraphCache, compiled_graph_cache
+from .worker_pool import WorkflowWorkerPool, WorkflowQueueFullError, workflow_worker_pool
+from .instance_store import WorkflowInstanceStore
+from .node_cache import NodeResultCache, node_result_cache
+from .checkpoint import CheckpointStore, SQLiteCheckpointStore, InMemoryCheckpointStore, checkpoint_store
 
 __all__ = [
     "WorkflowManager",
     "workflow_manager",
-    "WorkflowExecutor"
+    "WorkflowExecutor",
+    "WorkflowInstanceConflictError",
+    "workflow_executor",
+    "WorkflowWorkerPool",
+    "WorkflowQueueFullError",
+    "workflow_worker_pool",
+    "CompiledGraphCache",
+    "compiled_graph_cache",
+    "WorkflowInstanceStore",
+    "NodeResultCache",
+    "node_result_cache",
+    "CheckpointStore",
+    "SQLiteCheckpointStore",
+    "InMemoryCheckpointStore",
+    "checkpoint_store"
 ]
\ No newline at end of file
@@ -0,0 +1,244 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.schemas.workflow import WorkflowCheckpoint, WorkflowDefinition, WorkflowInstance
+from app.utils.logger import logger
+
+
+class CheckpointStore(ABC):
+    """工作流检查点存储抽象基类
+    
+    save 只负责暂存最新状态并返回是否需要落盘，flush 执行实际写入，
+    以便调用方在事件循环之外完成 I/O。
+    """
+    
+    @abstractmethod
+    def save(self, instance: WorkflowInstance, workflow: Optional[WorkflowDefinition] = None) -> bool:
+        """暂存实例状态，返回是否应立即调用 flush"""
+        pass
+    
+    @abstractmethod
+    def flush(self) -> None:
+        """将暂存的状态写入存储"""
+        pass
+    
+    @abstractmethod
+    def load(self, instance_id: str) -> Optional[WorkflowCheckpoint]:
+        """加载实例检查点"""
+        pass
+    
+    @abstractmethod
+    def delete(self, instance_id: str) -> bool:
+        """删除实例检查点"""
+        pass
+    
+    @abstractmethod
+    def list_instance_ids(self, status: Optional[str] = None) -> List[str]:
+        """列出已保存检查点的实例ID"""
+        pass
+
+
+class InMemoryCheckpointStore(CheckpointStore):
+    """内存检查点存储，进程重启后数据丢失，仅用于开发调试"""
+    
+    def __init__(self):
+        self._checkpoints: Dict[str, WorkflowCheckpoint] = {}
+        self._lock = threading.Lock()
+    
+    def save(self, instance: WorkflowInstance, workflow: Optional[WorkflowDefinition] = None) -> bool:
+        with self._lock:
+            previous = self._checkpoints.get(instance.instance_id)
+            self._checkpoints[instance.instance_id] = WorkflowCheckpoint(
+                instance=instance.model_copy(deep=True),
+                workflow=workflow or (previous.workflow if previous else None)
+            )
+        return False
+    
+    def flush(self) -> None:
+        pass
+    
+    def load(self, instance_id: str) -> Optional[WorkflowCheckpoint]:
+        with self._lock:
+            checkpoint = self._checkpoints.get(instance_id)
+            return checkpoint.model_copy(deep=True) if checkpoint else None
+    
+    def delete(self, instance_id: str) -> bool:
+        with self._lock:
+            return self._checkpoints.pop(instance_id, None) is not None
+    
+    def list_instance_ids(self, status: Optional[str] = None) -> List[str]:
+        with self._lock:
+            return [
+                instance_id for instance_id, checkpoint in self._checkpoints.items()
+                if status is None or checkpoint.instance.status == status
+            ]
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """基于本地SQLite文件的检查点存储
+    
+    每次状态变更只更新内存中的待写缓冲（同一实例只保留最新状态），累计变更数达到
+    batch_size 或距上次写入超过 flush_interval 秒时，在一个事务内批量写入。
+    进程异常退出最多丢失最近一个批次的状态变更，batch_size 设为 1 即为逐条写入。
+    """
+    
+    def __init__(
+        self,
+        path: str = settings.WORKFLOW_CHECKPOINT_PATH,
+        batch_size: int = settings.WORKFLOW_CHECKPOINT_BATCH_SIZE,
+        flush_interval: float = settings.WORKFLOW_CHECKPOINT_FLUSH_INTERVAL
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS workflow_checkpoints (
+                instance_id TEXT PRIMARY KEY,
+                workflow_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                instance_data TEXT NOT NULL,
+                workflow_data TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_workflow_checkpoints_status ON workflow_checkpoints (status)"
+        )
+        self._connection.commit()
+        
+        # 待写缓冲：instance_id -> (workflow_id, status, instance_data, workflow_data)
+        self._pending: Dict[str, Tuple[str, str, str, Optional[str]]] = {}
+        self._pending_changes = 0
+        self._last_flush = time.monotonic()
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+    
+    def save(self, instance: WorkflowInstance, workflow: Optional[WorkflowDefinition] = None) -> bool:
+        instance_data = instance.model_dump_json()
+        workflow_data = workflow.model_dump_json() if workflow else None
+        
+        with self._buffer_lock:
+            previous = self._pending.get(instance.instance_id)
+            if workflow_data is None and previous:
+                workflow_data = previous[3]
+            self._pending[instance.instance_id] = (
+                instance.workflow_id, instance.status, instance_data, workflow_data
+            )
+            self._pending_changes += 1
+            return (
+                self._pending_changes >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+    
+    def flush(self) -> None:
+        with self._buffer_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            self._pending_changes = 0
+            self._last_flush = time.monotonic()
+        
+        now = time.time()
+        rows = [
+            (instance_id, workflow_id, status, instance_data, workflow_data, now)
+            for instance_id, (workflow_id, status, instance_data, workflow_data) in pending.items()
+        ]
+        
+        try:
+            with self._write_lock, self._connection:
+                self._connection.executemany(
+                    """
+                    INSERT INTO workflow_checkpoints
+                        (instance_id, workflow_id, status, instance_data, workflow_data, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(instance_id) DO UPDATE SET
+                        status = excluded.status,
+                        instance_data = excluded.instance_data,
+                        workflow_data = COALESCE(excluded.workflow_data, workflow_checkpoints.workflow_data),
+                        updated_at = excluded.updated_at
+                    """,
+                    rows
+                )
+        except Exception as e:
+            # 写入失败时放回缓冲，未被更新的状态在下次写入时重试
+            with self._buffer_lock:
+                for instance_id, entry in pending.items():
+                    self._pending.setdefault(instance_id, entry)
+            logger.error(f"Failed to flush workflow checkpoints: {str(e)}")
+            raise
+    
+    def load(self, instance_id: str) -> Optional[WorkflowCheckpoint]:
+        with self._buffer_lock:
+            pending = self._pending.get(instance_id)
+        
+        with self._write_lock:
+            row = self._connection.execute(
+                "SELECT instance_data, workflow_data FROM workflow_checkpoints WHERE instance_id = ?",
+                (instance_id,)
+            ).fetchone()
+        
+        if pending:
+            instance_data, workflow_data = pending[2], pending[3] or (row[1] if row else None)
+        elif row:
+            instance_data, workflow_data = row
+        else:
+            return None
+        
+        return WorkflowCheckpoint(
+            instance=WorkflowInstance.model_validate_json(instance_data),
+            workflow=WorkflowDefinition.model_validate_json(workflow_data) if workflow_data else None
+        )
+    
+    def delete(self, instance_id: str) -> bool:
+        with self._buffer_lock:
+            pending = self._pending.pop(instance_id, None)
+        
+        with self._write_lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM workflow_checkpoints WHERE instance_id = ?", (instance_id,)
+            )
+        return cursor.rowcount > 0 or pending is not None
+    
+    def list_instance_ids(self, status: Optional[str] = None) -> List[str]:
+        self.flush()
+        with self._write_lock:
+            if status is None:
+                rows = self._connection.execute("SELECT instance_id FROM workflow_checkpoints").fetchall()
+            else:
+                rows = self._connection.execute(
+                    "SELECT instance_id FROM workflow_checkpoints WHERE status = ?", (status,)
+                ).fetchall()
+        return [row[0] for row in rows]
+    
+    def close(self) -> None:
+        """写入剩余状态并关闭连接"""
+        self.flush()
+        with self._write_lock:
+            self._connection.close()
+
+
+def create_checkpoint_store() -> CheckpointStore:
+    """根据配置创建检查点存储"""
+    backend = settings.WORKFLOW_CHECKPOINT_BACKEND
+    if backend == "sqlite":
+        return SQLiteCheckpointStore()
+    if backend == "memory":
+        return InMemoryCheckpointStore()
+    raise ValueError(f"Unsupported workflow checkpoint backend: {backend}")
+
+
+# 创建全局检查点存储实例
+checkpoint_store = create_checkpoint_store()
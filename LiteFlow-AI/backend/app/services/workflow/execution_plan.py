@@ -0,0 +1,171 @@
+from collections import deque
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from app.schemas.workflow import WorkflowDefinition, WorkflowNode, WorkflowEdge
+from app.services.workflow.expressions import CompiledExpression, compile_expression
+from app.services.workflow.graph_cache import CompiledGraphCache
+
+
+class ExecutionPlan:
+    """工作流执行计划
+    
+    每个工作流版本只构建一次的只读索引：节点ID到节点的映射、每个节点的出边列表，
+    以及出边中条件边与默认边的拆分，使执行时的每一步查找只与节点出度相关。
+    同时对入口可达的子图做拓扑分析，供调度器并发执行相互独立的分支；
+    条件边和条件节点上的表达式在构建时编译，执行时直接调用。
+    """
+    
+    __slots__ = (
+        "workflow_id", "version", "entry_point", "exit_point",
+        "nodes", "outgoing_edges", "conditional_edges", "default_edges",
+        "predecessors", "topological_order", "is_acyclic", "conditions"
+    )
+    
+    def __init__(
+        self,
+        workflow_id: str,
+        version: str,
+        entry_point: str,
+        exit_point: Optional[str],
+        nodes: Mapping[str, WorkflowNode],
+        outgoing_edges: Mapping[str, Tuple[WorkflowEdge, ...]],
+        conditional_edges: Mapping[str, Tuple[WorkflowEdge, ...]],
+        default_edges: Mapping[str, Tuple[WorkflowEdge, ...]],
+        predecessors: Mapping[str, Tuple[str, ...]],
+        topological_order: Mapping[str, int],
+        is_acyclic: bool,
+        conditions: Mapping[str, CompiledExpression]
+    ):
+        self.workflow_id = workflow_id
+        self.version = version
+        self.entry_point = entry_point
+        self.exit_point = exit_point
+        self.nodes = nodes
+        self.outgoing_edges = outgoing_edges
+        self.conditional_edges = conditional_edges
+        self.default_edges = default_edges
+        self.predecessors = predecessors
+        self.topological_order = topological_order
+        self.is_acyclic = is_acyclic
+        self.conditions = conditions
+    
+    @classmethod
+    def build(cls, workflow: WorkflowDefinition) -> "ExecutionPlan":
+        """根据工作流定义构建执行计划"""
+        nodes: Dict[str, WorkflowNode] = {}
+        for node in workflow.nodes:
+            if node.node_id in nodes:
+                raise ValueError(f"Duplicate node ID in workflow {workflow.workflow_id}: {node.node_id}")
+            nodes[node.node_id] = node
+        
+        if workflow.entry_point not in nodes:
+            raise ValueError(f"Entry point {workflow.entry_point} not found in workflow {workflow.workflow_id}")
+        
+        outgoing: Dict[str, List[WorkflowEdge]] = {node_id: [] for node_id in nodes}
+        for edge in workflow.edges:
+            if edge.source not in nodes:
+                raise ValueError(f"Edge {edge.edge_id} references unknown source node: {edge.source}")
+            if edge.target not in nodes:
+                raise ValueError(f"Edge {edge.edge_id} references unknown target node: {edge.target}")
+            outgoing[edge.source].append(edge)
+        
+        predecessors, topological_order, is_acyclic = cls._analyze(workflow.entry_point, outgoing)
+        
+        # 编译条件表达式，相同表达式共用一个编译结果
+        conditions: Dict[str, CompiledExpression] = {}
+        for node_id, edges in outgoing.items():
+            sources = [edge.condition for edge in edges if edge.condition]
+            if sources and nodes[node_id].type == "condition":
+                node_condition = nodes[node_id].config.get("condition", "")
+                if not node_condition:
+                    raise ValueError(f"Condition node {node_id} has no condition expression")
+                sources.append(node_condition)
+            for source in sources:
+                if source not in conditions:
+                    conditions[source] = compile_expression(source)
+        
+        return cls(
+            workflow_id=workflow.workflow_id,
+            version=CompiledGraphCache.workflow_version(workflow),
+            entry_point=workflow.entry_point,
+            exit_point=workflow.exit_point,
+            nodes=MappingProxyType(nodes),
+            outgoing_edges=MappingProxyType({
+                node_id: tuple(edges) for node_id, edges in outgoing.items()
+            }),
+            conditional_edges=MappingProxyType({
+                node_id: tuple(edge for edge in edges if edge.condition)
+                for node_id, edges in outgoing.items()
+            }),
+            default_edges=MappingProxyType({
+                node_id: tuple(edge for edge in edges if not edge.condition)
+                for node_id, edges in outgoing.items()
+            }),
+            predecessors=MappingProxyType(predecessors),
+            topological_order=MappingProxyType(topological_order),
+            is_acyclic=is_acyclic,
+            conditions=MappingProxyType(conditions)
+        )
+    
+    @staticmethod
+    def _analyze(
+        entry_point: str,
+        outgoing: Dict[str, List[WorkflowEdge]]
+    ) -> Tuple[Dict[str, Tuple[str, ...]], Dict[str, int], bool]:
+        """对入口可达子图做拓扑分析，返回前驱表、拓扑序号和是否无环"""
+        # 入口可达的节点
+        reachable = {entry_point}
+        queue = deque([entry_point])
+        while queue:
+            for edge in outgoing[queue.popleft()]:
+                if edge.target not in reachable:
+                    reachable.add(edge.target)
+                    queue.append(edge.target)
+        
+        # 可达子图上的前驱（去重并保持边的声明顺序）
+        predecessors: Dict[str, List[str]] = {node_id: [] for node_id in reachable}
+        for node_id in reachable:
+            for edge in outgoing[node_id]:
+                if node_id not in predecessors[edge.target]:
+                    predecessors[edge.target].append(node_id)
+        
+        # Kahn算法求拓扑序，有环时剩余节点无法排序
+        in_degree = {node_id: len(preds) for node_id, preds in predecessors.items()}
+        queue = deque(node_id for node_id in predecessors if in_degree[node_id] == 0)
+        topological_order: Dict[str, int] = {}
+        while queue:
+            node_id = queue.popleft()
+            topological_order[node_id] = len(topological_order)
+            for target in dict.fromkeys(edge.target for edge in outgoing[node_id]):
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    queue.append(target)
+        
+        is_acyclic = len(topological_order) == len(reachable)
+        return (
+            {node_id: tuple(preds) for node_id, preds in predecessors.items()},
+            topological_order,
+            is_acyclic
+        )
+    
+    def get_node(self, node_id: str) -> WorkflowNode:
+        """根据ID获取节点"""
+        node = self.nodes.get(node_id)
+        if node is None:
+            raise ValueError(f"Node {node_id} not found in workflow {self.workflow_id}")
+        return node
+    
+    def successors(self, node_id: str) -> Tuple[str, ...]:
+        """获取节点所有可能的后继节点ID"""
+        return tuple(edge.target for edge in self.outgoing_edges.get(node_id, ()))
+    
+    def evaluate_condition(self, condition: str, context: Mapping[str, Any]) -> bool:
+        """使用预编译的表达式评估条件"""
+        compiled = self.conditions.get(condition)
+        if compiled is None:
+            compiled = compile_expression(condition)
+        return bool(compiled(context))
+    
+    def default_targets(self, node_id: str) -> List[str]:
+        """获取节点所有默认边的目标节点ID"""
+        return [edge.target for edge in self.default_edges.get(node_id, ())]
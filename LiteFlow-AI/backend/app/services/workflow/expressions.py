@@ -0,0 +1,204 @@
+import ast
+import operator
+from functools import lru_cache
+from numbers import Number
+from typing import Any, Callable, Mapping
+
+# 编译后的条件表达式：接收上下文，返回表达式的值
+CompiledExpression = Callable[[Mapping[str, Any]], Any]
+
+_LITERAL_NAMES = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+
+def _ordering(compare: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    """大小比较：任一操作数为 None（如变量不存在）时结果为 False"""
+    def apply(a, b):
+        if a is None or b is None:
+            return False
+        return compare(a, b)
+    return apply
+
+
+def _null_propagating(apply: Callable[..., Any]) -> Callable[..., Any]:
+    """算术运算：任一操作数为 None 时结果为 None"""
+    def evaluate(*operands):
+        if any(operand is None for operand in operands):
+            return None
+        return apply(*operands)
+    return evaluate
+
+
+def _numeric(symbol: str, apply: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    """只接受数字的运算，拒绝序列重复（'x' * n）和字符串格式化（'%d' % n）等可能耗尽内存的用法"""
+    def evaluate(a, b):
+        if not isinstance(a, Number) or not isinstance(b, Number):
+            raise ValueError(
+                f"Operator {symbol} only supports numbers in condition expressions, "
+                f"got {type(a).__name__} and {type(b).__name__}"
+            )
+        return apply(a, b)
+    return evaluate
+
+
+_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: _ordering(operator.lt),
+    ast.LtE: _ordering(operator.le),
+    ast.Gt: _ordering(operator.gt),
+    ast.GtE: _ordering(operator.ge),
+    ast.In: lambda a, b: b is not None and a in b,
+    ast.NotIn: lambda a, b: b is None or a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not
+}
+
+_BINARY_OPERATORS = {
+    ast.Add: _null_propagating(operator.add),
+    ast.Sub: _null_propagating(operator.sub),
+    ast.Mult: _null_propagating(_numeric("*", operator.mul)),
+    ast.Div: _null_propagating(operator.truediv),
+    ast.Mod: _null_propagating(_numeric("%", operator.mod))
+}
+
+_UNARY_OPERATORS = {
+    ast.Not: operator.not_,
+    ast.USub: _null_propagating(operator.neg),
+    ast.UAdd: _null_propagating(operator.pos)
+}
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(source: str) -> CompiledExpression:
+    """将条件表达式编译为闭包
+    
+    支持的语法：字面量（数字、字符串、true/false/null）、变量、属性与下标访问、
+    比较运算（含 in / not in / is）、and / or / not、四则与取模运算以及列表/元组字面量。
+    不支持函数调用、赋值、lambda、推导式等其他语法，也不允许访问下划线开头的属性。
+    乘法和取模只接受数字，序列重复和字符串格式化在求值时抛出 ValueError。
+    变量、键或属性不存在时取值为 None：与 None 的大小比较结果为 False，in 右侧为 None 时结果为 False，
+    含 None 的算术运算结果为 None，== / != / is 按原值比较。求值过程不会复制上下文。
+    """
+    if not source or not source.strip():
+        raise ValueError("Condition expression is empty")
+    
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid condition expression {source!r}: {e.msg}")
+    
+    return _compile_node(tree.body, source)
+
+
+def _compile_node(node: ast.AST, source: str) -> CompiledExpression:
+    """递归编译语法树节点"""
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda context: value
+    
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in _LITERAL_NAMES:
+            value = _LITERAL_NAMES[name]
+            return lambda context: value
+        return lambda context: context.get(name)
+    
+    if isinstance(node, ast.Attribute):
+        if node.attr.startswith("_"):
+            raise ValueError(f"Access to private attribute {node.attr!r} is not allowed in {source!r}")
+        target = _compile_node(node.value, source)
+        attr = node.attr
+        return lambda context: _get_member(target(context), attr)
+    
+    if isinstance(node, ast.Subscript):
+        target = _compile_node(node.value, source)
+        key = _compile_node(node.slice, source)
+        return lambda context: _get_item(target(context), key(context))
+    
+    if isinstance(node, ast.BoolOp):
+        operands = tuple(_compile_node(value, source) for value in node.values)
+        if isinstance(node.op, ast.And):
+            def evaluate_and(context):
+                result = None
+                for operand in operands:
+                    result = operand(context)
+                    if not result:
+                        return result
+                return result
+            return evaluate_and
+        
+        def evaluate_or(context):
+            result = None
+            for operand in operands:
+                result = operand(context)
+                if result:
+                    return result
+            return result
+        return evaluate_or
+    
+    if isinstance(node, ast.Compare):
+        left = _compile_node(node.left, source)
+        comparisons = tuple(
+            (_lookup_operator(_COMPARE_OPERATORS, op, source), _compile_node(comparator, source))
+            for op, comparator in zip(node.ops, node.comparators)
+        )
+        if len(comparisons) == 1:
+            compare, right = comparisons[0]
+            return lambda context: compare(left(context), right(context))
+        
+        def evaluate_chain(context):
+            current = left(context)
+            for compare, right in comparisons:
+                value = right(context)
+                if not compare(current, value):
+                    return False
+                current = value
+            return True
+        return evaluate_chain
+    
+    if isinstance(node, ast.UnaryOp):
+        apply = _lookup_operator(_UNARY_OPERATORS, node.op, source)
+        operand = _compile_node(node.operand, source)
+        return lambda context: apply(operand(context))
+    
+    if isinstance(node, ast.BinOp):
+        apply = _lookup_operator(_BINARY_OPERATORS, node.op, source)
+        left = _compile_node(node.left, source)
+        right = _compile_node(node.right, source)
+        return lambda context: apply(left(context), right(context))
+    
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = tuple(_compile_node(item, source) for item in node.elts)
+        return lambda context: tuple(item(context) for item in items)
+    
+    raise ValueError(f"Unsupported syntax {type(node).__name__} in condition expression {source!r}")
+
+
+def _lookup_operator(operators: Mapping[type, Callable], op: ast.AST, source: str) -> Callable:
+    """查找运算符实现"""
+    implementation = operators.get(type(op))
+    if implementation is None:
+        raise ValueError(f"Unsupported operator {type(op).__name__} in condition expression {source!r}")
+    return implementation
+
+
+def _get_member(value: Any, name: str) -> Any:
+    """属性访问：字典取键，其他对象取属性"""
+    if value is None:
+        return None
+    if isinstance(value, Mapping):
+        return value.get(name)
+    return getattr(value, name, None)
+
+
+def _get_item(value: Any, key: Any) -> Any:
+    """下标访问，键或下标不存在时返回 None"""
+    if value is None:
+        return None
+    if isinstance(value, Mapping):
+        return value.get(key)
+    try:
+        return value[key]
+    except (IndexError, KeyError, TypeError):
+        return None
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+from app.config import settings
+from app.schemas.workflow import WorkflowDefinition
+from app.utils.logger import logger
+
+
+class CompiledGraphCache:
+    """已编译工作流图缓存
+    
+    以 (workflow_id, 版本号) 为键缓存编译产物，版本号即 updated_at：工作流管理器更新工作流时刷新
+    updated_at 并使旧版本失效，命中时不需要序列化或哈希整个定义；超出容量时按 LRU 淘汰。
+    """
+    
+    def __init__(self, max_size: int = settings.WORKFLOW_GRAPH_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def workflow_version(workflow: WorkflowDefinition) -> str:
+        """计算工作流版本号"""
+        return workflow.updated_at.isoformat()
+    
+    def get_or_build(self, workflow: WorkflowDefinition, builder: Callable[[WorkflowDefinition], Any]) -> Any:
+        """获取已编译的图，不存在时调用 builder 编译并缓存"""
+        key = (workflow.workflow_id, self.workflow_version(workflow))
+        
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        
+        # 编译放在锁外，避免大图编译阻塞其他工作流的缓存命中
+        compiled = builder(workflow)
+        
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                evicted_key, _ = self._entries.popitem(last=False)
+                logger.info(f"Evicted compiled workflow graph: {evicted_key[0]}")
+        
+        logger.info(f"Compiled workflow graph cached: {workflow.workflow_id}")
+        return compiled
+    
+    def invalidate(self, workflow_id: str) -> int:
+        """使某个工作流的所有缓存版本失效"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == workflow_id]
+            for key in keys:
+                del self._entries[key]
+        
+        if keys:
+            logger.info(f"Invalidated {len(keys)} compiled graph(s) for workflow: {workflow_id}")
+        return len(keys)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# 创建全局编译图缓存实例
+compiled_graph_cache = CompiledGraphCache()
@@ -0,0 +1,184 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.schemas.workflow import WorkflowInstance
+from app.utils.logger import logger
+
+# 可被保留策略淘汰的实例状态（已结束的实例仍可通过检查点加载）
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class WorkflowInstanceStore:
+    """工作流实例存储
+    
+    每个实例按创建顺序分配递增序号，并维护按工作流和按状态的二级索引（序号有序列表），
+    分页查询按序号倒序（最新优先），游标为上一页最后一个实例的序号。
+    实例状态会被执行器原地修改，修改后需调用 reindex 同步状态索引。
+    保留策略只淘汰已结束的实例：超过 max_age 秒，或同一工作流的实例数超过 max_per_workflow 时
+    从最旧的开始淘汰。
+    """
+    
+    def __init__(
+        self,
+        max_age: float = settings.WORKFLOW_INSTANCE_MAX_AGE,
+        max_per_workflow: int = settings.WORKFLOW_INSTANCE_MAX_PER_WORKFLOW
+    ):
+        self.max_age = max_age
+        self.max_per_workflow = max_per_workflow
+        self._instances: Dict[str, WorkflowInstance] = {}
+        self._sequence: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._order: List[int] = []
+        self._indexed_status: Dict[str, str] = {}
+        self._by_workflow: Dict[str, List[int]] = {}
+        self._by_status: Dict[str, List[int]] = {}
+        self._next_sequence = 0
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return len(self._instances)
+    
+    def __contains__(self, instance_id: str) -> bool:
+        return instance_id in self._instances
+    
+    def get(self, instance_id: str) -> Optional[WorkflowInstance]:
+        """获取实例"""
+        return self._instances.get(instance_id)
+    
+    def add(self, instance: WorkflowInstance) -> None:
+        """添加实例，已存在时替换并保留原有序号"""
+        with self._lock:
+            if instance.instance_id in self._instances:
+                self._instances[instance.instance_id] = instance
+                self.reindex(instance)
+                return
+            
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            self._instances[instance.instance_id] = instance
+            self._sequence[instance.instance_id] = sequence
+            self._ids[sequence] = instance.instance_id
+            self._order.append(sequence)
+            self._indexed_status[instance.instance_id] = instance.status
+            self._by_workflow.setdefault(instance.workflow_id, []).append(sequence)
+            self._by_status.setdefault(instance.status, []).append(sequence)
+            
+            self.enforce_retention(instance.workflow_id)
+    
+    def reindex(self, instance: WorkflowInstance) -> None:
+        """实例状态变化后同步状态索引"""
+        with self._lock:
+            previous = self._indexed_status.get(instance.instance_id)
+            if previous is None or previous == instance.status:
+                return
+            
+            sequence = self._sequence[instance.instance_id]
+            self._remove_from_index(self._by_status, previous, sequence)
+            insort(self._by_status.setdefault(instance.status, []), sequence)
+            self._indexed_status[instance.instance_id] = instance.status
+            
+            if instance.status in TERMINAL_STATUSES:
+                self.enforce_retention(instance.workflow_id)
+    
+    def remove(self, instance_id: str) -> bool:
+        """移除实例"""
+        with self._lock:
+            instance = self._instances.pop(instance_id, None)
+            if instance is None:
+                return False
+            
+            sequence = self._sequence.pop(instance_id)
+            del self._ids[sequence]
+            position = bisect_left(self._order, sequence)
+            del self._order[position]
+            self._remove_from_index(self._by_workflow, instance.workflow_id, sequence)
+            self._remove_from_index(self._by_status, self._indexed_status.pop(instance_id), sequence)
+            return True
+    
+    def list(
+        self,
+        workflow_id: Optional[str] = None,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[WorkflowInstance], Optional[str]]:
+        """分页列出实例（最新优先），返回当前页和下一页游标"""
+        try:
+            before = int(cursor) if cursor else None
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        
+        with self._lock:
+            # 同时按工作流和状态过滤时，遍历较小的索引再检查另一个条件
+            candidates = [
+                self._by_workflow.get(workflow_id, []) if workflow_id is not None else None,
+                self._by_status.get(status, []) if status is not None else None
+            ]
+            candidates = [index for index in candidates if index is not None]
+            sequences = min(candidates, key=len) if candidates else self._order
+            
+            end = bisect_left(sequences, before) if before is not None else len(sequences)
+            items: List[WorkflowInstance] = []
+            next_cursor = None
+            for position in range(end - 1, -1, -1):
+                instance = self._instances[self._ids[sequences[position]]]
+                if workflow_id is not None and instance.workflow_id != workflow_id:
+                    continue
+                if status is not None and instance.status != status:
+                    continue
+                if limit is not None and len(items) >= limit:
+                    next_cursor = str(self._sequence[items[-1].instance_id])
+                    break
+                items.append(instance)
+            
+            return items, next_cursor
+    
+    def enforce_retention(self, workflow_id: Optional[str] = None) -> int:
+        """执行保留策略，返回淘汰的实例数"""
+        evicted: List[str] = []
+        with self._lock:
+            # 按最大保留时间淘汰（从最旧的实例开始，遇到未过期的实例即停止）
+            if self.max_age > 0:
+                cutoff = datetime.now() - timedelta(seconds=self.max_age)
+                for sequence in self._order:
+                    instance = self._instances[self._ids[sequence]]
+                    if instance.created_at >= cutoff:
+                        break
+                    if instance.status in TERMINAL_STATUSES:
+                        evicted.append(instance.instance_id)
+                for instance_id in evicted:
+                    self.remove(instance_id)
+            
+            # 按单个工作流的最大实例数淘汰
+            if workflow_id is not None and self.max_per_workflow > 0:
+                sequences = self._by_workflow.get(workflow_id, [])
+                excess = len(sequences) - self.max_per_workflow
+                if excess > 0:
+                    victims = []
+                    for sequence in sequences:
+                        if len(victims) >= excess:
+                            break
+                        instance = self._instances[self._ids[sequence]]
+                        if instance.status in TERMINAL_STATUSES:
+                            victims.append(instance.instance_id)
+                    for instance_id in victims:
+                        self.remove(instance_id)
+                    evicted.extend(victims)
+        
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} finished workflow instance(s)")
+        return len(evicted)
+    
+    @staticmethod
+    def _remove_from_index(index: Dict[str, List[int]], key: str, sequence: int) -> None:
+        """从有序索引中删除序号"""
+        sequences = index.get(key)
+        if not sequences:
+            return
+        position = bisect_left(sequences, sequence)
+        if position < len(sequences) and sequences[position] == sequence:
+            del sequences[position]
+        if not sequences:
+            del index[key]
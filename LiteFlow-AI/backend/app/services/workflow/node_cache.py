@@ -0,0 +1,113 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from app.config import settings
+from app.schemas.workflow import WorkflowNode
+from app.utils.logger import logger
+
+# 支持记忆化的节点类型
+MEMOIZABLE_NODE_TYPES = ("tool", "model")
+
+
+def get_memoize_options(node: WorkflowNode) -> Optional[Dict[str, Any]]:
+    """解析节点的记忆化配置
+    
+    节点配置 memoize 为 true 或 {"ttl": 秒数, "inputs": [参与缓存键的上下文键]} 时开启；
+    未开启、节点类型不支持，或模型节点 temperature 不为 0（结果不确定）时返回 None。
+    """
+    option = node.config.get("memoize")
+    if not option or node.type not in MEMOIZABLE_NODE_TYPES:
+        return None
+    
+    if node.type == "model" and node.config.get("temperature", 0.7) != 0:
+        return None
+    
+    return option if isinstance(option, dict) else {}
+
+
+def build_cache_key(node: WorkflowNode, context: Dict[str, Any], options: Dict[str, Any]) -> Optional[str]:
+    """根据节点配置和输入上下文计算缓存键，输入无法序列化时返回 None"""
+    keys = options.get("inputs")
+    inputs = context if keys is None else {key: context.get(key) for key in keys}
+    
+    try:
+        payload = json.dumps(
+            {
+                "type": node.type,
+                "config": jsonable_encoder(node.config),
+                "inputs": jsonable_encoder(inputs)
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Skip memoization for node {node.node_id}: {str(e)}")
+        return None
+    
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class NodeResultCache:
+    """节点结果缓存
+    
+    缓存节点写入上下文的键值，条目在 TTL 到期后失效，超出容量时按 LRU 淘汰。
+    """
+    
+    def __init__(
+        self,
+        max_size: int = settings.WORKFLOW_NODE_CACHE_SIZE,
+        ttl: float = settings.WORKFLOW_NODE_CACHE_TTL
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取缓存结果，不存在或已过期时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, writes = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(writes)
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def set(self, key: str, writes: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """缓存节点结果"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(writes))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# 创建全局节点结果缓存实例
+node_result_cache = NodeResultCache()
@@ -0,0 +1,190 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from app.config import settings
+from app.schemas.workflow import WorkflowNode
+from app.services.workflow.execution_plan import ExecutionPlan
+from app.utils.logger import logger
+
+# 节点执行函数：接收节点与输入上下文，返回该节点写入上下文的键值
+NodeRunner = Callable[[WorkflowNode, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+# 节点路由函数：接收节点与输出上下文，返回要激活的后继节点ID
+NodeRouter = Callable[[WorkflowNode, Dict[str, Any]], List[str]]
+# 节点开始/结束回调，结束回调接收节点写入上下文的键值和被激活的后继节点
+NodeStartHook = Callable[[WorkflowNode], Awaitable[None]]
+NodeEndHook = Callable[[WorkflowNode, Dict[str, Any], List[str]], Awaitable[None]]
+
+# 上下文中按节点ID保存各节点写入键值的键
+NODE_OUTPUTS_KEY = "node_outputs"
+
+
+def apply_writes(context: Dict[str, Any], node_id: str, writes: Dict[str, Any]) -> Dict[str, Any]:
+    """返回写入节点结果后的新上下文，节点写入的键值同时记录到 node_outputs[节点ID]"""
+    return {
+        **context,
+        **(writes or {}),
+        NODE_OUTPUTS_KEY: {**context.get(NODE_OUTPUTS_KEY, {}), node_id: writes or {}}
+    }
+
+
+def merge_outputs(outputs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """按顺序合并多个输出上下文，后者覆盖前者的同名键，node_outputs 按节点ID合并"""
+    merged: Dict[str, Any] = {}
+    node_outputs: Dict[str, Dict[str, Any]] = {}
+    for output in outputs:
+        merged.update(output)
+        node_outputs.update(output.get(NODE_OUTPUTS_KEY, {}))
+    if node_outputs:
+        merged[NODE_OUTPUTS_KEY] = node_outputs
+    return merged
+
+
+class WorkflowScheduler:
+    """工作流并发调度器
+    
+    无环工作流中，节点的所有前驱都结束（执行完成或被跳过）后即可运行，相互独立的分支
+    在并发上限内同时执行，总耗时取决于关键路径而不是所有节点耗时之和。
+    每个节点的输入上下文是其已激活前驱输出上下文按拓扑序合并的结果，因此汇合节点
+    看到的上下文与分支完成的先后顺序无关。并行分支写入同一个键时顶层只保留拓扑序靠后的值，
+    各节点自己的写入始终保存在上下文的 node_outputs[节点ID] 中，汇合时不会丢失。
+    未被路由选中的分支会被标记为跳过并向下游传播，使条件分支后的汇合节点不会一直等待。
+    有环工作流无法做拓扑调度，按单路径逐步执行并受最大步数限制；其中的节点激活多个后继
+    （如多条默认边）时无法确定执行路径，直接报错而不是只走第一条。
+    
+    恢复执行时传入 replay（节点ID -> 按执行顺序记录的写入与后继节点），已记录的节点
+    直接复用记录结果而不再调用 run_node，调度从最后完成的节点继续。
+    """
+    
+    def __init__(
+        self,
+        plan: ExecutionPlan,
+        run_node: NodeRunner,
+        route: NodeRouter,
+        max_concurrency: int = settings.WORKFLOW_MAX_CONCURRENCY,
+        max_steps: int = settings.WORKFLOW_MAX_STEPS,
+        on_node_start: Optional[NodeStartHook] = None,
+        on_node_end: Optional[NodeEndHook] = None,
+        replay: Optional[Dict[str, List[Tuple[Dict[str, Any], List[str]]]]] = None
+    ):
+        if max_concurrency < 1:
+            raise ValueError("Workflow max concurrency must be at least 1")
+        
+        self.plan = plan
+        self.run_node = run_node
+        self.route = route
+        self.max_concurrency = max_concurrency
+        self.max_steps = max_steps
+        self.on_node_start = on_node_start
+        self.on_node_end = on_node_end
+        self._replay: Dict[str, Deque[Tuple[Dict[str, Any], List[str]]]] = {
+            node_id: deque(records) for node_id, records in (replay or {}).items()
+        }
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """执行工作流，返回最终上下文"""
+        if self.plan.is_acyclic:
+            return await self._run_graph(inputs)
+        
+        logger.info(f"Workflow {self.plan.workflow_id} contains cycles, running sequentially")
+        return await self._run_sequential(inputs)
+    
+    async def _run_graph(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """按拓扑依赖并发执行无环工作流"""
+        plan = self.plan
+        order = plan.topological_order
+        
+        outputs: Dict[str, Dict[str, Any]] = {}
+        activated_by: Dict[str, Set[str]] = {node_id: set() for node_id in order}
+        resolved_count: Dict[str, int] = {node_id: 0 for node_id in order}
+        terminal_nodes: List[str] = []
+        running: Dict[asyncio.Task, str] = {}
+        
+        def start(node_id: str) -> None:
+            if node_id == plan.entry_point:
+                context = dict(inputs)
+            else:
+                # 按拓扑序合并已激活前驱的输出，保证合并结果确定
+                context = merge_outputs(
+                    outputs[source] for source in sorted(activated_by[node_id], key=order.__getitem__)
+                )
+            running[asyncio.create_task(self._execute_node(node_id, context))] = node_id
+        
+        def resolve(source: str, targets: Set[str]) -> None:
+            # 通知后继节点该前驱已结束；前驱全部结束后，被激活的节点启动，否则跳过并继续向下游传播
+            pending = [(source, targets)]
+            while pending:
+                node_id, selected = pending.pop()
+                for successor in dict.fromkeys(plan.successors(node_id)):
+                    resolved_count[successor] += 1
+                    if successor in selected:
+                        activated_by[successor].add(node_id)
+                    if resolved_count[successor] == len(plan.predecessors[successor]):
+                        if activated_by[successor]:
+                            start(successor)
+                        else:
+                            pending.append((successor, set()))
+        
+        start(plan.entry_point)
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: order[running[t]]):
+                    node_id = running.pop(task)
+                    output, targets = task.result()
+                    outputs[node_id] = output
+                    if not targets:
+                        terminal_nodes.append(node_id)
+                    resolve(node_id, set(targets))
+        except BaseException:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            raise
+        
+        # 最终上下文为所有终止节点输出按拓扑序合并的结果
+        return merge_outputs(outputs[node_id] for node_id in sorted(terminal_nodes, key=order.__getitem__))
+    
+    async def _run_sequential(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """沿单条路径逐步执行（用于有环工作流）"""
+        context = dict(inputs)
+        node_id: Optional[str] = self.plan.entry_point
+        steps = 0
+        
+        while node_id:
+            steps += 1
+            if steps > self.max_steps:
+                raise ValueError(f"Workflow {self.plan.workflow_id} exceeded max steps: {self.max_steps}")
+            
+            context, targets = await self._execute_node(node_id, context)
+            targets = list(dict.fromkeys(targets))
+            if len(targets) > 1:
+                raise ValueError(
+                    f"Workflow {self.plan.workflow_id} contains cycles, node {node_id} cannot fan out "
+                    f"to multiple nodes: {', '.join(targets)}"
+                )
+            node_id = targets[0] if targets else None
+        
+        return context
+    
+    async def _execute_node(self, node_id: str, context: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """在并发上限内执行单个节点，返回输出上下文和被激活的后继节点"""
+        node = self.plan.get_node(node_id)
+        
+        # 恢复执行时复用已记录的结果
+        recorded = self._replay.get(node_id)
+        if recorded:
+            writes, targets = recorded.popleft()
+            return apply_writes(context, node_id, writes), targets
+        
+        async with self._semaphore:
+            if self.on_node_start:
+                await self.on_node_start(node)
+            writes = await self.run_node(node, context)
+        
+        output = apply_writes(context, node_id, writes)
+        targets = self.route(node, output)
+        
+        if self.on_node_end:
+            await self.on_node_end(node, writes, targets)
+        return output, targets
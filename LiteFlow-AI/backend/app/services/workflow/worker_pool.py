@@ -0,0 +1,110 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.schemas.workflow import WorkflowDefinition, WorkflowInstance
+from app.services.workflow.checkpoint import checkpoint_store
+from app.services.workflow.workflow_executor import WorkflowExecutor, workflow_executor
+from app.services.workflow.workflow_manager import workflow_manager
+from app.utils.logger import logger
+
+
+class WorkflowQueueFullError(Exception):
+    """工作流执行队列已满"""
+    pass
+
+
+class WorkflowWorkerPool:
+    """进程内工作流执行池
+    
+    提交的实例进入有界队列，由固定数量的后台 worker 依次取出执行，提交方无需等待执行完成。
+    实例对象在执行过程中被原地更新，因此通过实例ID查询即可看到实时的状态和当前节点。
+    队列已满时拒绝提交，由调用方返回背压信号。
+    """
+    
+    def __init__(
+        self,
+        executor: WorkflowExecutor,
+        size: int = settings.WORKFLOW_WORKER_POOL_SIZE,
+        queue_size: int = settings.WORKFLOW_QUEUE_SIZE
+    ):
+        if size < 1:
+            raise ValueError("Workflow worker pool size must be at least 1")
+        
+        self.executor = executor
+        self.size = size
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._active = 0
+    
+    async def submit(self, instance: WorkflowInstance, workflow: WorkflowDefinition) -> None:
+        """提交实例到执行队列，队列已满时抛出 WorkflowQueueFullError
+        
+        入队后立即在线程中写入检查点再返回，进程崩溃或重启后仍可通过 resume 执行排队中的实例。
+        """
+        self._ensure_started()
+        
+        try:
+            self._queue.put_nowait((instance, workflow))
+        except asyncio.QueueFull:
+            raise WorkflowQueueFullError(
+                f"Workflow execution queue is full ({self.queue_size} pending instances)"
+            )
+        
+        # 排队中的实例同样写入检查点，进程重启后可通过 resume 继续执行
+        checkpoint_store.save(instance, workflow)
+        try:
+            await asyncio.to_thread(checkpoint_store.flush)
+        except Exception as e:
+            logger.error(f"Failed to save checkpoint for queued workflow instance {instance.instance_id}: {str(e)}")
+        logger.info(f"Workflow instance queued: {instance.instance_id}")
+    
+    def _ensure_started(self) -> None:
+        """在当前事件循环中启动 worker"""
+        if self._workers:
+            return
+        
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"workflow-worker-{i}")
+            for i in range(self.size)
+        ]
+        logger.info(f"Workflow worker pool started with {self.size} workers")
+    
+    async def _worker(self) -> None:
+        """循环从队列取出实例并执行"""
+        while True:
+            instance, workflow = await self._queue.get()
+            self._active += 1
+            try:
+                workflow_manager.set_instance_status(instance, "running")
+                await self.executor.execute(instance, workflow)
+            except Exception as e:
+                logger.error(f"Workflow worker failed on instance {instance.instance_id}: {str(e)}")
+            finally:
+                self._active -= 1
+                self._queue.task_done()
+    
+    async def shutdown(self) -> None:
+        """停止所有 worker，未完成的实例保留检查点，可在重启后恢复"""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._queue = None
+        
+        if workers:
+            logger.info("Workflow worker pool stopped")
+    
+    def stats(self) -> Dict[str, int]:
+        """获取执行池统计信息"""
+        return {
+            "workers": self.size,
+            "active": self._active,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size
+        }
+
+
+# 创建全局工作流执行池实例
+workflow_worker_pool = WorkflowWorkerPool(workflow_executor)
@@ -1,140 +1,400 @@
-from typing import Dict, Any, Optional
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-from app.schemas.workflow import WorkflowDefinition, WorkflowInstance
-from app.services.model_gateway.gateway import ModelGateway
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Set, Tuple
+from app.schemas.workflow import (
+    WorkflowBatchResult,
+    WorkflowDefinition,
+    WorkflowExecutionRequest,
+    WorkflowInstance,
+    WorkflowNode,
+    WorkflowStreamEvent
+)
+from app.services.model_gateway.gateway import model_gateway
+from app.services.model_gateway.models.base import SAMPLING_PARAMS, ChatMessage, ModelResponse
 from app.services.tools import tool_registry
+from app.services.workflow.checkpoint import checkpoint_store
+from app.services.workflow.execution_plan import ExecutionPlan
+from app.services.workflow.graph_cache import compiled_graph_cache
+from app.services.workflow.node_cache import build_cache_key, get_memoize_options, node_result_cache
+from app.services.workflow.scheduler import WorkflowScheduler
 from app.services.workflow.workflow_manager import workflow_manager
+from app.config import settings
 from app.utils.logger import logger
+from app.utils.observability import WORKFLOW_NODE_CACHE_HITS, WORKFLOW_NODE_CACHE_MISSES
 
+# 流式执行事件回调
+WorkflowEventHandler = Callable[[WorkflowStreamEvent], Awaitable[None]]
 
-class WorkflowState:
-    """工作流执行状态"""
-    def __init__(self, instance: WorkflowInstance):
-        self.instance = instance
-        self.context = instance.inputs.copy()
-        self.current_node = instance.current_node
+
+class WorkflowInstanceConflictError(Exception):
+    """工作流实例当前状态不允许恢复执行"""
+    pass
 
 
 class WorkflowExecutor:
     """工作流执行器"""
     
-    def __init__(self):
-        self.model_gateway = ModelGateway()
-        self.checkpointer = MemorySaver()
+    def __init__(self, max_concurrency: int = settings.WORKFLOW_MAX_CONCURRENCY):
+        self.model_gateway = model_gateway
+        self.max_concurrency = max_concurrency
+        self._running: Set[str] = set()
     
-    async def execute(self, instance: WorkflowInstance, workflow: WorkflowDefinition) -> WorkflowInstance:
-        """执行工作流"""
+    async def execute(
+        self,
+        instance: WorkflowInstance,
+        workflow: WorkflowDefinition,
+        resume: bool = False,
+        on_event: Optional[WorkflowEventHandler] = None,
+        plan: Optional[ExecutionPlan] = None
+    ) -> WorkflowInstance:
+        """执行工作流
+        
+        resume 为 True 时复用执行历史中已完成节点的结果；传入 on_event 时以流式方式调用模型，
+        并依次回调 workflow_start、node_start、token、node_end、workflow_end 事件。
+        批量执行时可直接传入已构建的 plan，避免每个实例重复计算工作流版本。
+        """
+        self._running.add(instance.instance_id)
         try:
-            # 创建LangGraph图
-            graph = self._create_langgraph(workflow)
+            await self._emit(on_event, instance, "workflow_start")
             
-            # 执行工作流
-            initial_state = {
-                "instance": instance,
-                "context": instance.inputs.copy(),
-                "current_node": instance.current_node
-            }
+            # 获取执行计划（按工作流版本缓存）
+            if plan is None:
+                plan = compiled_graph_cache.get_or_build(workflow, ExecutionPlan.build)
+            
+            # 保存初始检查点，附带工作流定义快照以便进程重启后恢复
+            await self._save_checkpoint(instance, workflow)
+            
+            # 创建调度器，相互独立的分支并发执行
+            scheduler = WorkflowScheduler(
+                plan,
+                run_node=lambda node, context: self._run_node(node, context, instance, on_event),
+                route=lambda node, output: self._get_next_nodes(plan, node, output),
+                max_concurrency=self.max_concurrency,
+                on_node_start=lambda node: self._on_node_start(instance, node, on_event),
+                on_node_end=lambda node, writes, targets: self._on_node_end(instance, node, writes, targets, on_event),
+                replay=self._build_replay(instance) if resume else None
+            )
             
-            # 执行图
-            result = await graph.ainvoke(initial_state, checkpointer=self.checkpointer)
+            # 执行工作流
+            outputs = await scheduler.run(instance.inputs)
             
             # 更新实例状态
-            instance.status = "completed"
-            instance.outputs = result["context"]
+            instance.outputs = outputs
             instance.current_node = None
+            workflow_manager.set_instance_status(instance, "completed")
             
             logger.info(f"Workflow instance executed successfully: {instance.instance_id}")
-            return instance
+        except asyncio.CancelledError:
+            # 执行被取消（客户端断开或服务关闭）时暂停实例，之后可通过 resume 继续
+            logger.info(f"Workflow instance paused: {instance.instance_id}")
+            workflow_manager.set_instance_status(instance, "paused")
+            await asyncio.shield(self._save_checkpoint(instance, force=True))
+            raise
         except Exception as e:
             logger.error(f"Failed to execute workflow instance {instance.instance_id}: {str(e)}")
-            instance.status = "failed"
             instance.outputs = {"error": str(e)}
+            workflow_manager.set_instance_status(instance, "failed")
+        finally:
+            self._running.discard(instance.instance_id)
+        
+        instance.updated_at = datetime.now()
+        await self._save_checkpoint(instance, force=True)
+        await self._emit(on_event, instance, "workflow_end", data={
+            "status": instance.status,
+            "outputs": instance.outputs
+        })
+        return instance
+    
+    async def execute_batch(
+        self,
+        workflow: WorkflowDefinition,
+        rows: Iterable[Any],
+        concurrency: int = settings.WORKFLOW_BATCH_CONCURRENCY
+    ) -> AsyncIterator[WorkflowBatchResult]:
+        """批量执行工作流
+        
+        每行输入（字典）创建一个实例，所有实例共用同一个执行计划，同时运行的实例数不超过
+        concurrency，结果按完成顺序逐个产出。非字典的输入行直接返回 invalid 结果。
+        """
+        if concurrency < 1:
+            raise ValueError("Workflow batch concurrency must be at least 1")
+        
+        plan = compiled_graph_cache.get_or_build(workflow, ExecutionPlan.build)
+        pending: Set[asyncio.Task] = set()
+        try:
+            for row, inputs in enumerate(rows):
+                if not isinstance(inputs, dict):
+                    yield WorkflowBatchResult(
+                        row=row,
+                        status="invalid",
+                        error_message=f"Row {row} must be a JSON object, got {type(inputs).__name__}"
+                    )
+                    continue
+                
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.create_task(self._execute_row(workflow, plan, row, inputs)))
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # 调用方提前停止迭代（如客户端断开）时取消尚未完成的实例
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def _execute_row(
+        self,
+        workflow: WorkflowDefinition,
+        plan: ExecutionPlan,
+        row: int,
+        inputs: Dict[str, Any]
+    ) -> WorkflowBatchResult:
+        """执行批量输入中的一行"""
+        started_at = time.perf_counter()
+        instance = workflow_manager.create_instance(
+            WorkflowExecutionRequest(workflow_id=workflow.workflow_id, inputs=inputs)
+        )
+        workflow_manager.set_instance_status(instance, "running")
+        instance = await self.execute(instance, workflow, plan=plan)
+        
+        return WorkflowBatchResult(
+            row=row,
+            instance_id=instance.instance_id,
+            status="completed" if instance.status == "completed" else "failed",
+            outputs=instance.outputs if instance.status == "completed" else None,
+            error_message=instance.outputs.get("error") if instance.status == "failed" else None,
+            duration_ms=round((time.perf_counter() - started_at) * 1000, 3)
+        )
+    
+    async def resume(self, instance_id: str) -> WorkflowInstance:
+        """从最后完成的节点恢复执行工作流实例，已完成节点（包括模型调用）不会重新执行
+        
+        实例或工作流不存在时抛出 ValueError；实例正在运行或仍在执行队列中时抛出 WorkflowInstanceConflictError。
+        进程重启后从检查点恢复的实例不受状态限制（包括重启前处于运行中或排队中的实例），可以直接恢复。
+        """
+        self._check_resumable(instance_id)
+        checkpoint = await asyncio.to_thread(checkpoint_store.load, instance_id)
+        # 读取检查点期间实例可能已被其他请求恢复，重新检查
+        self._check_resumable(instance_id)
+        
+        instance = workflow_manager.get_loaded_instance(instance_id)
+        if instance is None:
+            if checkpoint is None:
+                raise ValueError(f"Workflow instance {instance_id} not found")
+            instance = workflow_manager.restore_instance(checkpoint.instance)
+        
+        if instance.status == "completed":
             return instance
+        
+        # 优先使用实例启动时的工作流快照，保证执行历史与工作流结构一致
+        workflow = checkpoint.workflow if checkpoint and checkpoint.workflow else None
+        workflow = workflow or workflow_manager.get_workflow(instance.workflow_id)
+        if workflow is None:
+            raise ValueError(f"Workflow {instance.workflow_id} not found")
+        
+        logger.info(f"Resuming workflow instance {instance_id} after {len(instance.execution_history)} completed node(s)")
+        workflow_manager.set_instance_status(instance, "running")
+        return await self.execute(instance, workflow, resume=True)
     
-    def _create_langgraph(self, workflow: WorkflowDefinition) -> StateGraph:
-        """创建LangGraph图"""
-        # 定义状态结构
-        graph = StateGraph(WorkflowState)
+    def _check_resumable(self, instance_id: str) -> None:
+        """实例正在运行或仍在执行队列中时抛出 WorkflowInstanceConflictError
         
-        # 为每个节点添加处理函数
-        for node in workflow.nodes:
-            if node.type == "model":
-                graph.add_node(node.node_id, self._handle_model_node)
-            elif node.type == "tool":
-                graph.add_node(node.node_id, self._handle_tool_node)
-            elif node.type == "condition":
-                graph.add_node(node.node_id, self._handle_condition_node)
-            elif node.type == "start":
-                graph.add_node(node.node_id, self._handle_start_node)
-            elif node.type == "end":
-                graph.add_node(node.node_id, self._handle_end_node)
+        只检查本进程内存中的实例：检查点中的状态可能是进程退出前的 running 或 pending，不代表仍在执行。
+        """
+        if instance_id in self._running:
+            raise WorkflowInstanceConflictError(f"Workflow instance {instance_id} is already running")
         
-        # 添加边
-        for edge in workflow.edges:
-            if edge.condition:
-                # 条件边
-                graph.add_conditional_edges(
-                    edge.source,
-                    lambda state, cond=edge.condition: self._evaluate_condition(state, cond),
-                    {edge.target: edge.target}
-                )
-            else:
-                # 普通边
-                graph.add_edge(edge.source, edge.target)
+        instance = workflow_manager.get_loaded_instance(instance_id)
+        if instance is not None and instance.status in ("pending", "running"):
+            raise WorkflowInstanceConflictError(
+                f"Workflow instance {instance_id} is {instance.status} and cannot be resumed"
+            )
+    
+    @staticmethod
+    def _build_replay(instance: WorkflowInstance) -> Dict[str, List[Tuple[Dict[str, Any], List[str]]]]:
+        """根据执行历史构建已完成节点的结果记录"""
+        replay: Dict[str, List[Tuple[Dict[str, Any], List[str]]]] = {}
+        for entry in instance.execution_history:
+            if "writes" in entry:
+                replay.setdefault(entry["node_id"], []).append((entry["writes"], entry["next_nodes"]))
+        return replay
+    
+    async def _save_checkpoint(
+        self,
+        instance: WorkflowInstance,
+        workflow: Optional[WorkflowDefinition] = None,
+        force: bool = False
+    ) -> None:
+        """保存检查点，达到批量条件时在线程中写入存储"""
+        try:
+            if checkpoint_store.save(instance, workflow) or force:
+                await asyncio.to_thread(checkpoint_store.flush)
+        except Exception as e:
+            logger.error(f"Failed to save checkpoint for workflow instance {instance.instance_id}: {str(e)}")
+    
+    @staticmethod
+    async def _emit(
+        on_event: Optional[WorkflowEventHandler],
+        instance: WorkflowInstance,
+        event: str,
+        node_id: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """回调流式执行事件"""
+        if on_event is not None:
+            await on_event(WorkflowStreamEvent(
+                event=event,
+                instance_id=instance.instance_id,
+                node_id=node_id,
+                data=data or {}
+            ))
+    
+    async def _on_node_start(
+        self,
+        instance: WorkflowInstance,
+        node: WorkflowNode,
+        on_event: Optional[WorkflowEventHandler] = None
+    ) -> None:
+        """节点开始执行"""
+        instance.current_node = node.node_id
+        instance.updated_at = datetime.now()
+        await self._emit(on_event, instance, "node_start", node.node_id, {"node_type": node.type})
+    
+    async def _on_node_end(
+        self,
+        instance: WorkflowInstance,
+        node: WorkflowNode,
+        writes: Dict[str, Any],
+        targets: List[str],
+        on_event: Optional[WorkflowEventHandler] = None
+    ) -> None:
+        """节点执行完成，记录执行历史并保存检查点"""
+        instance.execution_history.append({
+            "node_id": node.node_id,
+            "node_type": node.type,
+            "writes": writes,
+            "next_nodes": targets,
+            "finished_at": datetime.now().isoformat()
+        })
+        instance.updated_at = datetime.now()
+        await self._save_checkpoint(instance)
+        await self._emit(on_event, instance, "node_end", node.node_id, {
+            "node_type": node.type,
+            "outputs": writes,
+            "next_nodes": targets
+        })
+    
+    async def _run_node(
+        self,
+        node: WorkflowNode,
+        context: Dict[str, Any],
+        instance: Optional[WorkflowInstance] = None,
+        on_event: Optional[WorkflowEventHandler] = None
+    ) -> Dict[str, Any]:
+        """执行节点，返回写入上下文的键值；开启记忆化的节点优先复用相同配置与输入的结果"""
+        options = get_memoize_options(node)
+        cache_key = build_cache_key(node, context, options) if options is not None else None
+        if cache_key is None:
+            return await self._dispatch_node(node, context, instance, on_event)
         
-        # 设置入口点
-        graph.set_entry_point(workflow.entry_point)
+        writes = node_result_cache.get(cache_key)
+        if writes is not None:
+            WORKFLOW_NODE_CACHE_HITS.labels(node_type=node.type).inc()
+            if node.type == "model":
+                # 流式执行时将缓存的完整回复作为一次 token 增量推送
+                await self._emit(on_event, instance, "token", node.node_id, {"delta": writes["model_result"].content})
+            return writes
         
-        return graph.compile()
+        WORKFLOW_NODE_CACHE_MISSES.labels(node_type=node.type).inc()
+        writes = await self._dispatch_node(node, context, instance, on_event)
+        node_result_cache.set(cache_key, writes, options.get("ttl"))
+        return writes
+    
+    async def _dispatch_node(
+        self,
+        node: WorkflowNode,
+        context: Dict[str, Any],
+        instance: Optional[WorkflowInstance] = None,
+        on_event: Optional[WorkflowEventHandler] = None
+    ) -> Dict[str, Any]:
+        """按节点类型分发执行"""
+        if node.type == "model":
+            if on_event is not None:
+                return await self._stream_model_node(node, context, instance, on_event)
+            return await self._handle_model_node(node, context)
+        if node.type == "tool":
+            return await self._handle_tool_node(node, context)
+        # start / end / condition 节点只参与路由，不写入上下文
+        return {}
     
-    async def _handle_model_node(self, state: WorkflowState) -> Dict[str, Any]:
+    async def _handle_model_node(self, node: WorkflowNode, context: Dict[str, Any]) -> Dict[str, Any]:
         """处理模型节点"""
         try:
-            # 获取工作流定义
-            workflow = workflow_manager.get_workflow(state.instance.workflow_id)
-            if not workflow:
-                raise ValueError(f"Workflow {state.instance.workflow_id} not found")
-            
-            # 获取当前节点
-            node = next(n for n in workflow.nodes if n.node_id == state.current_node)
-            config = node.config
-            
-            # 获取模型
-            model = self.model_gateway.get_model(
-                provider=config.get("provider", "openai"),
-                model_name=config.get("model_name", "gpt-3.5-turbo")
-            )
-            
-            # 准备提示
-            prompt = config.get("prompt", "")
+            model, messages, params = self._prepare_model_call(node)
             
             # 调用模型
-            result = await model.generate({
-                "prompt": prompt,
-                "messages": config.get("messages", []),
-                "temperature": config.get("temperature", 0.7)
-            })
+            result = await model.chat(messages, **params)
             
-            # 更新状态
-            state.context["model_result"] = result
-            state.current_node = self._get_next_node(state, state.current_node)
+            return {"model_result": result}
+        except Exception as e:
+            logger.error(f"Failed to handle model node {node.node_id}: {str(e)}")
+            raise
+    
+    async def _stream_model_node(
+        self,
+        node: WorkflowNode,
+        context: Dict[str, Any],
+        instance: WorkflowInstance,
+        on_event: WorkflowEventHandler
+    ) -> Dict[str, Any]:
+        """以流式方式处理模型节点，逐个回调 token 增量，结束后组装完整响应"""
+        try:
+            model, messages, params = self._prepare_model_call(node)
+            
+            chunks: List[str] = []
+            async for delta in model.stream_chat(messages, **params):
+                chunks.append(delta)
+                await self._emit(on_event, instance, "token", node.node_id, {"delta": delta})
             
-            return {"instance": state.instance, "context": state.context, "current_node": state.current_node}
+            result = ModelResponse(content="".join(chunks), model_name=model.config.model_name)
+            return {"model_result": result}
         except Exception as e:
-            logger.error(f"Failed to handle model node {state.current_node}: {str(e)}")
+            logger.error(f"Failed to stream model node {node.node_id}: {str(e)}")
             raise
     
-    async def _handle_tool_node(self, state: WorkflowState) -> Dict[str, Any]:
+    def _prepare_model_call(self, node: WorkflowNode):
+        """根据节点配置获取模型，准备消息和本次调用的采样参数"""
+        config = node.config
+        
+        # 获取模型
+        model = self.model_gateway.get_model(
+            provider=config.get("provider", "openai"),
+            model_name=config.get("model_name", "gpt-3.5-turbo"),
+            api_key=config.get("api_key"),
+            base_url=config.get("base_url")
+        )
+        
+        # 采样参数按调用传入，不影响共享的模型实例
+        params = {"temperature": config.get("temperature", 0.7)}
+        params.update({name: config[name] for name in SAMPLING_PARAMS if name in config})
+        
+        # 准备消息
+        messages = [ChatMessage(**message) for message in config.get("messages", [])]
+        prompt = config.get("prompt", "")
+        if prompt:
+            messages.append(ChatMessage(role="user", content=prompt))
+        
+        return model, messages, params
+    
+    async def _handle_tool_node(self, node: WorkflowNode, context: Dict[str, Any]) -> Dict[str, Any]:
         """处理工具节点"""
         try:
-            # 获取工作流定义
-            workflow = workflow_manager.get_workflow(state.instance.workflow_id)
-            if not workflow:
-                raise ValueError(f"Workflow {state.instance.workflow_id} not found")
-            
-            # 获取当前节点
-            node = next(n for n in workflow.nodes if n.node_id == state.current_node)
             config = node.config
             
             # 获取工具
@@ -148,109 +408,39 @@ class WorkflowExecutor:
             # 调用工具
             result = await tool.call(parameters)
             
-            # 更新状态
-            state.context["tool_result"] = result
-            state.current_node = self._get_next_node(state, state.current_node)
-            
-            return {"instance": state.instance, "context": state.context, "current_node": state.current_node}
+            return {"tool_result": result}
         except Exception as e:
-            logger.error(f"Failed to handle tool node {state.current_node}: {str(e)}")
+            logger.error(f"Failed to handle tool node {node.node_id}: {str(e)}")
             raise
     
-    async def _handle_condition_node(self, state: WorkflowState) -> Dict[str, Any]:
-        """处理条件节点"""
-        try:
-            # 获取工作流定义
-            workflow = workflow_manager.get_workflow(state.instance.workflow_id)
-            if not workflow:
-                raise ValueError(f"Workflow {state.instance.workflow_id} not found")
-            
-            # 获取当前节点
-            node = next(n for n in workflow.nodes if n.node_id == state.current_node)
-            config = node.config
-            
-            # 评估条件
-            condition = config.get("condition", "")
-            result = self._evaluate_condition(state, condition)
-            
-            # 更新状态
-            state.current_node = result
-            
-            return {"instance": state.instance, "context": state.context, "current_node": state.current_node}
-        except Exception as e:
-            logger.error(f"Failed to handle condition node {state.current_node}: {str(e)}")
-            raise
-    
-    async def _handle_start_node(self, state: WorkflowState) -> Dict[str, Any]:
-        """处理开始节点"""
-        try:
-            # 更新状态
-            state.current_node = self._get_next_node(state, state.current_node)
-            
-            return {"instance": state.instance, "context": state.context, "current_node": state.current_node}
-        except Exception as e:
-            logger.error(f"Failed to handle start node {state.current_node}: {str(e)}")
-            raise
-    
-    async def _handle_end_node(self, state: WorkflowState) -> Dict[str, Any]:
-        """处理结束节点"""
-        try:
-            # 更新状态
-            state.current_node = None
-            
-            return {"instance": state.instance, "context": state.context, "current_node": state.current_node}
-        except Exception as e:
-            logger.error(f"Failed to handle end node {state.current_node}: {str(e)}")
-            raise
-    
-    def _get_next_node(self, state: WorkflowState, current_node_id: str) -> Optional[str]:
-        """获取下一个节点"""
-        workflow = self._get_workflow_for_instance(state.instance)
-        if not workflow:
-            return None
+    def _get_next_nodes(self, plan: ExecutionPlan, node: WorkflowNode, context: Dict[str, Any]) -> List[str]:
+        """获取要激活的后继节点
+        
+        条件边互斥：取第一条条件成立的条件边；没有条件边成立时激活全部默认边（并行分支）。
+        条件节点先评估自身条件，成立时走第一条条件边，否则走默认边。
+        """
+        conditional_edges = plan.conditional_edges[node.node_id]
+        
+        if node.type == "condition":
+            if conditional_edges and self._evaluate_condition(plan, context, node.config.get("condition", "")):
+                return [conditional_edges[0].target]
+            return plan.default_targets(node.node_id)
         
-        for edge in workflow.edges:
-            if edge.source == current_node_id and not edge.condition:
-                return edge.target
+        for edge in conditional_edges:
+            if self._evaluate_condition(plan, context, edge.condition):
+                return [edge.target]
         
-        return None
+        return plan.default_targets(node.node_id)
     
-    def _evaluate_condition(self, state: WorkflowState, condition: str) -> str:
+    def _evaluate_condition(self, plan: ExecutionPlan, context: Dict[str, Any], condition: str) -> bool:
         """评估条件"""
-        # 简单条件评估实现
         try:
-            # 使用状态上下文作为条件评估的全局变量
-            global_vars = state.context.copy()
-            
-            # 评估条件表达式
-            # 注意：这里使用eval存在安全风险，实际生产环境应使用更安全的方式
-            result = eval(condition, {"__builtins__": {}}, global_vars)
-            
-            # 获取工作流定义
-            workflow = self._get_workflow_for_instance(state.instance)
-            if not workflow:
-                raise ValueError(f"Workflow {state.instance.workflow_id} not found")
-            
-            # 根据条件结果找到对应的边
-            for edge in workflow.edges:
-                if edge.source == state.current_node:
-                    if edge.condition and result:
-                        return edge.target
-            
-            # 默认返回第一个无条件边的目标
-            for edge in workflow.edges:
-                if edge.source == state.current_node and not edge.condition:
-                    return edge.target
-            
-            return None
+            # 表达式在构建执行计划时已编译，直接读取上下文求值
+            return plan.evaluate_condition(condition, context)
         except Exception as e:
-            logger.error(f"Failed to evaluate condition: {str(e)}")
+            logger.error(f"Failed to evaluate condition {condition!r}: {str(e)}")
             raise
-    
-    def _get_workflow_for_instance(self, instance: WorkflowInstance) -> Optional[WorkflowDefinition]:
-        """获取实例对应的工作流定义"""
-        return workflow_manager.get_workflow(instance.workflow_id)
 
 
 # 创建全局执行器实例
-workflow_executor = WorkflowExecutor()
\ No newline at end of file
+workflow_executor = WorkflowExecutor()
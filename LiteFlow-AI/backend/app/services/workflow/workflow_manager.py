@@ -1,4 +1,5 @@
-from typing import Dict, Any, Optional, List
+import asyncio
+from typing import Dict, Any, Optional, List, Tuple
 from uuid import uuid4
 from datetime import datetime
 from app.schemas.workflow import (
@@ -7,6 +8,9 @@ from app.schemas.workflow import (
     WorkflowExecutionRequest,
     WorkflowExecutionResponse
 )
+from app.services.workflow.checkpoint import checkpoint_store
+from app.services.workflow.graph_cache import compiled_graph_cache
+from app.services.workflow.instance_store import WorkflowInstanceStore
 from app.utils.logger import logger
 
 
@@ -15,7 +19,7 @@ class WorkflowManager:
     
     def __init__(self):
         self._workflows: Dict[str, WorkflowDefinition] = {}
-        self._instances: Dict[str, WorkflowInstance] = {}
+        self._instances = WorkflowInstanceStore()
     
     def create_workflow(self, workflow: WorkflowDefinition) -> WorkflowDefinition:
         """创建工作流"""
@@ -42,6 +46,7 @@ class WorkflowManager:
             
             workflow.updated_at = datetime.now()
             self._workflows[workflow_id] = workflow
+            compiled_graph_cache.invalidate(workflow_id)
             logger.info(f"Workflow updated successfully: {workflow_id}")
             return workflow
         except Exception as e:
@@ -52,6 +57,7 @@ class WorkflowManager:
         """删除工作流"""
         if workflow_id in self._workflows:
             del self._workflows[workflow_id]
+            compiled_graph_cache.invalidate(workflow_id)
             logger.info(f"Workflow deleted successfully: {workflow_id}")
             return True
         logger.warning(f"Workflow with ID {workflow_id} not found for deletion")
@@ -78,21 +84,40 @@ class WorkflowManager:
                 execution_history=[]
             )
             
-            self._instances[instance_id] = instance
+            self._instances.add(instance)
             logger.info(f"Workflow instance created: {instance_id}")
             return instance
         except Exception as e:
             logger.error(f"Failed to create workflow instance: {str(e)}")
             raise
     
-    def get_instance(self, instance_id: str) -> Optional[WorkflowInstance]:
-        """获取工作流实例"""
+    def get_loaded_instance(self, instance_id: str) -> Optional[WorkflowInstance]:
+        """获取内存中的工作流实例，不从检查点加载"""
         return self._instances.get(instance_id)
     
+    async def get_instance(self, instance_id: str) -> Optional[WorkflowInstance]:
+        """获取工作流实例
+        
+        内存中不存在（已被保留策略淘汰或进程重启）时在线程中读取检查点，避免阻塞事件循环。
+        从检查点读取的实例只返回给调用方，不重新加入内存，以免分配新序号打乱保留策略的淘汰顺序。
+        """
+        instance = self._instances.get(instance_id)
+        if instance is None:
+            checkpoint = await asyncio.to_thread(checkpoint_store.load, instance_id)
+            if checkpoint is not None:
+                instance = checkpoint.instance
+        return instance
+    
+    def restore_instance(self, instance: WorkflowInstance) -> WorkflowInstance:
+        """恢复（例如从检查点加载的）工作流实例"""
+        self._instances.add(instance)
+        logger.info(f"Workflow instance restored: {instance.instance_id}")
+        return instance
+    
     def update_instance(self, instance_id: str, **kwargs) -> WorkflowInstance:
         """更新工作流实例"""
         try:
-            instance = self.get_instance(instance_id)
+            instance = self._instances.get(instance_id)
             if instance is None:
                 raise ValueError(f"Workflow instance with ID {instance_id} not found")
             
@@ -101,17 +126,38 @@ class WorkflowManager:
                     setattr(instance, key, value)
             
             instance.updated_at = datetime.now()
+            self._instances.reindex(instance)
             logger.info(f"Workflow instance updated: {instance_id}")
             return instance
         except Exception as e:
             logger.error(f"Failed to update workflow instance: {str(e)}")
             raise
     
-    def list_instances(self, workflow_id: Optional[str] = None) -> List[WorkflowInstance]:
-        """列出工作流实例"""
-        if workflow_id:
-            return [instance for instance in self._instances.values() if instance.workflow_id == workflow_id]
-        return list(self._instances.values())
+    def set_instance_status(self, instance: WorkflowInstance, status: str) -> WorkflowInstance:
+        """设置实例状态并同步状态索引（执行器原地更新实例时使用）"""
+        instance.status = status
+        instance.updated_at = datetime.now()
+        self._instances.reindex(instance)
+        return instance
+    
+    def list_instances(
+        self,
+        workflow_id: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[WorkflowInstance]:
+        """列出工作流实例（最新优先）"""
+        instances, _ = self._instances.list(workflow_id=workflow_id or None, status=status)
+        return instances
+    
+    def page_instances(
+        self,
+        workflow_id: Optional[str] = None,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[WorkflowInstance], Optional[str]]:
+        """分页列出工作流实例，返回当前页和下一页游标"""
+        return self._instances.list(workflow_id=workflow_id, status=status, cursor=cursor, limit=limit)
 
 
 # 创建全局工作流管理器实例
@@ -13,6 +13,26 @@ REQUEST_LATENCY = Histogram("api_request_duration_seconds", "API request duratio
 LLM_CALL_COUNT = Counter("llm_calls_total", "Total number of LLM calls")
 LLM_CALL_LATENCY = Histogram("llm_call_duration_seconds", "LLM call duration in seconds")
 TOKEN_USAGE = Counter("token_usage_total", "Total token usage")
+WORKFLOW_NODE_CACHE_HITS = Counter("workflow_node_cache_hits_total", "Total number of memoized workflow node hits", ["node_type"])
+WORKFLOW_NODE_CACHE_MISSES = Counter("workflow_node_cache_misses_total", "Total number of memoized workflow node misses", ["node_type"])
+MODEL_RESPONSE_CACHE_HITS = Counter("model_response_cache_hits_total", "Total number of model response cache hits", ["tier"])
+MODEL_RESPONSE_CACHE_MISSES = Counter("model_response_cache_misses_total", "Total number of model response cache misses")
+MODEL_SEMANTIC_CACHE_HITS = Counter("model_semantic_cache_hits_total", "Total number of semantic response cache hits")
+MODEL_SEMANTIC_CACHE_MISSES = Counter("model_semantic_cache_misses_total", "Total number of semantic response cache misses")
+MODEL_CALL_RETRIES = Counter("model_call_retries_total", "Total number of retried model calls", ["provider"])
+MODEL_CIRCUIT_OPEN_REJECTIONS = Counter("model_circuit_open_rejections_total", "Total number of model calls rejected by an open circuit", ["provider"])
+MODEL_ROUTING_FAILOVERS = Counter("model_routing_failovers_total", "Total number of routing group failovers", ["group"])
+MODEL_HEDGED_CALLS = Counter("model_hedged_calls_total", "Hedged model call events by outcome", ["group", "outcome"])
+MODEL_RATE_LIMIT_WAIT = Histogram("model_rate_limit_wait_seconds", "Time model calls waited for rate limit capacity", ["provider"])
+MODEL_RATE_LIMIT_REJECTIONS = Counter("model_rate_limit_rejections_total", "Total number of model calls rejected by the client-side rate limiter", ["provider"])
+MODEL_COALESCED_CALLS = Counter("model_coalesced_calls_total", "Total number of model calls served by an identical in-flight call", ["method"])
+KB_INGESTION_JOBS = Counter("kb_ingestion_jobs_total", "Knowledge base ingestion jobs by final status", ["status"])
+KB_EMBEDDING_REQUEST_DURATION = Histogram("kb_embedding_request_duration_seconds", "Embedding request duration in seconds", ["provider"])
+KB_EMBEDDED_TEXTS = Counter("kb_embedded_texts_total", "Total number of texts sent to embedding providers", ["provider"])
+KB_EMBEDDING_CACHE_HITS = Counter("kb_embedding_cache_hits_total", "Total number of texts served from the embedding cache")
+KB_EMBEDDING_CACHE_MISSES = Counter("kb_embedding_cache_misses_total", "Total number of texts missing from the embedding cache")
+KB_INGESTION_STAGE_DURATION = Histogram("kb_ingestion_stage_duration_seconds", "Knowledge base ingestion stage duration in seconds", ["stage"])
+MODEL_SEMANTIC_CACHE_SAVED_TOKENS = Counter("model_semantic_cache_saved_tokens_total", "Total number of tokens saved by semantic cache hits")
 
 def setup_observability(app: FastAPI):
     # 配置OpenTelemetry追踪
@@ -0,0 +1,21 @@
+import json
+from typing import Any, Optional
+from fastapi.encoders import jsonable_encoder
+
+# Server-Sent Events 响应的媒体类型与响应头（禁用代理缓冲，保证事件及时送达）
+SSE_MEDIA_TYPE = "text/event-stream"
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """将数据编码为一条 SSE 消息，非字符串数据序列化为 JSON"""
+    if not isinstance(data, str):
+        data = json.dumps(jsonable_encoder(data), ensure_ascii=False, default=str)
+    
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,142 @@
+"""递归分块基准测试
+
+在 1 MB、10 MB、100 MB 的两种合成文本上对比原递归分块实现与基于偏移的迭代实现的耗时：
+paragraphs 为长短不一的段落，部分段落超过块大小，需要按行和单词继续切分；
+unbroken 为没有换行的连续文本（如从 PDF 提取的文本），整体按单词切分。
+同时校验新实现的块不超过 chunk_size、相邻块的重叠不超过 chunk_overlap，且所有块覆盖了原文的全部非空白内容。
+超过 --legacy-max-mb 的输入跳过原实现。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.bench_chunking
+"""
+import argparse
+import random
+import time
+from typing import Callable, List, Tuple
+from app.schemas.knowledge_base import ChunkSettings
+from app.services.knowledge_base.document_processor import DocumentChunk, DocumentProcessor
+
+WORDS = [
+    "knowledge", "base", "chunk", "overlap", "vector", "embedding", "retrieval", "pipeline",
+    "文档", "分块", "检索", "向量化", "知识库", "模型", "a", "of", "the", "and", "to", "in"
+]
+
+
+def build_text(size: int, shape: str = "paragraphs", seed: int = 42) -> str:
+    """生成约 size 个字符的文本
+    
+    paragraphs：段落以空行分隔，段落内有换行，约 1/5 的段落超过 2000 个字符；unbroken：只以空格分隔单词。
+    """
+    rng = random.Random(seed)
+    if shape == "unbroken":
+        return " ".join(rng.choices(WORDS, k=size // 5))
+    
+    paragraphs = []
+    total = 0
+    while total < size:
+        lines = []
+        for _ in range(rng.choice([1, 2, 3, 5, 20])):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 25))))
+        paragraph = "\n".join(lines)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def legacy_recursive_chunking(text: str, chunk_settings: ChunkSettings) -> List[DocumentChunk]:
+    """原实现：逐个片段拼接字符串测试长度，递归切分超长片段，不支持重叠"""
+    chunks = []
+    separators = chunk_settings.separators or ["\n\n", "\n", " ", ""]
+
+    def _recursive_split(chunk: str, current_separator_idx: int) -> None:
+        if len(chunk) <= chunk_settings.chunk_size or current_separator_idx >= len(separators):
+            chunks.append(DocumentChunk(
+                content=chunk,
+                metadata={
+                    "chunk_index": len(chunks),
+                    "chunk_strategy": "recursive",
+                    "chunk_size": chunk_settings.chunk_size,
+                    "chunk_overlap": chunk_settings.chunk_overlap
+                }
+            ))
+            return
+
+        separator = separators[current_separator_idx]
+        parts = chunk.split(separator)
+
+        current_chunk = ""
+        for part in parts:
+            test_chunk = current_chunk + (separator if current_chunk else "") + part
+
+            if len(test_chunk) > chunk_settings.chunk_size:
+                if current_chunk:
+                    _recursive_split(current_chunk, current_separator_idx + 1)
+                current_chunk = part
+            else:
+                current_chunk = test_chunk
+
+        if current_chunk:
+            _recursive_split(current_chunk, current_separator_idx + 1)
+
+    _recursive_split(text, 0)
+    return chunks
+
+
+def check_chunks(text: str, chunks: List[DocumentChunk], chunk_settings: ChunkSettings) -> None:
+    """校验块大小、重叠和覆盖范围"""
+    covered = 0
+    for chunk in chunks:
+        start, end = chunk.metadata["start_offset"], chunk.metadata["end_offset"]
+        if text[start:end] != chunk.content:
+            raise AssertionError(f"chunk {chunk.metadata['chunk_index']}: offsets do not match content")
+        if len(chunk.content) > chunk_settings.chunk_size:
+            raise AssertionError(f"chunk {chunk.metadata['chunk_index']}: {len(chunk.content)} chars exceeds chunk size")
+        if covered - start > chunk_settings.chunk_overlap:
+            raise AssertionError(f"chunk {chunk.metadata['chunk_index']}: overlap {covered - start} exceeds chunk overlap")
+        if text[covered:start].strip():
+            raise AssertionError(f"chunk {chunk.metadata['chunk_index']}: text before offset {start} is not covered")
+        covered = max(covered, end)
+    if text[covered:].strip():
+        raise AssertionError("text after the last chunk is not covered")
+
+
+def best_of(func: Callable[[], List[DocumentChunk]], repeat: int) -> Tuple[float, List[DocumentChunk]]:
+    """运行 repeat 次，返回最短耗时和结果"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = func()
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+
+def run(sizes_mb: List[int], shapes: List[str], chunk_size: int, chunk_overlap: int, legacy_max_mb: int, repeat: int) -> None:
+    processor = DocumentProcessor()
+    chunk_settings = ChunkSettings(chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunking_strategy="recursive")
+    print(f"chunk size {chunk_size}, overlap {chunk_overlap}, best of {repeat} runs")
+
+    for shape, size_mb in [(shape, size_mb) for shape in shapes for size_mb in sizes_mb]:
+        text = build_text(size_mb * 1024 * 1024, shape)
+
+        fast, chunks = best_of(lambda: processor._recursive_chunking(text, chunk_settings), repeat)
+        check_chunks(text, chunks, chunk_settings)
+
+        if size_mb <= legacy_max_mb:
+            legacy, legacy_chunks = best_of(lambda: legacy_recursive_chunking(text, chunk_settings), repeat)
+            legacy_result = f"legacy {legacy:8.2f}s ({len(legacy_chunks):>7} chunks)  speedup {legacy / fast:5.1f}x"
+        else:
+            legacy_result = "legacy skipped"
+
+        print(f"{shape:<10} {size_mb:>4} MB: offsets {fast:8.2f}s ({len(chunks):>7} chunks)  {legacy_result}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="输入大小（MB）")
+    parser.add_argument("--shapes", nargs="+", default=["paragraphs", "unbroken"], choices=["paragraphs", "unbroken"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--legacy-max-mb", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.shapes, args.chunk_size, args.chunk_overlap, args.legacy_max_mb, args.repeat)
@@ -0,0 +1,44 @@
+"""条件表达式求值基准测试
+
+用 tests/test_expressions.py 中的表达式语料对比预编译表达式与原 eval 实现单次求值的耗时。
+原实现每次求值都会复制上下文并重新解析表达式。语料的结果校验由该测试负责。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.bench_condition_eval
+"""
+import argparse
+import time
+from app.services.workflow.expressions import compile_expression
+from tests.test_expressions import CORPUS, build_context, legacy_evaluate
+
+
+def run(extra_keys: int, repeat: int) -> None:
+    context = build_context(extra_keys)
+
+    # 原实现不支持属性访问，只比较两者都支持的表达式
+    sources = [source for source, _ in CORPUS if "." not in source]
+    compiled = [compile_expression(source) for source in sources]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for source in sources:
+            legacy_evaluate(source, context)
+    legacy = (time.perf_counter() - start) / (repeat * len(sources)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for evaluate in compiled:
+            bool(evaluate(context))
+    fast = (time.perf_counter() - start) / (repeat * len(sources)) * 1e6
+
+    print(f"context size: {len(context)} keys, {len(sources)} expressions x {repeat} rounds")
+    print(f"eval:     {legacy:8.2f} us/evaluation")
+    print(f"compiled: {fast:8.2f} us/evaluation ({legacy / fast:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--context-keys", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.context_keys, args.repeat)
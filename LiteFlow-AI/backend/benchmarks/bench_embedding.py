@@ -0,0 +1,110 @@
+"""知识库向量化吞吐基准测试
+
+使用本地模拟的向量化提供商（每次请求有固定网络延迟，另按文本数计算耗时），
+在 10k 个文档块的语料上对比逐块请求、串行批量请求和并发批量请求的吞吐（chunks/sec），
+并校验批量并发返回的向量与输入顺序一致。逐块请求过慢，只在前 --per-chunk-sample 个块上测量。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.bench_embedding
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from typing import List
+from app.services.knowledge_base.embeddings import BatchEmbedder, EmbeddingProvider
+
+
+class StubEmbeddingProvider(EmbeddingProvider):
+    """模拟向量化提供商，向量由文本哈希确定"""
+    
+    max_batch_size = 2048
+    
+    def __init__(self, request_latency: float, per_text_latency: float, dimensions: int = 8):
+        super().__init__("stub-embedding", dimensions)
+        self.request_latency = request_latency
+        self.per_text_latency = per_text_latency
+        self.requests = 0
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        await asyncio.sleep(self.request_latency + self.per_text_latency * len(texts))
+        return [vector_for(text, self.dimensions) for text in texts]
+    
+    @property
+    def provider(self) -> str:
+        return "stub"
+
+
+def vector_for(text: str, dimensions: int) -> List[float]:
+    digest = hashlib.sha256(text.encode()).digest()
+    return [byte / 255 for byte in digest[:dimensions]]
+
+
+def build_corpus(chunks: int, chunk_size: int) -> List[str]:
+    """生成文档块语料，每块约 chunk_size 个字符"""
+    rng = random.Random(42)
+    words = ["知识库", "向量", "检索", "embedding", "chunk", "document", "pipeline", "模型", "latency", "batch"]
+    corpus = []
+    for i in range(chunks):
+        text = f"[{i}] "
+        while len(text) < chunk_size:
+            text += rng.choice(words) + " "
+        corpus.append(text)
+    return corpus
+
+
+async def measure(label: str, corpus: List[str], provider: StubEmbeddingProvider, **kwargs) -> float:
+    embedder = BatchEmbedder(provider, **kwargs)
+    provider.requests = 0
+    start = time.perf_counter()
+    embeddings = await embedder.embed(corpus)
+    elapsed = time.perf_counter() - start
+    
+    expected = [vector_for(text, provider.dimensions) for text in corpus]
+    if embeddings != expected:
+        raise AssertionError(f"{label}: embeddings are out of order or missing")
+    
+    throughput = len(corpus) / elapsed
+    print(f"{label:<28} {len(corpus):>6} chunks {provider.requests:>6} requests {elapsed:8.2f}s {throughput:10.0f} chunks/sec")
+    return throughput
+
+
+async def run(args: argparse.Namespace) -> None:
+    corpus = build_corpus(args.chunks, args.chunk_size)
+    provider = StubEmbeddingProvider(args.request_latency, args.per_text_latency)
+    print(
+        f"stub provider: {args.request_latency * 1000:.0f}ms per request + "
+        f"{args.per_text_latency * 1000:.2f}ms per text, chunk size {args.chunk_size} chars"
+    )
+    
+    sequential = await measure(
+        "per-chunk, sequential", corpus[:args.per_chunk_sample], provider,
+        batch_size=1, concurrency=1
+    )
+    await measure(
+        f"per-chunk, concurrency {args.concurrency}", corpus[:args.per_chunk_sample], provider,
+        batch_size=1, concurrency=args.concurrency
+    )
+    await measure(
+        f"batch {args.batch_size}, sequential", corpus, provider,
+        batch_size=args.batch_size, concurrency=1
+    )
+    batched = await measure(
+        f"batch {args.batch_size}, concurrency {args.concurrency}", corpus, provider,
+        batch_size=args.batch_size, concurrency=args.concurrency
+    )
+    print(f"batched + concurrent vs per-chunk sequential: {batched / sequential:.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--request-latency", type=float, default=0.02)
+    parser.add_argument("--per-text-latency", type=float, default=0.0005)
+    parser.add_argument("--per-chunk-sample", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
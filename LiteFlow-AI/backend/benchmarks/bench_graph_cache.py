@@ -0,0 +1,66 @@
+"""工作流编译图缓存基准测试
+
+对比每次请求重新构建执行计划与命中编译图缓存两种情况下的单次请求开销。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.bench_graph_cache
+"""
+import argparse
+import time
+from typing import List
+from app.schemas.workflow import WorkflowDefinition, WorkflowNode, WorkflowEdge
+from app.services.workflow.execution_plan import ExecutionPlan
+from app.services.workflow.graph_cache import CompiledGraphCache
+
+
+def build_linear_workflow(node_count: int) -> WorkflowDefinition:
+    """构造包含 node_count 个节点的线性工作流：start -> tool ... -> end"""
+    nodes = [WorkflowNode(node_id="start", type="start", name="start")]
+    for i in range(node_count - 2):
+        nodes.append(WorkflowNode(
+            node_id=f"tool_{i}",
+            type="tool",
+            name=f"tool_{i}",
+            config={"tool_id": "calculator", "parameters": {"operation": "add", "a": 1, "b": 1}}
+        ))
+    nodes.append(WorkflowNode(node_id="end", type="end", name="end"))
+
+    edges = [
+        WorkflowEdge(edge_id=f"e_{i}", source=nodes[i].node_id, target=nodes[i + 1].node_id)
+        for i in range(len(nodes) - 1)
+    ]
+    return WorkflowDefinition(
+        workflow_id=f"bench_{node_count}",
+        name=f"bench_{node_count}",
+        nodes=nodes,
+        edges=edges,
+        entry_point="start",
+        exit_point="end"
+    )
+
+
+def _per_request_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(sizes: List[int], repeat: int) -> None:
+    print(f"{'nodes':>8} {'uncached (ms)':>15} {'cached (ms)':>13} {'speedup':>9}")
+    for size in sizes:
+        workflow = build_linear_workflow(size)
+        cache = CompiledGraphCache(max_size=8)
+        cache.get_or_build(workflow, ExecutionPlan.build)
+
+        uncached = _per_request_ms(lambda: ExecutionPlan.build(workflow), repeat)
+        cached = _per_request_ms(lambda: cache.get_or_build(workflow, ExecutionPlan.build), repeat)
+        print(f"{size:>8} {uncached:>15.3f} {cached:>13.3f} {uncached / cached:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
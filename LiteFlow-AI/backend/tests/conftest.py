@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# 测试数据（检查点、入库任务、向量缓存、Chroma）写入临时目录，需在导入 app 之前设置
+_DATA_DIR = tempfile.mkdtemp(prefix="liteflow-tests-")
+os.environ.setdefault("WORKFLOW_CHECKPOINT_PATH", os.path.join(_DATA_DIR, "checkpoints.sqlite3"))
+os.environ.setdefault("KB_INGESTION_JOB_PATH", os.path.join(_DATA_DIR, "ingestion_jobs.sqlite3"))
+os.environ.setdefault("KB_EMBEDDING_CACHE_PATH", os.path.join(_DATA_DIR, "embedding_cache.sqlite3"))
+os.environ.setdefault("CHROMA_PERSIST_DIRECTORY", os.path.join(_DATA_DIR, "chroma"))
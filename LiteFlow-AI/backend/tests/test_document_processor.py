@@ -0,0 +1,94 @@
+import random
+from typing import List, Optional
+import pytest
+from app.schemas.knowledge_base import ChunkSettings
+from app.services.knowledge_base.document_processor import DocumentChunk, DocumentProcessor
+
+processor = DocumentProcessor()
+
+SEPARATOR_SETS = [None, ["\n\n", "\n", " ", ""], ["\n", ""], [". ", " ", ""], ["\n\n", "\n"], [" "], ["|"]]
+ALPHABET = ["a", "bb", "文档", "xyz", " ", " ", "\n", "\n\n", ". ", "|", "\t"]
+
+
+def random_text(rng: random.Random) -> str:
+    return "".join(rng.choices(ALPHABET, k=rng.randint(0, 400)))
+
+
+def recursive(text: str, chunk_size: int, chunk_overlap: int, separators: Optional[List[str]] = None) -> List[DocumentChunk]:
+    return processor._recursive_chunking(text, ChunkSettings(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunking_strategy="recursive", separators=separators
+    ))
+
+
+def assert_invariants(text: str, chunks: List[DocumentChunk], chunk_size: int, chunk_overlap: int, separators) -> None:
+    """块偏移与内容一致、首尾无空白、起止位置严格递增、按顺序覆盖原文全部非空白内容、
+    相邻块重叠不超过 chunk_overlap；分隔符包含空字符串时块不超过 chunk_size"""
+    bounded = "" in (separators or [""])
+    covered, previous_start = 0, -1
+    for i, chunk in enumerate(chunks):
+        start, end = chunk.metadata["start_offset"], chunk.metadata["end_offset"]
+        assert chunk.metadata["chunk_index"] == i
+        assert text[start:end] == chunk.content
+        assert chunk.content and chunk.content == chunk.content.strip()
+        if bounded:
+            assert len(chunk.content) <= chunk_size
+        assert covered - start <= chunk_overlap
+        assert not text[covered:start].strip()
+        assert start > previous_start and end > covered
+        covered, previous_start = end, start
+    assert not text[covered:].strip()
+
+
+def test_recursive_chunking_invariants_fuzz():
+    rng = random.Random(20240601)
+    for _ in range(3000):
+        text = random_text(rng)
+        chunk_size = rng.randint(1, 60)
+        chunk_overlap = rng.randint(0, chunk_size - 1)
+        separators = rng.choice(SEPARATOR_SETS)
+
+        chunks = recursive(text, chunk_size, chunk_overlap, separators)
+
+        assert_invariants(text, chunks, chunk_size, chunk_overlap, separators)
+
+
+def test_paragraphs_are_kept_together_when_they_fit():
+    text = "first paragraph\n\nsecond one\n\nthird"
+    chunks = recursive(text, 30, 0)
+    assert [chunk.content for chunk in chunks] == ["first paragraph\n\nsecond one", "third"]
+
+
+def test_overlap_repeats_whole_trailing_pieces():
+    text = "one two three four five six"
+    chunks = recursive(text, 14, 6)
+    assert [chunk.content for chunk in chunks] == ["one two three", "three four", "four five six"]
+    assert_invariants(text, chunks, 14, 6, None)
+
+
+@pytest.mark.parametrize("text", ["", "   ", "\n\n\t \n"])
+def test_empty_or_whitespace_text_has_no_chunks(text):
+    assert recursive(text, 10, 2) == []
+
+
+def test_oversize_piece_is_kept_without_empty_separator():
+    text = "short|" + "x" * 30 + "|tail"
+    chunks = recursive(text, 10, 0, ["|"])
+    assert [chunk.content for chunk in chunks] == ["short|", "x" * 30 + "|", "tail"]
+    assert_invariants(text, chunks, 10, 0, ["|"])
+
+
+def test_whitespace_does_not_produce_duplicate_chunks():
+    chunks = recursive("a  bcdefgh", 4, 3, ["\n", ""])
+    assert [chunk.content for chunk in chunks] == ["a  b", "bcde", "cdef", "defg", "efgh"]
+
+
+def test_unbroken_text_is_cut_at_chunk_size():
+    text = "x" * 25
+    chunks = recursive(text, 10, 3)
+    assert [(chunk.metadata["start_offset"], chunk.metadata["end_offset"]) for chunk in chunks] == [(0, 10), (7, 17), (14, 24), (21, 25)]
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", [(0, 0), (-1, 0), (10, -1), (10, 10), (10, 11)])
+def test_invalid_chunk_settings_are_rejected(chunk_size, chunk_overlap):
+    with pytest.raises(ValueError):
+        recursive("some text", chunk_size, chunk_overlap)
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from typing import List
+import httpx
+import pytest
+from app.config import settings
+from app.schemas.knowledge_base import EmbeddingSettings
+from app.services.knowledge_base.embedding_cache import EmbeddingCacheStore
+from app.services.knowledge_base.embeddings import BatchEmbedder, EmbeddingProvider, EmbeddingService, OpenAIEmbeddingProvider
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """记录请求体，按输入顺序倒序返回向量的 OpenAI embeddings 接口"""
+
+    def __init__(self):
+        self.bodies: List[dict] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.bodies.append(body)
+        data = [
+            {"object": "embedding", "index": i, "embedding": [float(i)]}
+            for i in range(len(body["input"]))
+        ]
+        return httpx.Response(200, json={
+            "object": "list",
+            "model": body["model"],
+            "data": data[::-1],
+            "usage": {"prompt_tokens": 1, "total_tokens": 1}
+        })
+
+
+class FakeProvider(EmbeddingProvider):
+    """按文本长度生成向量，可按脚本抛出错误"""
+
+    def __init__(self, max_batch_size: int = 2048, errors: List[Exception] = None, delay: float = 0.0):
+        super().__init__("fake-model")
+        self.max_batch_size = max_batch_size
+        self.errors = list(errors or [])
+        self.delay = delay
+        self.calls: List[List[str]] = []
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        if self.errors:
+            raise self.errors.pop(0)
+        # 先提交的批次后返回，验证结果仍按输入顺序拼接
+        await asyncio.sleep(self.delay / len(self.calls))
+        return [[float(len(text))] for text in texts]
+
+    @property
+    def provider(self) -> str:
+        return "fake"
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://embeddings.test")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_RETRY_BACKOFF_BASE", 0.0)
+
+
+@pytest.mark.parametrize("dimensions", [None, 256])
+def test_openai_provider_sends_dimensions_only_when_set(dimensions):
+    transport = RecordingTransport()
+    provider = OpenAIEmbeddingProvider(
+        "text-embedding-3-small", api_key="sk-test", dimensions=dimensions,
+        http_client=httpx.AsyncClient(transport=transport)
+    )
+
+    async def embed():
+        try:
+            return await provider.embed(["a", "b", "c"])
+        finally:
+            await provider.aclose()
+
+    # 响应中的向量乱序，结果按 index 还原
+    assert asyncio.run(embed()) == [[0.0], [1.0], [2.0]]
+    body = transport.bodies[0]
+    assert body["input"] == ["a", "b", "c"]
+    assert body.get("dimensions") == dimensions
+    assert ("dimensions" in body) == (dimensions is not None)
+
+
+def test_batches_respect_size_and_token_limits():
+    embedder = BatchEmbedder(FakeProvider(max_batch_size=3), batch_size=10, batch_tokens=10**6)
+    assert [(start, end) for start, end, _ in embedder.batches(["x"] * 7)] == [(0, 3), (3, 6), (6, 7)]
+
+    embedder = BatchEmbedder(FakeProvider(), batch_size=100, batch_tokens=1)
+    # 单条文本超过 token 上限时仍单独成批
+    assert [(start, end) for start, end, _ in embedder.batches(["long text " * 10, "a", "b"])] == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_embed_keeps_input_order_across_concurrent_batches():
+    provider = FakeProvider(max_batch_size=2, delay=0.01)
+    embedder = BatchEmbedder(provider, concurrency=4, cache=None)
+    texts = ["a" * n for n in range(1, 10)]
+
+    embeddings = asyncio.run(embedder.embed(texts))
+
+    assert embeddings == [[float(len(text))] for text in texts]
+    assert len(provider.calls) == 5
+
+
+def test_embed_retries_retryable_errors_only():
+    provider = FakeProvider(errors=[status_error(429), status_error(503)])
+    embedder = BatchEmbedder(provider, retries=2)
+    assert asyncio.run(embedder._embed_all(["ab"])) == [[2.0]]
+    assert len(provider.calls) == 3
+
+    provider = FakeProvider(errors=[status_error(400)])
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(BatchEmbedder(provider, retries=2)._embed_all(["ab"]))
+    assert len(provider.calls) == 1
+
+
+def test_embed_rejects_mismatched_vector_count():
+    class ShortProvider(FakeProvider):
+        async def embed(self, texts):
+            return (await super().embed(texts))[:-1]
+
+    with pytest.raises(ValueError):
+        asyncio.run(BatchEmbedder(ShortProvider())._embed_all(["a", "b"]))
+
+
+def test_cache_deduplicates_and_reuses_embeddings(tmp_path):
+    cache = EmbeddingCacheStore(str(tmp_path / "cache.sqlite3"))
+    provider = FakeProvider()
+    embedder = BatchEmbedder(provider, cache=cache)
+
+    assert asyncio.run(embedder.embed(["a", "bb", "a"])) == [[1.0], [2.0], [1.0]]
+    # 重复文本只向量化一次
+    assert provider.calls == [["a", "bb"]]
+
+    assert asyncio.run(embedder.embed(["bb", "ccc", "a"])) == [[2.0], [3.0], [1.0]]
+    # 命中缓存的文本不再请求提供商
+    assert provider.calls[1:] == [["ccc"]]
+    assert cache.stats()["hits"] == 2
+
+
+def test_service_shares_embedders_per_model(monkeypatch):
+    monkeypatch.setattr(settings, "KB_EMBEDDING_PROVIDERS", {"openai": {"api_key": "sk-test"}})
+
+    async def scenario():
+        service = EmbeddingService()
+        try:
+            small = service.get(EmbeddingSettings(model_name="text-embedding-3-small", dimensions=256))
+            assert service.get(EmbeddingSettings(model_name="text-embedding-3-small", dimensions=256)) is small
+            assert service.get(EmbeddingSettings(model_name="text-embedding-3-small")) is not small
+            assert small.provider.dimensions == 256
+            with pytest.raises(ValueError):
+                service.get(EmbeddingSettings(provider="unknown"))
+        finally:
+            await service.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,121 @@
+from typing import Any, Dict
+import pytest
+from app.services.workflow.expressions import compile_expression
+
+# (表达式, 期望结果)，上下文见 build_context
+CORPUS = [
+    ("score > 0.8", True),
+    ("score >= 0.95", False),
+    ("0.5 < score <= 0.9", True),
+    ("status == 'approved'", True),
+    ("status != 'approved' or retries < 3", True),
+    ("not is_vip and score > 0.5", True),
+    ("category in ['billing', 'refund']", True),
+    ("category not in ('sales',)", True),
+    ("user['age'] >= 18", True),
+    ("user.age >= 18 and user.country == 'CN'", True),
+    ("user.tags[0] == 'new'", True),
+    ("tool_result * 2 > 10", True),
+    ("tool_result % 2 == 1", True),
+    ("-retries < 0", True),
+    ("len_limit is None", True),
+    ("model_result.content == 'yes'", True),
+    ("'yes' in model_result.content", True),
+    ("(score > 0.9 or retries > 1) and status == 'approved'", True),
+    ("status + '!' == 'approved!'", True),
+    ("score / 2 < 0.5 and retries - 1 == 1", True),
+]
+
+# 预编译时必须拒绝的表达式
+REJECTED = [
+    "__import__('os').system('echo unsafe')",
+    "user.__class__",
+    "[x for x in user.tags]",
+    "lambda: 1",
+    "len(user.tags) > 0",
+    "score = 1",
+    "'x' * 10 ** 10",
+    "",
+]
+
+
+class _ModelResult:
+    def __init__(self, content: str):
+        self.content = content
+
+
+def build_context(extra_keys: int = 0) -> Dict[str, Any]:
+    """构造求值上下文，extra_keys 模拟工作流中累积的其他变量"""
+    context: Dict[str, Any] = {
+        "score": 0.85,
+        "status": "approved",
+        "retries": 2,
+        "is_vip": False,
+        "category": "billing",
+        "user": {"age": 30, "country": "CN", "tags": ["new", "mobile"]},
+        "tool_result": 7,
+        "len_limit": None,
+        "model_result": _ModelResult("yes"),
+    }
+    for i in range(extra_keys):
+        context[f"var_{i}"] = {"value": i, "text": f"value-{i}"}
+    return context
+
+
+def legacy_evaluate(condition: str, context: Dict[str, Any]) -> bool:
+    """原实现：复制上下文后调用 eval"""
+    global_vars = context.copy()
+    return bool(eval(condition, {"__builtins__": {}}, global_vars))
+
+
+@pytest.mark.parametrize("source, expected", CORPUS)
+def test_corpus_matches_expected_and_eval(source, expected):
+    context = build_context(extra_keys=5)
+    assert bool(compile_expression(source)(context)) is expected
+    # 原实现不支持属性访问，只比较两者都支持的表达式
+    if "." not in source:
+        assert legacy_evaluate(source, context) is expected
+
+
+@pytest.mark.parametrize("source", REJECTED)
+def test_unsafe_expressions_are_rejected(source):
+    with pytest.raises(ValueError):
+        compile_expression(source)
+
+
+@pytest.mark.parametrize("source", [
+    "status * count",
+    "count * user.tags",
+    "(0,) * count",
+    "'%0*d' % (count, 1)",
+    "status % count",
+])
+def test_sequence_repetition_is_rejected_at_evaluation(source):
+    context = {**build_context(), "count": 10 ** 9}
+    with pytest.raises(ValueError):
+        compile_expression(source)(context)
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("missing > 1", False),
+    ("missing <= 1", False),
+    ("1 < missing", False),
+    ("0 < missing < 1", False),
+    ("not missing >= 1", True),
+    ("missing + 1 > 0", False),
+    ("-missing < 0", False),
+    ("missing * 2 == None", True),
+    ("user.missing >= 18", False),
+    ("'new' in missing", False),
+    ("'new' not in missing", True),
+    ("missing == None", True),
+    ("missing != 0", True),
+    ("missing is None", True),
+])
+def test_missing_values_compare_as_none(source, expected):
+    assert compile_expression(source)(build_context()) is expected
+
+
+def test_type_errors_other_than_none_still_raise():
+    with pytest.raises(TypeError):
+        compile_expression("status > 1")(build_context())
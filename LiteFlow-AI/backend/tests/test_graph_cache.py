@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from app.schemas.workflow import WorkflowDefinition, WorkflowEdge, WorkflowNode
+from app.services.workflow.execution_plan import ExecutionPlan
+from app.services.workflow.graph_cache import CompiledGraphCache
+
+
+def make_workflow(workflow_id: str = "wf", updated_at: datetime = datetime(2024, 1, 1)) -> WorkflowDefinition:
+    return WorkflowDefinition(
+        workflow_id=workflow_id,
+        name=workflow_id,
+        nodes=[
+            WorkflowNode(node_id="start", type="start", name="start"),
+            WorkflowNode(node_id="end", type="end", name="end")
+        ],
+        edges=[WorkflowEdge(edge_id="e", source="start", target="end")],
+        entry_point="start",
+        exit_point="end",
+        updated_at=updated_at
+    )
+
+
+def test_hit_does_not_rebuild():
+    cache = CompiledGraphCache(max_size=4)
+    workflow = make_workflow()
+    builds = []
+
+    def builder(definition):
+        builds.append(definition.workflow_id)
+        return ExecutionPlan.build(definition)
+
+    first = cache.get_or_build(workflow, builder)
+    assert cache.get_or_build(workflow, builder) is first
+    # 同一版本的另一个定义对象同样命中
+    assert cache.get_or_build(make_workflow(), builder) is first
+    assert builds == ["wf"]
+    assert cache.stats()["hits"] == 2
+
+
+def test_hit_does_not_serialize_definition(monkeypatch):
+    cache = CompiledGraphCache(max_size=4)
+    workflow = make_workflow()
+    cache.get_or_build(workflow, ExecutionPlan.build)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cache hit serialized the workflow definition")
+
+    monkeypatch.setattr(WorkflowDefinition, "model_dump_json", fail)
+    cache.get_or_build(workflow, ExecutionPlan.build)
+
+
+def test_new_version_and_invalidate():
+    cache = CompiledGraphCache(max_size=4)
+    old = cache.get_or_build(make_workflow(), ExecutionPlan.build)
+    new = cache.get_or_build(make_workflow(updated_at=datetime(2024, 1, 1) + timedelta(seconds=1)), ExecutionPlan.build)
+    assert new is not old
+
+    assert cache.invalidate("wf") == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction():
+    cache = CompiledGraphCache(max_size=2)
+    for workflow_id in ("a", "b"):
+        cache.get_or_build(make_workflow(workflow_id), ExecutionPlan.build)
+    # 访问 a 后插入 c，最久未使用的 b 被淘汰
+    cache.get_or_build(make_workflow("a"), ExecutionPlan.build)
+    cache.get_or_build(make_workflow("c"), ExecutionPlan.build)
+
+    assert cache.invalidate("b") == 0
+    assert cache.invalidate("a") == 1
@@ -0,0 +1,217 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1 import knowledge_base as knowledge_base_api
+from app.schemas.knowledge_base import ChunkSettings, DocumentStatusUpdate, IngestionJob, KnowledgeBase
+from app.services.knowledge_base.document_processor import chunk_document
+from app.services.knowledge_base.ingestion import IngestionJobStore, IngestionPipeline, IngestionQueueFullError, ingestion_job_store
+from app.services.knowledge_base.knowledge_base_manager import ChunkDiff
+
+app = FastAPI()
+app.include_router(knowledge_base_api.router)
+client = TestClient(app)
+
+CHUNK_SETTINGS = ChunkSettings(chunk_size=50, chunk_overlap=10, chunking_strategy="recursive")
+
+
+class FakeEmbedder:
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [[float(len(text))] for text in texts]
+
+
+class FakeManager:
+    """记录入库流水线回调的知识库管理器"""
+
+    def __init__(self):
+        self.statuses: Dict[str, List[str]] = {}
+        self.stored: List[Tuple[str, ChunkDiff, List[List[float]]]] = []
+
+    def update_document_status(self, kb_id: str, document_id: str, status_update: DocumentStatusUpdate):
+        self.statuses.setdefault(document_id, []).append(status_update.status)
+
+    def diff_chunks(self, kb_id, document_id, filename, chunks) -> ChunkDiff:
+        return ChunkDiff(
+            added_ids=[f"{document_id}_{i}" for i in range(len(chunks))],
+            added_documents=[chunk.content for chunk in chunks],
+            added_metadatas=[chunk.metadata for chunk in chunks],
+            updated_ids=[], updated_metadatas=[], deleted_ids=[], unchanged=[]
+        )
+
+    def get_embedder(self, kb_id: str) -> FakeEmbedder:
+        return FakeEmbedder()
+
+    def apply_chunk_diff(self, kb_id: str, diff: ChunkDiff, embeddings: List[List[float]]) -> None:
+        self.stored.append((kb_id, diff, embeddings))
+
+
+def make_job(document_id: str, filename: str = "doc.txt") -> IngestionJob:
+    now = datetime.utcnow()
+    return IngestionJob(
+        job_id=f"job-{document_id}", knowledge_base_id="kb", document_id=document_id,
+        filename=filename, created_at=now, updated_at=now
+    )
+
+
+def write_file(directory, name: str, content: str) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+@pytest.fixture
+def store(tmp_path) -> IngestionJobStore:
+    return IngestionJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_full_queue_rejects_submission(store, tmp_path):
+    pipeline = IngestionPipeline(FakeManager(), store, processes=1, embed_workers=1, queue_size=1)
+
+    async def scenario():
+        try:
+            # 提交之间不让出事件循环，worker 尚未取走任务
+            pipeline.submit(make_job("a"), write_file(tmp_path, "a.txt", "a"), CHUNK_SETTINGS)
+            with pytest.raises(IngestionQueueFullError):
+                pipeline.submit(make_job("b"), write_file(tmp_path, "b.txt", "b"), CHUNK_SETTINGS)
+            await pipeline.join()
+        finally:
+            await pipeline.shutdown()
+
+    asyncio.run(scenario())
+    assert store.get("job-a").status == "completed"
+    # 被拒绝的任务不写入任务存储
+    assert store.get("job-b") is None
+
+
+def test_pipeline_completes_jobs_and_syncs_document_status(store, tmp_path):
+    manager = FakeManager()
+    pipeline = IngestionPipeline(manager, store, processes=1, embed_workers=2, queue_size=4)
+    text = "\n\n".join(f"paragraph {i} " + "word " * 12 for i in range(5))
+    good = write_file(tmp_path, "good.txt", text)
+    bad = write_file(tmp_path, "bad.xyz", text)
+
+    async def scenario():
+        try:
+            pipeline.submit(make_job("good"), good, CHUNK_SETTINGS)
+            pipeline.submit(make_job("bad", "bad.xyz"), bad, CHUNK_SETTINGS)
+            await pipeline.join()
+        finally:
+            await pipeline.shutdown()
+
+    asyncio.run(scenario())
+
+    job = store.get("job-good")
+    assert job.status == "completed"
+    assert job.chunks_count == job.chunks_added == len(manager.stored[0][1].added_ids) > 1
+    assert manager.statuses["good"] == ["processing", "processing", "completed"]
+    _, diff, embeddings = manager.stored[0]
+    assert embeddings == [[float(len(content))] for content in diff.added_documents]
+
+    failed = store.get("job-bad")
+    assert failed.status == "failed"
+    assert "Unsupported file type" in failed.error_message
+    assert manager.statuses["bad"] == ["processing", "failed"]
+
+    # 解析完成（或失败）后流水线删除上传的文件
+    assert not os.path.exists(good)
+    assert not os.path.exists(bad)
+    assert pipeline.stats()["queued"] == 0
+
+
+def test_job_states_are_saved_in_order_off_the_event_loop(store, tmp_path, monkeypatch):
+    pipeline = IngestionPipeline(FakeManager(), store, processes=1, embed_workers=1, queue_size=2)
+    save = store.save
+    saved: List[Tuple[str, bool]] = []
+
+    def recording_save(job):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop = True
+        except RuntimeError:
+            on_event_loop = False
+        saved.append((job.status, on_event_loop))
+        save(job)
+
+    monkeypatch.setattr(store, "save", recording_save)
+
+    async def scenario():
+        try:
+            pipeline.submit(make_job("a"), write_file(tmp_path, "a.txt", "some text"), CHUNK_SETTINGS)
+            # 状态尚未写入任务存储时查询仍能看到任务
+            assert saved == []
+            assert pipeline.get_job("job-a").status == "queued"
+            assert [job.job_id for job in pipeline.list_jobs("kb", status="queued")] == ["job-a"]
+            await pipeline.join()
+        finally:
+            await pipeline.shutdown()
+
+    asyncio.run(scenario())
+    assert saved == [(status, False) for status in ("queued", "parsing", "embedding", "completed")]
+    assert pipeline.get_job("job-a").status == "completed"
+    assert pipeline.list_jobs("kb", status="queued") == []
+
+
+def test_reopened_store_fails_interrupted_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = IngestionJobStore(path)
+    for document_id, status in [("queued", "queued"), ("parsing", "parsing"), ("done", "completed")]:
+        job = make_job(document_id)
+        job.status = status
+        store.save(job)
+
+    # 打开存储本身不修改任务状态，由服务启动时显式标记
+    reopened = IngestionJobStore(path)
+    assert reopened.get("job-queued").status == "queued"
+    assert reopened.fail_interrupted() == 2
+    assert reopened.get("job-queued").status == "failed"
+    assert reopened.get("job-parsing").error_message == "Ingestion interrupted by service restart"
+    assert reopened.get("job-done").status == "completed"
+    assert {job.job_id for job in reopened.list_jobs("kb", status="failed")} == {"job-queued", "job-parsing"}
+
+
+def test_spawned_parse_worker_keeps_active_jobs(tmp_path):
+    # spawn 启动的子进程会重新导入知识库包（包括全局任务存储），不能把进行中的任务标记为失败
+    job = make_job("in-flight")
+    ingestion_job_store.save(job)
+    path = write_file(tmp_path, "doc.txt", "spawned worker text")
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunks = pool.submit(chunk_document, path, CHUNK_SETTINGS).result(timeout=120)
+
+    assert [chunk.content for chunk in chunks] == ["spawned worker text"]
+    assert ingestion_job_store.get(job.job_id).status == "queued"
+
+
+def test_upload_returns_429_when_queue_is_full(monkeypatch, store, tmp_path):
+    knowledge_base = KnowledgeBase(id="kb-full", name="kb-full", created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+    kb_manager = knowledge_base_api.kb_manager
+    monkeypatch.setitem(kb_manager.knowledge_bases, knowledge_base.id, knowledge_base)
+
+    # 队列已被占满且 worker 视为已启动，提交时直接触发背压
+    pipeline = IngestionPipeline(FakeManager(), store, processes=1, embed_workers=1, queue_size=1)
+    pipeline._queue = asyncio.Queue(maxsize=1)
+    pipeline._queue.put_nowait(None)
+    pipeline._workers = [None]
+    monkeypatch.setattr(kb_manager, "ingestion", pipeline)
+
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(upload_dir))
+
+    response = client.post(
+        f"/knowledge-bases/{knowledge_base.id}/documents",
+        files={"file": ("doc.txt", b"hello world", "text/plain")}
+    )
+
+    assert response.status_code == 429
+    assert "queue is full" in response.json()["detail"]
+    # 被拒绝的文档不加入知识库，临时文件已删除
+    assert knowledge_base.documents == []
+    assert os.listdir(upload_dir) == []
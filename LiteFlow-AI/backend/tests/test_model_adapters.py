@@ -0,0 +1,152 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import List
+import httpx
+import pytest
+from app.services.model_gateway.gateway import ModelGateway
+from app.services.model_gateway.http_pool import HTTPConnectionPool, SharedTransport
+from app.services.model_gateway.models.anthropic import AnthropicModelAdapter
+from app.services.model_gateway.models.base import ChatMessage, ModelConfig
+from app.services.model_gateway.models.ollama import OllamaModelAdapter
+from app.services.model_gateway.models.openai import OpenAIModelAdapter
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """记录请求并返回固定 JSON 响应的传输层"""
+
+    def __init__(self, body: dict):
+        self.body = body
+        self.requests: List[httpx.Request] = []
+        self.closed = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return httpx.Response(200, json=self.body)
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.parametrize("provider, model_name, api_key", [
+    ("openai", "gpt-4o-mini", "sk-test"),
+    ("anthropic", "claude-3-haiku-20240307", "sk-ant-test"),
+    ("ollama", "llama3", None)
+])
+def test_gateway_builds_adapter(provider, model_name, api_key):
+    async def build():
+        gateway = ModelGateway(http_pool=HTTPConnectionPool())
+        adapter = gateway.get_model(provider, model_name, api_key=api_key)
+        assert adapter.provider == provider
+        await gateway.aclose()
+
+    asyncio.run(build())
+
+
+def test_openai_adapter_chat():
+    transport = RecordingTransport({
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "hello"}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+    })
+    adapter = OpenAIModelAdapter(
+        ModelConfig(model_name="gpt-4o-mini"),
+        api_key="sk-test",
+        http_client=httpx.AsyncClient(transport=transport)
+    )
+
+    response = asyncio.run(adapter.chat(MESSAGES))
+
+    assert response.content == "hello"
+    assert len(transport.requests) == 1
+
+
+def test_anthropic_adapter_uses_given_transport():
+    transport = RecordingTransport({
+        "completion": "hello",
+        "stop_reason": "stop_sequence",
+        "model": "claude-2.1",
+        "type": "completion"
+    })
+    adapter = AnthropicModelAdapter(ModelConfig(model_name="claude-2.1"), api_key="sk-ant-test", transport=transport)
+
+    async def call():
+        completion = await adapter.client.completions.create(
+            model="claude-2.1",
+            prompt="\n\nHuman: hi\n\nAssistant:",
+            max_tokens_to_sample=8
+        )
+        await adapter.aclose()
+        return completion
+
+    assert asyncio.run(call()).completion == "hello"
+    assert transport.requests[0].headers["x-api-key"] == "sk-ant-test"
+
+
+class FakeMessages:
+    """记录 messages.create 参数的 Anthropic 客户端替身"""
+
+    def __init__(self):
+        self.calls: List[dict] = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text="hello")],
+            usage=SimpleNamespace(input_tokens=1, output_tokens=1),
+            model_dump=lambda: {}
+        )
+
+
+def anthropic_with_fake_client(**config) -> AnthropicModelAdapter:
+    adapter = AnthropicModelAdapter(ModelConfig(model_name="claude-3-haiku-20240307", **config), api_key="sk-ant-test")
+    adapter.client = SimpleNamespace(messages=FakeMessages())
+    return adapter
+
+
+def test_anthropic_omits_default_top_p():
+    adapter = anthropic_with_fake_client()
+    asyncio.run(adapter.chat(MESSAGES, temperature=0.2))
+
+    call = adapter.client.messages.calls[0]
+    assert call["temperature"] == 0.2
+    assert "top_p" not in call
+
+
+@pytest.mark.parametrize("config, kwargs", [({}, {"top_p": 0.9}), ({"top_p": 0.9}, {})])
+def test_anthropic_forwards_explicit_top_p(config, kwargs):
+    adapter = anthropic_with_fake_client(**config)
+    asyncio.run(adapter.chat(MESSAGES, **kwargs))
+
+    assert adapter.client.messages.calls[0]["top_p"] == 0.9
+
+
+def test_ollama_adapter_chat_and_close():
+    transport = RecordingTransport({
+        "model": "llama3",
+        "message": {"role": "assistant", "content": "hello"},
+        "done": True,
+        "prompt_eval_count": 1,
+        "eval_count": 1
+    })
+    adapter = OllamaModelAdapter(ModelConfig(model_name="llama3"), transport=transport)
+
+    response = asyncio.run(adapter.chat(MESSAGES))
+    assert response.content == "hello"
+    assert json.loads(transport.requests[0].content)["model"] == "llama3"
+
+    asyncio.run(adapter.aclose())
+    assert transport.closed
+
+
+def test_ollama_adapter_close_keeps_shared_pool_open():
+    pooled = RecordingTransport({})
+    adapter = OllamaModelAdapter(ModelConfig(model_name="llama3"), transport=SharedTransport(pooled))
+
+    asyncio.run(adapter.aclose())
+    assert not pooled.closed
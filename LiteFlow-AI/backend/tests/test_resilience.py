@@ -0,0 +1,140 @@
+import asyncio
+from typing import List
+import anthropic
+import httpx
+import pytest
+from app.config import settings
+from app.services.model_gateway.models.base import BaseModelAdapter, ChatMessage, ModelConfig, ModelResponse
+from app.services.model_gateway.resilience import (
+    CircuitBreaker,
+    ProviderUnavailableError,
+    ResilientModelAdapter,
+    is_provider_failure,
+    is_retryable
+)
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+def anthropic_error(status: int) -> anthropic.APIStatusError:
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status, request=request)
+    return anthropic.APIStatusError(f"status {status}", request=request, response=response, body=None)
+
+
+class ScriptedAdapter(BaseModelAdapter):
+    """按顺序抛出预设异常，之后返回固定响应的适配器"""
+
+    def __init__(self, errors: List[Exception]):
+        super().__init__(ModelConfig(model_name="scripted"))
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def chat(self, messages, **kwargs) -> ModelResponse:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return ModelResponse(content="ok", model_name="scripted")
+
+    async def generate(self, prompt, **kwargs) -> ModelResponse:
+        return await self.chat([], **kwargs)
+
+    async def stream_chat(self, messages, **kwargs):
+        yield (await self.chat(messages, **kwargs)).content
+
+    @property
+    def provider(self) -> str:
+        return "scripted"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_RETRY_BACKOFF_BASE", 0.0)
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504, 529])
+def test_transient_statuses_are_retryable(status):
+    assert is_retryable(anthropic_error(status))
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_client_errors_are_not_retryable(status):
+    assert not is_retryable(anthropic_error(status))
+
+
+def test_overloaded_counts_as_provider_failure_but_rate_limit_does_not():
+    assert is_provider_failure(anthropic_error(529))
+    assert not is_provider_failure(anthropic_error(429))
+
+
+def test_overloaded_is_retried():
+    inner = ScriptedAdapter([anthropic_error(529), anthropic_error(529)])
+    adapter = ResilientModelAdapter(inner, CircuitBreaker("test", failure_threshold=5), retries=3)
+
+    response = asyncio.run(adapter.chat(MESSAGES))
+
+    assert response.content == "ok"
+    assert inner.calls == 3
+    assert adapter.breaker.state == "closed"
+
+
+def test_non_retryable_error_is_raised_without_tripping_breaker():
+    inner = ScriptedAdapter([anthropic_error(400)])
+    breaker = CircuitBreaker("test", failure_threshold=1)
+
+    with pytest.raises(anthropic.APIStatusError):
+        asyncio.run(ResilientModelAdapter(inner, breaker, retries=3).chat(MESSAGES))
+    assert inner.calls == 1
+    assert breaker.state == "closed"
+
+
+def test_breaker_opens_after_threshold_and_rejects_calls():
+    inner = ScriptedAdapter([anthropic_error(529)] * 10)
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    adapter = ResilientModelAdapter(inner, breaker, retries=5)
+
+    with pytest.raises(ProviderUnavailableError):
+        asyncio.run(adapter.chat(MESSAGES))
+    assert breaker.state == "open"
+    assert inner.calls == 2
+
+
+def test_breaker_half_open_allows_one_probe(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("app.services.model_gateway.resilience.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call()
+
+    # 到期后只放行一个探测调用
+    clock[0] = 10.0
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call()
+
+    # 探测失败重新打开，再次到期后探测成功则关闭
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock[0] = 20.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_released_probe_can_be_retaken(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("app.services.model_gateway.resilience.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=1)
+    breaker.record_failure()
+
+    clock[0] = 1.0
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == "half_open"
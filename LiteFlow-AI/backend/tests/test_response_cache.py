@@ -0,0 +1,141 @@
+import asyncio
+from typing import Dict, List
+import pytest
+from app.config import settings
+from app.services.model_gateway.gateway import ModelGateway
+from app.services.model_gateway.http_pool import HTTPConnectionPool
+from app.services.model_gateway.models.base import BaseModelAdapter, ChatMessage, ModelConfig, ModelResponse
+from app.services.model_gateway.response_cache import ResponseCacheStore
+from app.services.model_gateway.semantic_cache import SemanticCacheStore
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+class EchoAdapter(BaseModelAdapter):
+    """返回调用所用凭证的适配器，记录调用次数"""
+
+    def __init__(self, model_name: str, api_key: str, calls: Dict[str, int]):
+        super().__init__(ModelConfig(model_name=model_name))
+        self.api_key = api_key
+        self.calls = calls
+
+    async def chat(self, messages, **kwargs) -> ModelResponse:
+        self.calls[self.api_key] = self.calls.get(self.api_key, 0) + 1
+        return ModelResponse(content=f"answer for {self.api_key}", model_name=self.config.model_name)
+
+    async def generate(self, prompt, **kwargs) -> ModelResponse:
+        return await self.chat([], **kwargs)
+
+    async def stream_chat(self, messages, **kwargs):
+        yield (await self.chat(messages, **kwargs)).content
+
+    @property
+    def provider(self) -> str:
+        return "openai"
+
+
+class FakeCollection:
+    """按 where 条件过滤的 Chroma 集合，忽略大小写后文本相同即视为近邻"""
+
+    def __init__(self):
+        self.entries: List[tuple] = []
+        self.wheres: List[dict] = []
+
+    def add(self, ids, documents, metadatas):
+        self.entries.extend(zip(documents, metadatas))
+
+    def query(self, query_texts, n_results, where, include):
+        self.wheres.append(where)
+        conditions = where["$and"]
+        matches = [
+            (0.0 if document.lower() == query_texts[0].lower() else 1.0, metadata)
+            for document, metadata in self.entries
+            if all(
+                metadata[name] > value["$gt"] if isinstance(value, dict) else metadata[name] == value
+                for condition in conditions for name, value in condition.items()
+            )
+        ]
+        matches.sort(key=lambda match: match[0])
+        return {
+            "ids": [[str(i) for i in range(len(matches[:n_results]))]],
+            "distances": [[distance for distance, _ in matches[:n_results]]],
+            "metadatas": [[metadata for _, metadata in matches[:n_results]]]
+        }
+
+
+class FakeChromaClient:
+    def __init__(self):
+        self.collection = FakeCollection()
+
+    def get_or_create_collection(self, name, metadata):
+        return self.collection
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    calls: Dict[str, int] = {}
+    gateway = ModelGateway(
+        http_pool=HTTPConnectionPool(),
+        cache=ResponseCacheStore(sqlite_path=None),
+        semantic=SemanticCacheStore(client=FakeChromaClient())
+    )
+    monkeypatch.setattr(
+        gateway, "_create_adapter",
+        lambda provider, model_name, api_key, base_url: EchoAdapter(model_name, api_key, calls)
+    )
+    gateway.calls = calls
+    return gateway
+
+
+def test_exact_cache_is_scoped_by_credential(gateway):
+    async def chat(api_key: str) -> str:
+        model = gateway.get_model("openai", "gpt-4o-mini", api_key=api_key)
+        return (await model.chat(MESSAGES, temperature=0)).content
+
+    async def scenario() -> List[str]:
+        try:
+            return [await chat("sk-a"), await chat("sk-b"), await chat("sk-a"), await chat("sk-b")]
+        finally:
+            await gateway.aclose()
+
+    assert asyncio.run(scenario()) == ["answer for sk-a", "answer for sk-b", "answer for sk-a", "answer for sk-b"]
+    # 每个凭证只调用一次提供商，之后命中各自的缓存
+    assert gateway.calls == {"sk-a": 1, "sk-b": 1}
+
+
+def test_credentials_share_circuit_breaker_per_endpoint(gateway):
+    async def scenario():
+        try:
+            gateway.get_model("openai", "gpt-4o-mini", api_key="sk-a")
+            gateway.get_model("openai", "gpt-4o-mini", api_key="sk-b")
+        finally:
+            await gateway.aclose()
+
+    asyncio.run(scenario())
+    assert [state["provider"] for state in gateway.breakers.states()] == ["openai:"]
+
+
+def test_semantic_cache_is_scoped_by_credential(gateway, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_SEMANTIC_CACHE_ENABLED", True)
+
+    async def chat(api_key: str, prompt: str) -> str:
+        model = gateway.get_model("openai", "gpt-4o-mini", api_key=api_key)
+        return (await model.chat([ChatMessage(role="user", content=prompt)], temperature=0)).content
+
+    async def scenario() -> List[str]:
+        try:
+            return [
+                await chat("sk-a", "What is a vector?"),
+                # 相似的提示：其他凭证不命中，同一凭证命中语义缓存
+                await chat("sk-b", "what is a vector?"),
+                await chat("sk-a", "WHAT IS A VECTOR?")
+            ]
+        finally:
+            await gateway.aclose()
+
+    assert asyncio.run(scenario()) == ["answer for sk-a", "answer for sk-b", "answer for sk-a"]
+    assert gateway.calls == {"sk-a": 1, "sk-b": 1}
+    collection = gateway.semantic._client.collection
+    scopes = {condition["scope"] for where in collection.wheres for condition in where["$and"] if "scope" in condition}
+    assert len(scopes) == 2
+    assert {metadata["scope"] for _, metadata in collection.entries} == scopes
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from app.config import settings
+from app.schemas.workflow import WorkflowDefinition, WorkflowEdge, WorkflowExecutionRequest, WorkflowNode
+from app.services.workflow.checkpoint import SQLiteCheckpointStore
+from app.services.workflow.worker_pool import WorkflowQueueFullError, WorkflowWorkerPool
+from app.services.workflow.workflow_executor import workflow_executor
+from app.services.workflow.workflow_manager import workflow_manager
+
+
+class BlockingExecutor:
+    """一直阻塞的执行器，模拟执行中的实例"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    async def execute(self, instance, workflow):
+        self.started.set()
+        await asyncio.Event().wait()
+
+
+@pytest.fixture(scope="module")
+def workflow() -> WorkflowDefinition:
+    return workflow_manager.create_workflow(WorkflowDefinition(
+        workflow_id="worker_pool_restart",
+        name="worker_pool_restart",
+        nodes=[
+            WorkflowNode(node_id="start", type="start", name="start"),
+            WorkflowNode(node_id="end", type="end", name="end")
+        ],
+        edges=[WorkflowEdge(edge_id="e", source="start", target="end")],
+        entry_point="start",
+        exit_point="end"
+    ))
+
+
+def test_queued_instances_survive_restart(workflow):
+    executor = BlockingExecutor()
+    pool = WorkflowWorkerPool(executor, size=1, queue_size=1)
+    running = workflow_manager.create_instance(WorkflowExecutionRequest(workflow_id=workflow.workflow_id))
+    queued = workflow_manager.create_instance(WorkflowExecutionRequest(workflow_id=workflow.workflow_id))
+    rejected = workflow_manager.create_instance(WorkflowExecutionRequest(workflow_id=workflow.workflow_id))
+
+    async def scenario():
+        try:
+            await pool.submit(running, workflow)
+            await executor.started.wait()
+            await pool.submit(queued, workflow)
+            with pytest.raises(WorkflowQueueFullError):
+                await pool.submit(rejected, workflow)
+        finally:
+            await pool.shutdown()
+
+    asyncio.run(scenario())
+
+    # 重启后的新进程：只能看到已写入 SQLite 的检查点，内存中没有这些实例
+    restarted = SQLiteCheckpointStore(settings.WORKFLOW_CHECKPOINT_PATH)
+    assert restarted.load(queued.instance_id).instance.status == "pending"
+    assert restarted.load(rejected.instance_id) is None
+    for instance in (running, queued):
+        workflow_manager._instances.remove(instance.instance_id)
+
+    async def resume():
+        return [await workflow_executor.resume(instance.instance_id) for instance in (running, queued)]
+
+    assert [instance.status for instance in asyncio.run(resume())] == ["completed", "completed"]
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1.workflow import router
+from app.schemas.workflow import WorkflowDefinition, WorkflowEdge, WorkflowExecutionRequest, WorkflowInstance, WorkflowNode
+from app.services.workflow.checkpoint import checkpoint_store
+from app.services.workflow.workflow_executor import workflow_executor
+from app.services.workflow.workflow_manager import workflow_manager
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def workflow() -> WorkflowDefinition:
+    return workflow_manager.create_workflow(WorkflowDefinition(
+        workflow_id="resume_api",
+        name="resume_api",
+        nodes=[
+            WorkflowNode(node_id="start", type="start", name="start"),
+            WorkflowNode(node_id="end", type="end", name="end")
+        ],
+        edges=[WorkflowEdge(edge_id="e", source="start", target="end")],
+        entry_point="start",
+        exit_point="end"
+    ))
+
+
+def create_instance(workflow: WorkflowDefinition, status: str):
+    instance = workflow_manager.create_instance(WorkflowExecutionRequest(workflow_id=workflow.workflow_id))
+    return workflow_manager.update_instance(instance.instance_id, status=status)
+
+
+def resume(instance_id: str):
+    return client.post(f"/workflows/instances/{instance_id}/resume")
+
+
+def test_missing_instance_is_404():
+    response = resume("no-such-instance")
+    assert response.status_code == 404
+
+
+def test_running_instance_is_409(workflow):
+    instance = create_instance(workflow, "running")
+    workflow_executor._running.add(instance.instance_id)
+    try:
+        response = resume(instance.instance_id)
+    finally:
+        workflow_executor._running.discard(instance.instance_id)
+    assert response.status_code == 409
+
+
+@pytest.mark.parametrize("status", ["pending", "running"])
+def test_queued_or_running_instance_is_409(workflow, status):
+    instance = create_instance(workflow, status)
+    response = resume(instance.instance_id)
+    assert response.status_code == 409
+    assert status in response.json()["detail"]
+
+
+def test_paused_instance_resumes(workflow):
+    instance = create_instance(workflow, "paused")
+    response = resume(instance.instance_id)
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+
+@pytest.mark.parametrize("status", ["pending", "running"])
+def test_instance_checkpointed_before_restart_resumes(workflow, status):
+    # 进程重启前保存的检查点：实例处于排队中或运行中，重启后不在内存中
+    instance = WorkflowInstance(
+        instance_id=f"restarted-{status}",
+        workflow_id=workflow.workflow_id,
+        status=status,
+        current_node=workflow.entry_point
+    )
+    checkpoint_store.save(instance, workflow)
+    checkpoint_store.flush()
+    assert workflow_manager.get_loaded_instance(instance.instance_id) is None
+
+    response = resume(instance.instance_id)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert checkpoint_store.load(instance.instance_id).instance.status == "completed"
+
+
+def test_evicted_instance_is_read_from_checkpoint_off_the_event_loop(workflow, monkeypatch):
+    instance = create_instance(workflow, "completed")
+    checkpoint_store.save(instance, workflow)
+    checkpoint_store.flush()
+    # 模拟保留策略淘汰已结束的实例
+    workflow_manager._instances.remove(instance.instance_id)
+    stored = len(workflow_manager._instances)
+
+    load = checkpoint_store.load
+    on_event_loop = []
+
+    def recording_load(instance_id):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop.append(True)
+        except RuntimeError:
+            on_event_loop.append(False)
+        return load(instance_id)
+
+    monkeypatch.setattr(checkpoint_store, "load", recording_load)
+    response = client.get(f"/workflows/instances/{instance.instance_id}")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert on_event_loop == [False]
+    # 读取不会把实例重新加入内存
+    assert workflow_manager.get_loaded_instance(instance.instance_id) is None
+    assert len(workflow_manager._instances) == stored
@@ -0,0 +1,155 @@
+import asyncio
+from typing import Dict, List
+import pytest
+from app.schemas.workflow import WorkflowDefinition, WorkflowEdge, WorkflowExecutionRequest, WorkflowNode
+from app.services.workflow.execution_plan import ExecutionPlan
+from app.services.workflow.scheduler import NODE_OUTPUTS_KEY, WorkflowScheduler
+from app.services.workflow.workflow_executor import workflow_executor
+from app.services.workflow.workflow_manager import workflow_manager
+
+
+def make_workflow(workflow_id: str, nodes: List[WorkflowNode], edges: Dict[str, List[str]]) -> WorkflowDefinition:
+    return WorkflowDefinition(
+        workflow_id=workflow_id,
+        name=workflow_id,
+        nodes=nodes,
+        edges=[
+            WorkflowEdge(edge_id=f"{source}_{target}", source=source, target=target)
+            for source, targets in edges.items()
+            for target in targets
+        ],
+        entry_point="s",
+        exit_point="e"
+    )
+
+
+def diamond(workflow_id: str, branch_type: str = "tool", **branch_config) -> WorkflowDefinition:
+    """s -> {a, b} -> e"""
+    return make_workflow(
+        workflow_id,
+        [
+            WorkflowNode(node_id="s", type="start", name="s"),
+            WorkflowNode(node_id="a", type=branch_type, name="a", config=branch_config.get("a", {})),
+            WorkflowNode(node_id="b", type=branch_type, name="b", config=branch_config.get("b", {})),
+            WorkflowNode(node_id="e", type="end", name="e")
+        ],
+        {"s": ["a", "b"], "a": ["e"], "b": ["e"]}
+    )
+
+
+def all_successors(plan: ExecutionPlan):
+    return lambda node, output: list(dict.fromkeys(plan.successors(node.node_id)))
+
+
+def test_join_keeps_every_branch_result():
+    workflow = diamond(
+        "fan_in_tools",
+        a={"tool_id": "calculator", "parameters": {"operation": "add", "a": 1, "b": 1}},
+        b={"tool_id": "calculator", "parameters": {"operation": "add", "a": 2, "b": 2}}
+    )
+    workflow_manager.create_workflow(workflow)
+    instance = workflow_manager.create_instance(WorkflowExecutionRequest(workflow_id=workflow.workflow_id, inputs={"x": 1}))
+
+    instance = asyncio.run(workflow_executor.execute(instance, workflow))
+
+    assert instance.status == "completed", instance.outputs
+    node_outputs = instance.outputs[NODE_OUTPUTS_KEY]
+    assert node_outputs["a"]["tool_result"] != node_outputs["b"]["tool_result"]
+    assert {"a", "b", "e"} <= set(node_outputs)
+    assert instance.outputs["x"] == 1
+
+
+def test_join_sees_both_branches_regardless_of_completion_order():
+    plan = ExecutionPlan.build(diamond("fan_in_order"))
+    seen = {}
+
+    async def run_node(node, context):
+        if node.node_id == "a":
+            # a 晚于 b 完成，但合并结果仍按拓扑序确定
+            await asyncio.sleep(0.02)
+        if node.node_id in ("a", "b"):
+            return {"result": node.node_id, node.node_id: True}
+        if node.node_id == "e":
+            seen.update(context)
+        return {}
+
+    result = asyncio.run(WorkflowScheduler(plan, run_node, all_successors(plan)).run({}))
+
+    assert seen["a"] and seen["b"]
+    assert seen[NODE_OUTPUTS_KEY]["a"] == {"result": "a", "a": True}
+    assert seen[NODE_OUTPUTS_KEY]["b"] == {"result": "b", "b": True}
+    assert result["result"] == seen["result"]
+
+
+def test_branches_run_concurrently():
+    plan = ExecutionPlan.build(diamond("fan_out_concurrency"))
+    running = []
+    peak = []
+
+    async def run_node(node, context):
+        running.append(node.node_id)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(node.node_id)
+        return {}
+
+    asyncio.run(WorkflowScheduler(plan, run_node, all_successors(plan), max_concurrency=4).run({}))
+    assert max(peak) == 2
+
+
+def test_unselected_branch_is_skipped_and_join_still_runs():
+    plan = ExecutionPlan.build(diamond("fan_in_skip"))
+    executed = []
+
+    async def run_node(node, context):
+        executed.append(node.node_id)
+        return {"last": node.node_id}
+
+    def route(node, output):
+        return ["a"] if node.node_id == "s" else list(plan.successors(node.node_id))
+
+    result = asyncio.run(WorkflowScheduler(plan, run_node, route).run({}))
+
+    assert executed == ["s", "a", "e"]
+    assert set(result[NODE_OUTPUTS_KEY]) == {"s", "a", "e"}
+
+
+def loop(workflow_id: str, edges: Dict[str, List[str]]) -> ExecutionPlan:
+    return ExecutionPlan.build(make_workflow(
+        workflow_id,
+        [WorkflowNode(node_id=node_id, type="tool", name=node_id) for node_id in ("s", "a", "b", "e")],
+        edges
+    ))
+
+
+def test_cycle_follows_single_path_until_exit():
+    plan = loop("cycle_single_path", {"s": ["a"], "a": ["s", "e"]})
+    executed = []
+
+    async def run_node(node, context):
+        executed.append(node.node_id)
+        return {"count": context.get("count", 0) + 1}
+
+    def route(node, output):
+        if node.node_id == "a":
+            return ["s"] if output["count"] < 4 else ["e"]
+        return list(plan.successors(node.node_id))
+
+    result = asyncio.run(WorkflowScheduler(plan, run_node, route).run({}))
+
+    assert not plan.is_acyclic
+    assert executed == ["s", "a", "s", "a", "e"]
+    assert result["count"] == 5
+
+
+def test_cycle_with_fan_out_is_rejected():
+    plan = loop("cycle_fan_out", {"s": ["a", "b"], "a": ["s"], "b": ["e"]})
+    executed = []
+
+    async def run_node(node, context):
+        executed.append(node.node_id)
+        return {}
+
+    with pytest.raises(ValueError, match="cannot fan out"):
+        asyncio.run(WorkflowScheduler(plan, run_node, all_successors(plan)).run({}))
+    assert executed == ["s"]